@@ -0,0 +1,88 @@
+"""
+assets.py - Content-addressed image assets for the Paint App
+"""
+
+import hashlib
+import io
+from collections import OrderedDict
+from PIL import Image
+
+DEFAULT_CACHE_BYTES = 256 * 1024 * 1024
+
+def _photo_image(image):
+    from PIL import ImageTk
+    return ImageTk.PhotoImage(image)
+
+class AssetStore:
+    """
+    Decoded images keyed by a hash of their content.
+    Adding the same file or pixels twice returns the existing key without decoding
+    again. Displayable variants (a PhotoImage and the PIL image it was made from)
+    are created per (key, size) and kept in an LRU cache whose estimated size stays
+    under max_bytes. Evicting a variant only drops the cache's reference: canvas
+    items that already show it keep their own.
+    """
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES, photo_factory=_photo_image):
+        self.max_bytes = max_bytes
+        self.photo_factory = photo_factory
+        self.sources = {}
+        self.variants = OrderedDict()
+        self.cached_bytes = 0
+
+    def add_file(self, path):
+        """Load an image file and return its key; known content is not decoded again."""
+        with open(path, 'rb') as f:
+            data = f.read()
+        key = hashlib.sha256(data).hexdigest()
+        if key not in self.sources:
+            image = Image.open(io.BytesIO(data))
+            image.load()
+            self.sources[key] = image
+        return key
+
+    def add_image(self, image):
+        """Add a PIL image and return its key."""
+        digest = hashlib.sha256(f'{image.mode}:{image.width}x{image.height}:'.encode())
+        digest.update(image.tobytes())
+        key = digest.hexdigest()
+        self.sources.setdefault(key, image)
+        return key
+
+    def source(self, key):
+        """Return the decoded source image for a key."""
+        return self.sources[key]
+
+    def variant(self, key, size=None):
+        """Return (photo, image) for the asset at the given size, or its own size if None."""
+        source = self.sources[key]
+        size = tuple(size) if size else source.size
+        entry = self.variants.get((key, size))
+        if entry is not None:
+            self.variants.move_to_end((key, size))
+            return entry[:2]
+        image = source if size == source.size else source.resize(size, Image.LANCZOS)
+        photo = self.photo_factory(image)
+        # The PhotoImage holds 4 bytes per pixel; a resized copy adds its own buffer
+        nbytes = size[0] * size[1] * 4
+        if image is not source:
+            nbytes += len(image.getbands()) * size[0] * size[1]
+        self.variants[(key, size)] = (photo, image, nbytes)
+        self.cached_bytes += nbytes
+        self._evict()
+        return photo, image
+
+    def photo(self, key, size=None):
+        """Return a PhotoImage of the asset at the given size."""
+        return self.variant(key, size)[0]
+
+    def _evict(self):
+        # Always keep the newest variant, even if it alone exceeds the cap
+        while self.cached_bytes > self.max_bytes and len(self.variants) > 1:
+            _, (_, _, nbytes) = self.variants.popitem(last=False)
+            self.cached_bytes -= nbytes
+
+    def clear(self):
+        """Forget every asset and cached variant."""
+        self.sources.clear()
+        self.variants.clear()
+        self.cached_bytes = 0
@@ -0,0 +1,139 @@
+"""
+baking.py - Raster baking of old strokes for the Paint App
+
+Tk redraws every item on each update, so a long session slows down as items pile
+up. Once a layer holds more than `threshold` items, the Baker retires all but the
+most recent undo actions and flattens the layer's older items into fixed-size
+raster tiles at the bottom of the layer, one image item per tile. Shapes stay
+live and editable, and an item is only baked if no live item beneath it overlaps
+it, so moving it under the live items does not change the picture. Only items
+from retired undo actions are baked; transient effects such as brush sparkles
+belong to no action and are left alone. The baked
+items' snapshots stay on the layer; exports and the timelapse render those
+instead of the tiles, so their output is unchanged.
+"""
+
+import numpy as np
+from PIL import Image
+from renderer import draw_items, snapshot_item
+from shapes import SHAPE_TAG
+
+TILE_SIZE = 512
+BAKE_THRESHOLD = 3000
+KEEP_ACTIONS = 20
+
+class Baker:
+    """Bakes a canvas's old items into per-layer tiles when a layer grows past the threshold."""
+    def __init__(self, canvas, threshold=BAKE_THRESHOLD, keep_actions=KEEP_ACTIONS, tile_size=TILE_SIZE):
+        self.canvas = canvas
+        self.threshold = threshold
+        self.keep_actions = keep_actions
+        self.tile_size = tile_size
+        # Ids of items whose undo action was retired; only these are baked
+        self._retired = set()
+
+    def maybe_bake(self, layer):
+        """Bake the layer if it is visible and over the threshold. Returns the number of items baked."""
+        if layer is None or not layer.visible or len(self.canvas.find_withtag(layer.content_tag)) <= self.threshold:
+            return 0
+        return self.bake(layer)
+
+    def retire_history(self):
+        """
+        Drop all but the newest undo actions, keeping at most half the threshold's
+        worth of items undoable. Retired actions are snapshotted into
+        canvas.baked_history for the timelapse. Returns the ids still undoable.
+        """
+        canvas = self.canvas
+        keep, kept_items = 0, 0
+        for action in reversed(canvas.undo_stack):
+            if keep == self.keep_actions or (keep and kept_items + len(action) > self.threshold // 2):
+                break
+            keep += 1
+            kept_items += len(action)
+        retired = canvas.undo_stack[:len(canvas.undo_stack) - keep]
+        del canvas.undo_stack[:len(retired)]
+        for action in retired:
+            entries = []
+            for item_id in action:
+                archived = canvas._archives.pop(item_id, None)
+                if archived:
+                    # The items a filter or cut replaced can no longer come back
+                    canvas.delete(*[archived_id for archived_id, _ in archived])
+                step = canvas._raster_steps.pop(item_id, None)
+                if step is not None:
+                    layer, diff = step
+                    if diff is not None:
+                        layer.raster.history.undo_stack.remove(diff)
+                    canvas.delete(item_id)
+                    continue
+                entry = snapshot_item(canvas, item_id, include_hidden=True)
+                if entry is not None:
+                    self._retired.add(item_id)
+                    entries.append(entry)
+            canvas.baked_history.append(entries)
+        return {item_id for action in canvas.undo_stack for item_id in action}
+
+    def bake(self, layer):
+        """Flatten the layer's bakeable items into its tiles and delete them. Returns how many were baked."""
+        canvas = self.canvas
+        live = self.retire_history()
+        # Boxes of the live items seen so far, in a buffer that doubles when full
+        blockers, count = np.empty((64, 4)), 0
+        baked = []
+        for item_id in canvas.find_withtag(layer.content_tag):
+            if item_id in canvas.bake_tiles:
+                continue
+            box = canvas.bbox(item_id)
+            if not box:
+                continue
+            seen = blockers[:count]
+            blocked = bool(count) and bool(np.any((seen[:, 0] < box[2]) & (seen[:, 2] > box[0]) & (seen[:, 1] < box[3]) & (seen[:, 3] > box[1])))
+            entry = None
+            if not blocked and item_id in self._retired and item_id not in live and SHAPE_TAG not in canvas.gettags(item_id):
+                entry = snapshot_item(canvas, item_id)
+            if entry is None:
+                if count == len(blockers):
+                    blockers = np.concatenate([blockers, np.empty_like(blockers)])
+                blockers[count] = box
+                count += 1
+                continue
+            baked.append((item_id, box, entry))
+        # Retired items that are gone or baked need no tracking; blocked ones wait for the next bake
+        self._retired = {item_id for item_id in self._retired if canvas.type(item_id)}
+        self._retired.difference_update(item_id for item_id, _, _ in baked)
+        if not baked:
+            return 0
+        size = self.tile_size
+        tiles = {}
+        for _, (x0, y0, x1, y1), entry in baked:
+            for ty in range(y0 // size, (y1 - 1) // size + 1):
+                for tx in range(x0 // size, (x1 - 1) // size + 1):
+                    tiles.setdefault((tx, ty), []).append(entry)
+        for key, entries in tiles.items():
+            self._draw_tile(layer, key, entries)
+        layer.baked.extend(entry for _, _, entry in baked)
+        canvas.delete(*[item_id for item_id, _, _ in baked])
+        layer.version += 1
+        return len(baked)
+
+    def reset(self):
+        """Forget retired items, as when the document is cleared."""
+        self._retired.clear()
+
+    def _draw_tile(self, layer, key, entries):
+        canvas, size = self.canvas, self.tile_size
+        origin = (key[0] * size, key[1] * size)
+        tile_id = layer.tiles.get(key)
+        if tile_id is not None:
+            photo, image = canvas.images[tile_id]
+            draw_items(image, entries, 1.0, origin)
+            photo.paste(image)
+            return
+        image = draw_items(Image.new('RGBA', (size, size), (0, 0, 0, 0)), entries, 1.0, origin)
+        with canvas.drawing_on(layer):
+            tile_id = canvas.place_image(*origin, image)
+        # Below every live item of the layer; the layer's marker is its lowest item
+        canvas.tag_lower(tile_id, layer.tag)
+        layer.tiles[key] = tile_id
+        canvas.bake_tiles[tile_id] = layer
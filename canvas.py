@@ -3,14 +3,27 @@ canvas.py - Drawing logic for the Paint App
 """
 
 import tkinter as tk
+from contextlib import contextmanager
 from tools import ToolManager
-from shapes import Shape, Rectangle, Oval
+from shapes import Shape, Rectangle, Oval, Line, SHAPE_TAG
+from selection import Selection, SELECTION_TAG
+from layers import Layer, LAYER_MARKER_TAG, ARCHIVED_TAG, REGION_TAG, MASK_TAG, CHROME_TAG
+from assets import AssetStore
+from glyphs import GlyphAtlas
+from zorder import ShapeOrder
+from baking import Baker
+from raster_history import RasterPlane
+from filters import shutdown_pool
 import random
 
+# Colour laid over the pixels of the selection mask
+MASK_TINT = (51, 153, 255, 80)
+
 class PaintCanvas(tk.Canvas):
     """
     Canvas widget for drawing. Handles mouse events, drawing logic, and manages multiple layers.
-    Supports adding, switching, and managing visibility of layers.
+    Layers are tag groups inside this one canvas: every new item is tagged with the
+    current layer, and reordering or hiding a layer is a single tag operation.
     """
     def __init__(self, parent, **kwargs):
         """Initialize the PaintCanvas with tool manager, event bindings, and layer management."""
@@ -20,14 +33,43 @@ class PaintCanvas(tk.Canvas):
         self.undo_stack = []
         self.redo_stack = []
         self._recording = True
-        self.layers = [self]
+        self.images = {}
+        self.assets = AssetStore()
+        self.glyphs = GlyphAtlas(self.assets)
+        self.sprites = {}
+        self._archives = {}
+        # Hidden placeholder item id -> (layer, TileDiff) for each raster plane edit in the history
+        self._raster_steps = {}
+        # Pending after() callbacks that belong to the drawing
+        self._timers = set()
+        self.baker = Baker(self)
+        # Tile item id -> layer, and snapshots of undo actions retired by baking
+        self.bake_tiles = {}
+        self.baked_history = []
+        self.listeners = []
         self.current_layer = 0
-        self.shapes = []
-        self.selected_shape = None
+        self._target_layer = None
+        self.layers = []
+        self.layers.append(self._new_layer("Layer 1"))
+        self.shapes = ShapeOrder(group_of=self._shape_layer)
+        self.selection = Selection(self)
         self.selection_mode = False
-        self._drag_offset = (0, 0)
+        self._band = None
         self._resize_mode = False
         self.bg_color = 'white'
+        # Polygon points of the region marked for copy and cut, if any
+        self.region = None
+        # Pixel selection as a masks.Mask, if any, and the PhotoImage of its overlay
+        self.mask = None
+        self._mask_photo = None
+        # Rasterize the stamp emoji once the window is up, so the first stamp is a plain placement
+        self.after_idle(self.warm_glyphs)
+
+    def warm_glyphs(self):
+        """Rasterize every emoji the stamp tool can place at its current size."""
+        stamp = self.tool_manager.tools.get('Stamp')
+        if stamp is not None:
+            self.glyphs.warm(stamp.emojis, stamp.size)
 
     def set_background(self, color):
         """Set the background color of the canvas and all layers."""
@@ -46,6 +88,23 @@ class PaintCanvas(tk.Canvas):
         self.tool_manager.current_tool = tool
         return tool.name
 
+    def select_gradient(self, kind):
+        """
+        Pick the gradient tool with the given type. Object selection mode is left
+        so the tool gets the pointer, but the selected shapes stay selected and
+        become the gradient's fill target.
+        """
+        self.tool_manager.tools['Gradient'].kind = kind
+        self.tool_manager.select_tool('Gradient')
+        self.selection_mode = False
+
+    def _emit(self, event, *args):
+        """Call on_<event>(*args) on every listener that defines it."""
+        for listener in list(self.listeners):
+            handler = getattr(listener, 'on_' + event, None)
+            if handler:
+                handler(*args)
+
     def _bind_events(self):
         """Bind mouse and keyboard events to the canvas."""
         self.bind('<ButtonPress-1>', self._on_press)
@@ -57,9 +116,7 @@ class PaintCanvas(tk.Canvas):
     def _on_press(self, event):
         """Handle mouse press event for drawing or selecting shapes."""
         if self.selection_mode:
-            self._select_shape(event.x, event.y)
-            if self.selected_shape:
-                self._drag_offset = (event.x - self.selected_shape.start[0], event.y - self.selected_shape.start[1])
+            self._select_shape(event.x, event.y, extend=bool(event.state & 0x0001))
         else:
             tool = self.tool_manager.current_tool
             if tool:
@@ -68,39 +125,56 @@ class PaintCanvas(tk.Canvas):
                     self._current_action = [item_id]
                 else:
                     self._current_action = []
+                self._emit('press', tool, event.x, event.y)
             else:
                 self._current_action = []
             self._recording = True
 
     def _on_drag(self, event):
         """Handle mouse drag event for drawing or moving shapes."""
-        if self.selection_mode and self.selected_shape:
-            dx = event.x - self.selected_shape.start[0] - self._drag_offset[0]
-            dy = event.y - self.selected_shape.start[1] - self._drag_offset[1]
-            self.selected_shape.move(dx, dy)
-            self.selected_shape.draw(self)
+        if self.selection_mode:
+            if self._band:
+                self._band.end = (event.x, event.y)
+                self._band.draw(self, outline='red', width=1, temp=True, tags=CHROME_TAG)
+            else:
+                self.selection.update(event.x, event.y)
         else:
             tool = self.tool_manager.current_tool
             if tool:
                 item_id = tool.on_drag(event, self)
                 if self._recording and item_id:
                     self._current_action.append(item_id)
+                self._emit('drag', tool, event.x, event.y)
                 if getattr(tool, 'name', None) == 'Brush':
                     self._draw_sparkle(event.x, event.y, tool.color)
 
     def _on_release(self, event):
         """Handle mouse release event for drawing completion."""
         if self.selection_mode:
-            pass
+            if self._band:
+                x0, y0 = self._band.start
+                self._band.delete(self)
+                self._band = None
+                self.selection.select_enclosed(x0, y0, event.x, event.y, self.shapes, extend=bool(event.state & 0x0001))
+            elif self.selection.commit():
+                self.touch_layers()
+                self._emit('shapes_changed', list(self.selection))
         else:
             tool = self.tool_manager.current_tool
             if tool:
                 item_id = tool.on_release(event, self)
                 if self._recording and item_id:
-                    self._current_action.append(item_id)
+                    # Tools that finish several items at once return a list
+                    self._current_action.extend(item_id if isinstance(item_id, list) else [item_id])
+            committed = []
             if self._recording and self._current_action:
-                self.undo_stack.append(self._current_action)
-                self.redo_stack.clear()
+                committed = self._current_action
+                self.undo_stack.append(committed)
+                self._clear_redo()
+            if tool:
+                self._emit('release', tool, committed)
+            if committed:
+                self.baker.maybe_bake(self.layer_of(committed[-1]))
             self._recording = False
             self._current_action = []
         # Update status bar if present
@@ -108,35 +182,125 @@ class PaintCanvas(tk.Canvas):
             self.master._update_statusbar()
 
     def _on_delete(self, event):
-        """Handle delete key event to remove selected shape."""
-        if self.selected_shape:
-            self.selected_shape.delete(self)
-            self.shapes = [s for s in self.shapes if s != self.selected_shape]
-            self._deselect_shape()
-
-    def _select_shape(self, x, y):
-        """Select a shape at the given coordinates, if any."""
+        """Handle delete key event to remove the selected shapes."""
+        if self.selection:
+            self.touch_layers()
+            item_ids = [s.canvas_id for s in self.selection]
+            for shape in self.selection.delete():
+                self.shapes.discard(shape)
+            self._emit('items_deleted', item_ids)
+
+    def _select_shape(self, x, y, extend=False):
+        """Select the visible shape at the given coordinates, or start a rubber-band selection."""
         for shape in reversed(self.shapes):
-            if shape.contains(x, y):
-                self.selected_shape = shape
-                shape.selected = True
-                shape.draw(self, outline='red', width=3)
+            if shape.contains(x, y) and self._shape_layer(shape).visible:
+                if extend:
+                    self.selection.toggle(shape)
+                elif shape not in self.selection:
+                    self.selection.set([shape])
+                self.selection.begin(x, y)
                 return
-        self._deselect_shape()
+        if not extend:
+            self.selection.clear()
+        self._band = Rectangle((x, y), (x, y))
 
     def _deselect_shape(self):
-        """Deselect the currently selected shape, if any."""
-        if self.selected_shape:
-            self.selected_shape.selected = False
-            self.selected_shape.draw(self)
-        self.selected_shape = None
+        """Deselect all selected shapes."""
+        self.selection.clear()
+
+    def layer_of(self, item_id):
+        """Return the layer holding the given item, or None."""
+        tags = self.gettags(item_id)
+        return next((layer for layer in self.layers if layer.tag in tags), None)
+
+    def _selected_in_order(self, top_first=False):
+        """Selected shapes in stacking order, read back from Tk in one call."""
+        shapes = [self.shapes.find(item_id) for item_id in self.find_withtag(SELECTION_TAG)]
+        shapes = [shape for shape in shapes if shape is not None]
+        return shapes[::-1] if top_first else shapes
+
+    def _shape_layer(self, shape):
+        """The layer a shape is filed under; canvas.shapes keeps one order per layer with it."""
+        return self.layer_of(shape.canvas_id)
+
+    def _neighbour(self, shape, step, moving):
+        """The next shape above (step=1) or below (step=-1) on the same layer that is not moving."""
+        other = self.shapes.above(shape, same_group=True) if step > 0 else self.shapes.below(shape, same_group=True)
+        while other is not None and other in moving:
+            other = self.shapes.above(other, same_group=True) if step > 0 else self.shapes.below(other, same_group=True)
+        return other
+
+    def _reordered(self, shapes):
+        if shapes:
+            self.touch_layers([shape.canvas_id for shape in shapes])
+            self._emit('shapes_reordered', shapes)
+
+    def bring_forward(self):
+        """Move each selected shape one step up within its layer."""
+        shapes = self._selected_in_order(top_first=True)
+        moving = set(shapes)
+        for shape in shapes:
+            other = self._neighbour(shape, 1, moving)
+            if other is not None:
+                self.shapes.place_above(shape, other)
+                self.tag_raise(shape.canvas_id, other.canvas_id)
+        self._reordered(shapes)
+
+    def send_backward(self):
+        """Move each selected shape one step down within its layer."""
+        shapes = self._selected_in_order()
+        moving = set(shapes)
+        for shape in shapes:
+            other = self._neighbour(shape, -1, moving)
+            if other is not None:
+                self.shapes.place_below(shape, other)
+                self.tag_lower(shape.canvas_id, other.canvas_id)
+        self._reordered(shapes)
+
+    def bring_to_front(self):
+        """Move the selected shapes to the top of their layers, keeping their relative order."""
+        shapes = self._selected_in_order()
+        for shape in shapes:
+            self.shapes.to_front(shape)
+            self.tag_raise(shape.canvas_id, self.layer_of(shape.canvas_id).tag)
+        self._reordered(shapes)
+
+    def send_to_back(self):
+        """Move the selected shapes to the bottom of their layers, keeping their relative order."""
+        shapes = self._selected_in_order(top_first=True)
+        for shape in shapes:
+            self.shapes.to_back(shape)
+            # The lowest item with the layer tag is the layer's marker
+            self.tag_lower(shape.canvas_id, self.layer_of(shape.canvas_id).tag)
+        self._reordered(shapes)
+
+    def center_selection(self):
+        """Move the selected shapes so their bounding box is centered on the canvas."""
+        box = self.bbox(SELECTION_TAG)
+        if not box:
+            return
+        x, y = (box[0] + box[2]) / 2, (box[1] + box[3]) / 2
+        self.selection.begin(x, y, 'move')
+        self.selection.update(self.winfo_width() / 2, self.winfo_height() / 2)
+        if self.selection.commit():
+            self.touch_layers()
+            self._emit('shapes_changed', list(self.selection))
 
     def undo(self):
         """Undo the last drawing action."""
         if self.undo_stack:
             last_action = self.undo_stack.pop()
+            self.touch_layers(last_action)
             for item_id in last_action:
-                self.delete(item_id)
+                if item_id in self._raster_steps:
+                    self._swap_raster(item_id, after=False)
+                elif item_id in self._archives:
+                    self._restore_items(self._archives.pop(item_id))
+            self._emit('undo', last_action)
+            for item_id in last_action:
+                if item_id not in self._raster_steps:
+                    self._forget_shape(item_id)
+                    self.delete(item_id)
             self.redo_stack.append(last_action)
 
     def redo(self):
@@ -144,9 +308,24 @@ class PaintCanvas(tk.Canvas):
         if self.redo_stack:
             action = self.redo_stack.pop()
             for item_id in action:
-                pass
+                if item_id in self._raster_steps:
+                    self._swap_raster(item_id, after=True)
+            self.touch_layers(action)
             self.undo_stack.append(action)
 
+    def _clear_redo(self):
+        """Drop the redo history, with the placeholders and tile diffs of undone raster steps."""
+        for action in self.redo_stack:
+            for item_id in action:
+                if item_id in self._raster_steps:
+                    # The items it replaced were restored by the undo and stay
+                    self._archives.pop(item_id, None)
+                    self.delete(item_id)
+        for layer in self.layers:
+            if layer.raster is not None:
+                layer.raster.history.redo_stack.clear()
+        self.redo_stack.clear()
+
     def _draw_sparkle(self, x, y, color):
         """Draw a sparkle effect at the given coordinates."""
         sparkle_type = random.choice(['circle', 'star'])
@@ -155,87 +334,402 @@ class PaintCanvas(tk.Canvas):
         offset_y = random.randint(-6, 6)
         if sparkle_type == 'circle':
             sparkle_id = self.create_oval(x+offset_x, y+offset_y, x+offset_x+size, y+offset_y+size, fill=color, outline='yellow', width=2)
-            self.after(300, lambda: self.delete(sparkle_id))
+            self._after(300, lambda: self.delete(sparkle_id))
         else:
             sparkle_id1 = self.create_line(x-4, y, x+4, y, fill='yellow', width=2)
             sparkle_id2 = self.create_line(x, y-4, x, y+4, fill='yellow', width=2)
-            self.after(300, lambda: (self.delete(sparkle_id1), self.delete(sparkle_id2))) 
+            self._after(300, lambda: (self.delete(sparkle_id1), self.delete(sparkle_id2))) 
+
+    def _after(self, ms, callback):
+        """Schedule a callback that is cancelled when the document is reset."""
+        def fire():
+            self._timers.discard(timer)
+            callback()
+        timer = self.after(ms, fire)
+        self._timers.add(timer)
+        return timer
+
+    def delete(self, *args):
+        """Delete items, dropping the images, sprites and archives held for them."""
+        if self.images or self.sprites or self._archives or self._raster_steps:
+            for tag in args:
+                for item_id in self.find_withtag(tag):
+                    self.images.pop(item_id, None)
+                    self.sprites.pop(item_id, None)
+                    self._archives.pop(item_id, None)
+                    self._raster_steps.pop(item_id, None)
+                    self.bake_tiles.pop(item_id, None)
+        super().delete(*args)
+
+    def new_document(self):
+        """
+        Release everything the drawing holds: items, images, history, shapes,
+        cached assets, pending callbacks, extra layers and the filter worker
+        processes. Leaves one empty layer, with the stamp sprites warmed again.
+        """
+        for timer in self._timers:
+            self.after_cancel(timer)
+        self._timers.clear()
+        self.selection.clear()
+        self._band = None
+        self._current_action = []
+        super().delete('all')
+        self.images.clear()
+        self.sprites.clear()
+        self._archives.clear()
+        self._raster_steps.clear()
+        self.bake_tiles.clear()
+        self.baked_history.clear()
+        self.baker.reset()
+        self.shapes = ShapeOrder(group_of=self._shape_layer)
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.assets.clear()
+        self.glyphs.clear()
+        self.region = None
+        self.mask = None
+        self._mask_photo = None
+        self._target_layer = None
+        self.current_layer = 0
+        self.layers = [self._new_layer("Layer 1")]
+        # The pool is started again by the next filter
+        shutdown_pool()
+        self.warm_glyphs()
+        self._emit('document_reset')
+
+    def _create(self, itemType, args, kw):
+        """Create a canvas item and file it under the current layer's tag and stacking slot."""
+        item_id = super()._create(itemType, args, kw)
+        tags = kw.get('tags', ()) if kw else ()
+        if CHROME_TAG in ((tags,) if isinstance(tags, str) else tags):
+            # UI chrome stays out of the layers, their renders and their versions
+            return item_id
+        layer = self._target_layer or self.layers[self.current_layer]
+        if layer is not self.layers[-1]:
+            self.tag_raise(item_id, layer.tag)
+        self.addtag_withtag(layer.tag, item_id)
+        layer.version += 1
+        return item_id
+
+    def place_image(self, x, y, image, anchor='nw'):
+        """Show a PIL image on the current layer and keep it alive with its item."""
+        from PIL import ImageTk
+        photo = ImageTk.PhotoImage(image)
+        item_id = self.create_image(x, y, anchor=anchor, image=photo)
+        self.images[item_id] = (photo, image)
+        return item_id
+
+    def place_asset(self, x, y, key, size=None, anchor='nw'):
+        """Show a stored asset on the current layer, sharing its cached PhotoImage with other placements."""
+        photo, image = self.assets.variant(key, size)
+        item_id = self.create_image(x, y, anchor=anchor, image=photo)
+        self.images[item_id] = (photo, image)
+        return item_id
+
+    def place_sprite(self, x, y, text, size, color='black'):
+        """Stamp a pre-rasterized text run centered at (x, y)."""
+        item_id = self.place_asset(x, y, self.glyphs.sprite(text, size, color), anchor='center')
+        self.sprites[item_id] = (text, size, color)
+        return item_id
+
+    def create_from_snapshot(self, kind, coords, options, shape=False):
+        """
+        Create an item from (kind, coords, options) geometry on the current layer.
+        With shape set, rectangles, ovals and lines become selectable shapes.
+        Image entries name an asset key and sprite entries their text run.
+        """
+        if shape and kind in ('rectangle', 'oval', 'line') and len(coords) == 4:
+            new_shape = {'rectangle': Rectangle, 'oval': Oval, 'line': Line}[kind](tuple(coords[:2]), tuple(coords[2:]))
+            new_shape.outline = options.get('outline') or options.get('fill') or 'black'
+            new_shape.width = options.get('width', 3)
+            item_id = new_shape.draw(self)
+            if kind != 'line' and options.get('fill'):
+                self.itemconfig(item_id, fill=options['fill'])
+            self.shapes.append(new_shape)
+            return item_id
+        if kind == 'line':
+            points = coords if len(coords) >= 4 else list(coords) * 2
+            return self.create_line(*points, fill=options.get('fill') or 'black', width=options.get('width', 1), capstyle='round', joinstyle='round')
+        if kind in ('rectangle', 'oval', 'polygon'):
+            create = {'rectangle': self.create_rectangle, 'oval': self.create_oval, 'polygon': self.create_polygon}[kind]
+            return create(*coords, fill=options.get('fill', ''), outline=options.get('outline', ''), width=options.get('width', 1))
+        if kind == 'text':
+            return self.create_text(*coords[:2], text=options.get('text', ''), fill=options.get('fill') or 'black', font=options.get('font'), anchor=options.get('anchor', 'center'))
+        if kind == 'sprite':
+            return self.place_sprite(*coords[:2], options.get('text', ''), options.get('size', 16), options.get('fill') or 'black')
+        if kind == 'image' and 'asset' in options:
+            return self.place_asset(*coords[:2], options['asset'], anchor=options.get('anchor', 'nw'))
+        return None
+
+    def set_mask(self, mask):
+        """Make mask the pixel selection and tint it over the drawing; None or an empty mask clears it."""
+        from PIL import ImageTk
+        self.delete(MASK_TAG)
+        self.mask = mask if mask else None
+        self._mask_photo = None
+        if self.mask is not None:
+            self._mask_photo = ImageTk.PhotoImage(self.mask.filled(MASK_TINT))
+            # Created outside any layer so it never counts as drawing
+            super()._create('image', self.mask.offset, {'anchor': 'nw', 'image': self._mask_photo, 'tags': MASK_TAG})
+
+    def clear_region(self):
+        """Drop the marked region and the pixel selection."""
+        self.delete(REGION_TAG)
+        self.region = None
+        self.set_mask(None)
+
+    def fill_mask(self, color):
+        """Paint the selected pixels onto the current layer as one undoable step. Returns the item id carrying it."""
+        if not self.mask:
+            return None
+        item_id = self.paint_image(*self.mask.offset, self.mask.filled(color))
+        self.push_action([item_id])
+        self.tag_raise(MASK_TAG)
+        return item_id
+
+    def push_action(self, item_ids):
+        """Record items created outside a mouse gesture as one undoable action."""
+        if item_ids:
+            self.touch_layers(item_ids)
+            self.undo_stack.append(list(item_ids))
+            self._clear_redo()
+
+    def paint_image(self, x, y, image, below=False):
+        """
+        Paint a PIL image onto the current layer, over its content or, with below
+        set, under all of it. It goes into the layer's raster plane, so undo keeps
+        only the tiles it changed, unless something else on the layer lies over
+        its box; then it is placed on top as its own image item. Returns the id of
+        the item that carries the change, for the undo history.
+        """
+        layer = self.layers[self.current_layer]
+        if not below and self._covered(layer, (x, y, x + image.width, y + image.height)):
+            with self.drawing_on(layer):
+                return self.place_image(x, y, image)
+        diff = self._plane(layer).paint(x, y, image, 'under' if below else 'over')
+        self._show_plane(layer)
+        return self._raster_step(layer, diff)
+
+    def _covered(self, layer, box):
+        """True if any item of the layer other than its raster plane shows inside box."""
+        overlapping = set(self.find_overlapping(*box))
+        return any(item_id in overlapping and item_id != layer.raster_id and self.itemcget(item_id, 'state') != 'hidden'
+                   for item_id in self.find_withtag(layer.content_tag))
+
+    def _plane(self, layer):
+        """The layer's raster plane, shown by an image item at the bottom of the layer once created."""
+        if layer.raster is None:
+            layer.raster = RasterPlane((max(1, self.winfo_width()), max(1, self.winfo_height())))
+            with self.drawing_on(layer):
+                layer.raster_id = self.place_image(0, 0, layer.raster.image())
+            # The lowest item with the layer tag is the layer's marker
+            self.tag_lower(layer.raster_id, layer.tag)
+        return layer.raster
+
+    def _show_plane(self, layer):
+        """Show the raster plane's current pixels."""
+        from PIL import ImageTk
+        photo, _ = self.images[layer.raster_id]
+        image = layer.raster.image()
+        if (photo.width(), photo.height()) == image.size:
+            photo.paste(image)
+        else:
+            photo = ImageTk.PhotoImage(image)
+            self.itemconfigure(layer.raster_id, image=photo)
+        self.images[layer.raster_id] = (photo, image)
+        layer.version += 1
+
+    def _raster_step(self, layer, diff, archived=()):
+        """Record a raster plane edit under a hidden placeholder item, which carries its undo entry. Returns its id."""
+        with self.drawing_on(layer):
+            step_id = self.create_line(0, 0, 0, 0, fill='', state='hidden', tags=ARCHIVED_TAG)
+        self._raster_steps[step_id] = (layer, diff)
+        if archived:
+            self._archives[step_id] = archived
+        return step_id
+
+    def _swap_raster(self, step_id, after):
+        """Write a raster step's after (redo) or before (undo) tiles back, and hide or restore the items it replaced."""
+        layer, diff = self._raster_steps[step_id]
+        if diff is not None:
+            if after:
+                layer.raster.redo()
+            else:
+                layer.raster.undo()
+            self._show_plane(layer)
+        archived = self._archives.get(step_id, ())
+        if after:
+            self._archive_items([item_id for item_id, _ in archived])
+        else:
+            self._restore_items(archived)
+
+    def snapshot_layer(self, layer):
+        """
+        Snapshot a layer's visible items for render_snapshot(), which may then run
+        on another thread. Returns (items, bbox) or None if the layer is empty.
+        """
+        from renderer import iter_snapshot
+        box = self.bbox(layer.content_tag)
+        if not box:
+            return None
+        return list(iter_snapshot(self, layer.content_tag)), box
+
+    def render_layer(self, layer):
+        """Render a layer's visible items offscreen. Returns (image, (x, y)) or None if it is empty."""
+        from renderer import render_snapshot
+        return render_snapshot(self.snapshot_layer(layer))
+
+    def replace_with_image(self, item_ids, x, y, image, layer=None):
+        """
+        Replace items with one image, as an undoable action. The items are hidden
+        and archived rather than deleted, and undoing the image restores them.
+        With image None the items are only removed. The image takes the stacking
+        slot of the lowest replaced item; when that is the bottom of the layer,
+        the image replaces the layer's raster plane, so the step stores only the
+        tiles that changed. Returns the id of the item that carries the undo entry.
+        """
+        layer = layer or self.layers[self.current_layer]
+        content = self.find_withtag(layer.content_tag)
+        replaced = set(item_ids)
+        lowest = next((item_id for item_id in content if item_id in replaced), None)
+        if layer.raster is not None:
+            into_plane = layer.raster_id in replaced
+        else:
+            into_plane = bool(content) and content[0] == lowest
+        if into_plane:
+            diff = self._plane(layer).paint(x, y, image, 'replace')
+            self._show_plane(layer)
+        else:
+            with self.drawing_on(layer):
+                if image is None:
+                    # Nothing replaces the items; a hidden placeholder carries the undo entry
+                    image_id = self.create_line(x, y, x, y, fill='', state='hidden', tags=ARCHIVED_TAG)
+                else:
+                    image_id = self.place_image(x, y, image)
+            if lowest is not None:
+                # Items above the lowest replaced one stay above the image
+                self.tag_lower(image_id, lowest)
+        archived = self._archive_items([item_id for item_id in item_ids if item_id != layer.raster_id])
+        if into_plane:
+            image_id = self._raster_step(layer, diff, archived)
+        else:
+            self._archives[image_id] = archived
+        self.undo_stack.append([image_id])
+        self._clear_redo()
+        return image_id
+
+    def _archive_items(self, item_ids):
+        """Hide items and drop their shapes, keeping both so undo can bring them back. Returns [(item_id, shape)]."""
+        archived = []
+        for item_id in item_ids:
+            shape = self._forget_shape(item_id)
+            self.addtag_withtag(ARCHIVED_TAG, item_id)
+            self.itemconfigure(item_id, state='hidden')
+            archived.append((item_id, shape))
+        return archived
+
+    def _forget_shape(self, item_id):
+        """Drop the shape drawn as item_id from the shape order and the selection. Returns it, or None."""
+        shape = self.shapes.find(item_id)
+        if shape is not None:
+            if shape in self.selection:
+                self.selection.toggle(shape)
+            self.shapes.remove(shape)
+        return shape
+
+    def _restore_items(self, archived):
+        for item_id, shape in archived:
+            layer = self.layer_of(item_id)
+            self.dtag(item_id, ARCHIVED_TAG)
+            self.itemconfigure(item_id, state='normal' if layer is None or layer.visible else 'hidden')
+            if shape is not None:
+                self.shapes.append(shape)
+
+    def touch_layers(self, item_ids=None):
+        """Mark the layers holding the given items as changed, or every layer if none are given."""
+        if item_ids is None:
+            touched = self.layers
+        else:
+            tags = set()
+            for item_id in item_ids:
+                tags.update(self.gettags(item_id))
+            touched = [layer for layer in self.layers if layer.tag in tags]
+        for layer in touched:
+            layer.version += 1
+
+    @contextmanager
+    def drawing_on(self, layer):
+        """Context manager that files newly created items under the given layer."""
+        previous, self._target_layer = self._target_layer, layer
+        try:
+            yield layer
+        finally:
+            self._target_layer = previous
+
+    def _new_layer(self, name):
+        """Create a layer with its hidden stacking marker on top of the stack."""
+        layer = Layer(name)
+        layer.marker_id = super()._create('line', (0, 0, 0, 0), {'state': 'hidden', 'tags': (layer.tag, LAYER_MARKER_TAG)})
+        return layer
 
     def add_layer(self):
-        """Add a new layer (Canvas) on top of the current layers."""
-        parent = self.master if hasattr(self, 'master') else self.winfo_toplevel()
-        new_layer = tk.Canvas(parent, bg=self.bg_color, highlightthickness=0)
-        new_layer.place(x=self.winfo_x(), y=self.winfo_y(), relwidth=1, relheight=1)
-        new_layer.name = f"Layer {len(self.layers)+1}"
-        new_layer.visible = True
+        """Add a new layer on top of the current layers."""
+        new_layer = self._new_layer(f"Layer {len(self.layers)+1}")
         self.layers.append(new_layer)
-        self._update_layer_stack()
+        self._emit('layer_added', new_layer)
         return new_layer
 
     def switch_layer(self, index):
         """Switch the active layer to the one at the given index."""
         if 0 <= index < len(self.layers):
             self.current_layer = index
-            self._update_layer_stack()
-
-    def _update_layer_stack(self):
-        """Update stacking order and event bindings for all layers."""
-        for i, layer in enumerate(self.layers):
-            if hasattr(layer, 'visible') and not layer.visible:
-                layer.place_forget()
-            else:
-                layer.place(x=self.winfo_x(), y=self.winfo_y(), relwidth=1, relheight=1)
-                layer.lift()
-            # Only the current layer should handle events
-            if i == self.current_layer:
-                self._bind_events_to_layer(layer)
-            else:
-                self._unbind_events_from_layer(layer)
-
-    def _bind_events_to_layer(self, layer):
-        """Bind drawing events to the given layer."""
-        layer.bind('<ButtonPress-1>', self._on_press)
-        layer.bind('<B1-Motion>', self._on_drag)
-        layer.bind('<ButtonRelease-1>', self._on_release)
-        layer.bind('<Delete>', self._on_delete)
-        layer.focus_set()
-
-    def _unbind_events_from_layer(self, layer):
-        """Unbind drawing events from the given layer."""
-        layer.unbind('<ButtonPress-1>')
-        layer.unbind('<B1-Motion>')
-        layer.unbind('<ButtonRelease-1>')
-        layer.unbind('<Delete>') 
 
     def delete_layer(self, index):
         """Delete the layer at the given index, if more than one layer exists."""
         if len(self.layers) > 1 and 0 <= index < len(self.layers):
             layer = self.layers.pop(index)
-            layer.destroy()
+            for item_id in self.find_withtag(f'{layer.tag}&&{SHAPE_TAG}'):
+                self._forget_shape(item_id)
+            self.delete(layer.tag)
             if self.current_layer >= len(self.layers):
                 self.current_layer = len(self.layers) - 1
-            self._update_layer_stack()
+            self._emit('layer_deleted', layer)
+
+    def restack_layers(self):
+        """Restack every layer's items to match the order of self.layers, bottom to top."""
+        for lower, upper in zip(self.layers, self.layers[1:]):
+            self.tag_raise(upper.tag, lower.tag)
+        self.tag_raise(CHROME_TAG)
+
+    def _swap_layers(self, lower, upper):
+        """Swap two adjacent layers in the list and in the canvas stacking order."""
+        self.layers[lower], self.layers[upper] = self.layers[upper], self.layers[lower]
+        self.tag_raise(self.layers[upper].tag, self.layers[lower].tag)
+        self.tag_raise(CHROME_TAG)
+        if self.current_layer in (lower, upper):
+            self.current_layer = lower + upper - self.current_layer
+        self._emit('layers_reordered')
 
     def move_layer_up(self, index):
         """Move the layer at the given index up in the stack."""
         if 1 <= index < len(self.layers):
-            self.layers[index-1], self.layers[index] = self.layers[index], self.layers[index-1]
-            self._update_layer_stack()
+            self._swap_layers(index-1, index)
 
     def move_layer_down(self, index):
         """Move the layer at the given index down in the stack."""
         if 0 <= index < len(self.layers)-1:
-            self.layers[index], self.layers[index+1] = self.layers[index+1], self.layers[index]
-            self._update_layer_stack()
+            self._swap_layers(index, index+1)
 
     def toggle_layer_visibility(self, index):
         """Toggle the visibility of the layer at the given index."""
         if 0 <= index < len(self.layers):
             layer = self.layers[index]
-            layer.visible = not getattr(layer, 'visible', True)
-            self._update_layer_stack()
+            layer.visible = not layer.visible
+            self.itemconfigure(layer.content_tag, state='normal' if layer.visible else 'hidden')
+            self._emit('layer_changed', layer)
 
     def rename_layer(self, index, name):
         """Rename the layer at the given index."""
         if 0 <= index < len(self.layers):
-            self.layers[index].name = name 
\ No newline at end of file
+            self.layers[index].name = name
+            self._emit('layer_changed', self.layers[index])
@@ -0,0 +1,208 @@
+"""
+clipboard.py - Region copy, cut and paste for the Paint App
+
+A clip keeps vector content as geometry and everything else as one raster.
+Items wholly inside the region are copied as (kind, coords, options)
+snapshots, with images referenced by their asset key. Items that cross the
+region's edge are rendered, masked to the region and added to the AssetStore.
+A pixel selection mask always copies as a raster, keeping its soft edges.
+Pasting builds new items from the same snapshots and shows the raster with
+place_asset() at the place it was copied from in the stacking order, so every paste of a clip shares one pixel buffer and one
+PhotoImage. Stored images are never edited in place (filters and cuts render
+new ones), so a shared buffer is only copied when its content really changes.
+"""
+
+import math
+import numpy as np
+from PIL import Image, ImageChops, ImageDraw
+from renderer import render, snapshot_item
+from shapes import SHAPE_TAG
+
+# Pastes without a position land this far below and right of the previous one
+PASTE_OFFSET = 20
+
+def points_in_polygon(points, polygon):
+    """Even-odd test of (n, 2) points against a polygon; returns a boolean array."""
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    polygon = np.asarray(polygon, dtype=float).reshape(-1, 2)
+    x, y = points[:, :1], points[:, 1:]
+    x0, y0 = polygon[:, 0], polygon[:, 1]
+    x1, y1 = np.roll(x0, -1), np.roll(y0, -1)
+    spans = (y0 > y) != (y1 > y)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        crossing_x = x0 + (y - y0) * (x1 - x0) / (y1 - y0)
+    return np.count_nonzero(spans & (x < crossing_x), axis=1) % 2 == 1
+
+def region_box(polygon):
+    """Integer bounding box (x0, y0, x1, y1) of a region polygon."""
+    xs, ys = [x for x, _ in polygon], [y for _, y in polygon]
+    return math.floor(min(xs)), math.floor(min(ys)), math.ceil(max(xs)), math.ceil(max(ys))
+
+def region_mask(polygon, origin, size):
+    """An 'L' mask of the given size, 255 inside the polygon, with origin at its top-left pixel."""
+    mask = Image.new('L', size, 0)
+    ImageDraw.Draw(mask).polygon([(x - origin[0], y - origin[1]) for x, y in polygon], fill=255)
+    return mask
+
+class Clip:
+    """
+    Copied content. entries are (kind, coords, options, is_shape) geometry,
+    bottom to top, raster is (asset key, x, y) or None, and origin is the
+    region's top-left. raster_index is how many entries lie below the raster.
+    """
+    def __init__(self, entries, raster, origin, raster_index=0):
+        self.entries = entries
+        self.raster = raster
+        self.origin = origin
+        self.raster_index = raster_index
+        self.pastes = 0
+
+class Clipboard:
+    """Holds the last copied clip and pastes it onto the active layer."""
+    def __init__(self):
+        self.clip = None
+
+    def _region_items(self, canvas, polygon, layer):
+        """
+        Split the layer's visible items touching the region into (inside, crossing),
+        bottom to top, plus how many inside items lie below the lowest crossing one.
+        """
+        touching = set(canvas.find_overlapping(*region_box(polygon)))
+        inside, crossing = [], []
+        below = None
+        for item_id in canvas.find_withtag(layer.content_tag):
+            if item_id not in touching or canvas.itemcget(item_id, 'state') == 'hidden':
+                continue
+            x0, y0, x1, y1 = canvas.bbox(item_id)
+            corners = [(x0, y0), (x1, y0), (x1, y1), (x0, y1)]
+            if points_in_polygon(corners, polygon).all():
+                inside.append(item_id)
+            else:
+                crossing.append(item_id)
+                below = len(inside) if below is None else below
+        return inside, crossing, below or 0
+
+    def _entry(self, canvas, item_id):
+        entry = snapshot_item(canvas, item_id)
+        if entry is None:
+            return None
+        kind, coords, options = entry
+        if kind == 'image':
+            if item_id in canvas.sprites:
+                text, size, color = canvas.sprites[item_id]
+                kind, options = 'sprite', {'text': text, 'size': size, 'fill': color}
+            else:
+                options = {'asset': canvas.assets.add_image(options['image']), 'anchor': options['anchor']}
+        return (kind, coords, options, SHAPE_TAG in canvas.gettags(item_id))
+
+    def _render(self, canvas, item_ids, box):
+        x0, y0, x1, y1 = box
+        snapshots = [entry for entry in (snapshot_item(canvas, item_id) for item_id in item_ids) if entry is not None]
+        return render(snapshots, (max(1, x1 - x0), max(1, y1 - y0)), 1.0, (x0, y0))
+
+    def copy(self, canvas, polygon):
+        """Copy what the active layer shows inside the region. Returns the new clip, or None if the region is empty."""
+        layer = canvas.layers[canvas.current_layer]
+        inside, crossing, below = self._region_items(canvas, polygon, layer)
+        entries = [self._entry(canvas, item_id) for item_id in inside]
+        # The raster goes where the lowest crossing item was
+        raster_index = len([entry for entry in entries[:below] if entry is not None])
+        entries = [entry for entry in entries if entry is not None]
+        box = region_box(polygon)
+        raster = None
+        if crossing:
+            image = self._render(canvas, crossing, box)
+            image.putalpha(ImageChops.multiply(image.getchannel('A'), region_mask(polygon, box[:2], image.size)))
+            content = image.getbbox()
+            if content:
+                image = image.crop(content)
+                raster = (canvas.assets.add_image(image), box[0] + content[0], box[1] + content[1])
+        if not entries and raster is None:
+            return None
+        self.clip = Clip(entries, raster, box[:2], raster_index)
+        return self.clip
+
+    def cut(self, canvas, polygon):
+        """
+        Copy the region, then remove it from the active layer as one undoable
+        action. Items crossing the edge are replaced by a raster of what lies
+        outside the region.
+        """
+        layer = canvas.layers[canvas.current_layer]
+        clip = self.copy(canvas, polygon)
+        if clip is None:
+            return None
+        inside, crossing, _ = self._region_items(canvas, polygon, layer)
+        remainder, origin = None, region_box(polygon)[:2]
+        if crossing:
+            box = tuple(math.floor(v) for v in canvas.bbox(*crossing))
+            remainder, origin = self._render(canvas, crossing, box), box[:2]
+            remainder.paste((0, 0, 0, 0), mask=region_mask(polygon, origin, remainder.size))
+        canvas.replace_with_image(inside + crossing, *origin, remainder, layer=layer)
+        return clip
+
+    def _mask_items(self, canvas, mask, layer):
+        """The layer's visible items touching the mask's box, bottom to top."""
+        touching = set(canvas.find_overlapping(*mask.bbox))
+        return [item_id for item_id in canvas.find_withtag(layer.content_tag)
+                if item_id in touching and canvas.itemcget(item_id, 'state') != 'hidden']
+
+    def copy_mask(self, canvas, mask):
+        """Copy the active layer's pixels under a selection mask. Returns the new clip, or None if nothing is covered."""
+        layer = canvas.layers[canvas.current_layer]
+        items = self._mask_items(canvas, mask, layer) if mask else []
+        if not items:
+            return None
+        box = mask.bbox
+        image = self._render(canvas, items, box)
+        image.putalpha(ImageChops.multiply(image.getchannel('A'), mask.to_image()))
+        content = image.getbbox()
+        if not content:
+            return None
+        raster = (canvas.assets.add_image(image.crop(content)), box[0] + content[0], box[1] + content[1])
+        self.clip = Clip([], raster, box[:2])
+        return self.clip
+
+    def cut_mask(self, canvas, mask):
+        """
+        Copy the pixels under a selection mask, then replace the items they come
+        from with a raster of what the mask leaves, as one undoable action.
+        """
+        layer = canvas.layers[canvas.current_layer]
+        clip = self.copy_mask(canvas, mask)
+        if clip is None:
+            return None
+        items = self._mask_items(canvas, mask, layer)
+        box = tuple(math.floor(v) for v in canvas.bbox(*items))
+        remainder = self._render(canvas, items, box)
+        remainder.putalpha(ImageChops.multiply(remainder.getchannel('A'), ImageChops.invert(mask.to_image(box))))
+        canvas.replace_with_image(items, *box[:2], remainder, layer=layer)
+        return clip
+
+    def paste(self, canvas, x=None, y=None):
+        """
+        Paste the clip onto the active layer with its top-left at (x, y), or offset
+        from the previous paste, keeping the copied stacking order. Returns the new
+        item ids, recorded as one action.
+        """
+        clip = self.clip
+        if clip is None:
+            return []
+        clip.pastes += 1
+        if x is None or y is None:
+            dx = dy = PASTE_OFFSET * clip.pastes
+        else:
+            dx, dy = x - clip.origin[0], y - clip.origin[1]
+        item_ids = []
+        for index in range(len(clip.entries) + 1):
+            if index == clip.raster_index and clip.raster is not None:
+                key, rx, ry = clip.raster
+                item_ids.append(canvas.place_asset(rx + dx, ry + dy, key))
+            if index < len(clip.entries):
+                kind, coords, options, is_shape = clip.entries[index]
+                moved = [c + (dy if i % 2 else dx) for i, c in enumerate(coords)]
+                item_id = canvas.create_from_snapshot(kind, moved, options, shape=is_shape)
+                if item_id:
+                    item_ids.append(item_id)
+        canvas.push_action(item_ids)
+        return item_ids
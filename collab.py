@@ -0,0 +1,611 @@
+"""
+collab.py - Real-time collaborative sessions for the Paint App
+
+A CollabServer gives every operation it receives a global sequence number and
+broadcasts the ordered entries to all clients once per frame. Clients apply the
+entries strictly in that order to a SessionDocument, so every copy converges.
+Local gestures are drawn immediately and reconciled when their echo arrives.
+
+Operations are compact JSON lists:
+    ['la', layer, name]                         add a layer on top
+    ['ld', layer]                               delete a layer and everything on it
+    ['lm', layer, index]                        move a layer to an index (0 = bottom)
+    ['lv', layer, visible]                      show or hide a layer
+    ['lr', layer, name]                         rename a layer
+    ['sb', obj, layer, color, width, x, y]      begin a plain line stroke
+    ['sp', obj, [x0, y0, x1, y1, ...]]          append stroke points
+    ['oa', obj, layer, kind, coords, options]   add a finished item; kind 'sprite'
+                                                is a text or emoji stamp, and an
+                                                'image' carries its pixels as
+                                                base64 PNG in options['png']
+    ['oe', obj, coords]                         replace an item's coordinates
+    ['od', obj]                                 delete an item
+
+Conflicts resolve by server order: the last edit wins, deletes win over later
+edits, and anything aimed at a deleted layer or item is dropped. The server
+keeps its own SessionDocument and welcomes late joiners with the ops that
+rebuild it, rather than replaying the whole history.
+
+Run `python collab.py --port 8765` to host a session.
+"""
+
+import asyncio
+import base64
+import io
+import json
+import queue
+import threading
+from itertools import count
+
+FRAME_INTERVAL = 1 / 60
+BASE_LAYER = 'base'
+# Stream line limit; the welcome message carries the whole drawing
+_LINE_LIMIT = 1 << 28
+
+def encode(message):
+    """Serialize a message as one compact JSON line."""
+    return json.dumps(message, separators=(',', ':')).encode() + b'\n'
+
+def encode_image(image):
+    """Pack a PIL image as base64 PNG text for an 'oa' op."""
+    data = io.BytesIO()
+    image.save(data, 'PNG')
+    return base64.b64encode(data.getvalue()).decode('ascii')
+
+def decode_image(text):
+    """Unpack an image packed by encode_image()."""
+    from PIL import Image
+    image = Image.open(io.BytesIO(base64.b64decode(text)))
+    image.load()
+    return image
+
+def coalesce(ops):
+    """Merge runs of stroke-point ops for the same stroke into a single op."""
+    merged = []
+    for op in ops:
+        if op[0] == 'sp' and merged and merged[-1][0] == 'sp' and merged[-1][1] == op[1]:
+            merged[-1] = ['sp', op[1], merged[-1][2] + op[2]]
+        else:
+            merged.append(op)
+    return merged
+
+class SessionDocument:
+    """
+    Replicated state of a shared drawing: ordered layers and the objects on them.
+    apply() must be fed entries in server order; it returns whether the op took
+    effect, which is how conflicts surface to the caller.
+    """
+    def __init__(self):
+        self.seq = 0
+        self.layers = [BASE_LAYER]
+        self.layer_info = {BASE_LAYER: {'name': 'Layer 1', 'visible': True}}
+        self.objects = {}
+        self.dead = set()
+
+    def apply(self, seq, author, op):
+        """Apply one ordered entry. Returns True if the op changed the document."""
+        if seq <= self.seq:
+            return False
+        self.seq = seq
+        handler = getattr(self, '_op_' + str(op[0]), None)
+        try:
+            return bool(handler and handler(*op[1:]))
+        except (TypeError, ValueError):
+            # Malformed op from a misbehaving client
+            return False
+
+    def snapshot(self):
+        """Return comparable plain data for the whole document."""
+        return {'layers': list(self.layers), 'layer_info': self.layer_info, 'objects': self.objects}
+
+    def ops(self):
+        """Ops that rebuild the current layers and objects in an empty document, one per change at most."""
+        ops = [['la', layer, self.layer_info[layer]['name']] for layer in self.layers if layer != BASE_LAYER]
+        if self.layers.index(BASE_LAYER) != 0:
+            ops.append(['lm', BASE_LAYER, self.layers.index(BASE_LAYER)])
+        if self.layer_info[BASE_LAYER]['name'] != 'Layer 1':
+            ops.append(['lr', BASE_LAYER, self.layer_info[BASE_LAYER]['name']])
+        ops += [['lv', layer, False] for layer in self.layers if not self.layer_info[layer]['visible']]
+        ops += [['oa', obj, data['layer'], data['kind'], data['coords'], data['options']] for obj, data in self.objects.items()]
+        return ops
+
+    def _op_la(self, layer, name):
+        if layer in self.layer_info or layer in self.dead:
+            return False
+        self.layers.append(layer)
+        self.layer_info[layer] = {'name': name, 'visible': True}
+        return True
+
+    def _op_ld(self, layer):
+        if layer not in self.layer_info:
+            return False
+        self.layers.remove(layer)
+        del self.layer_info[layer]
+        self.dead.add(layer)
+        for obj in [obj for obj, data in self.objects.items() if data['layer'] == layer]:
+            del self.objects[obj]
+            self.dead.add(obj)
+        return True
+
+    def _op_lm(self, layer, index):
+        if layer not in self.layer_info:
+            return False
+        self.layers.remove(layer)
+        self.layers.insert(max(0, min(int(index), len(self.layers))), layer)
+        return True
+
+    def _op_lv(self, layer, visible):
+        if layer not in self.layer_info:
+            return False
+        self.layer_info[layer]['visible'] = bool(visible)
+        return True
+
+    def _op_lr(self, layer, name):
+        if layer not in self.layer_info:
+            return False
+        self.layer_info[layer]['name'] = str(name)
+        return True
+
+    def _op_sb(self, obj, layer, color, width, x, y):
+        return self._op_oa(obj, layer, 'line', [x, y], {'fill': color, 'width': width})
+
+    def _op_sp(self, obj, points):
+        data = self.objects.get(obj)
+        if data is None or data['kind'] != 'line':
+            return False
+        data['coords'].extend(points)
+        return True
+
+    def _op_oa(self, obj, layer, kind, coords, options):
+        if obj in self.objects or obj in self.dead or layer not in self.layer_info:
+            return False
+        self.objects[obj] = {'kind': kind, 'layer': layer, 'coords': list(coords), 'options': dict(options)}
+        return True
+
+    def _op_oe(self, obj, coords):
+        if obj not in self.objects:
+            return False
+        self.objects[obj]['coords'] = list(coords)
+        return True
+
+    def _op_od(self, obj):
+        if obj not in self.objects:
+            return False
+        del self.objects[obj]
+        self.dead.add(obj)
+        return True
+
+class CollabServer:
+    """
+    Asyncio session server. Orders incoming operations, applies them to its own
+    copy of the document for late joiners, and broadcasts pending entries to every
+    client once per frame, so the write rate per client does not grow with the
+    number of senders.
+    """
+    def __init__(self, host='127.0.0.1', port=0, frame=FRAME_INTERVAL):
+        self.host = host
+        self.port = port
+        self.frame = frame
+        self.document = SessionDocument()
+        self._seq = 0
+        self._ids = count(1)
+        self._clients = {}
+        self._pending = []
+        self._server = None
+        self._flusher = None
+
+    async def start(self):
+        """Start listening; self.port holds the bound port afterwards."""
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, limit=_LINE_LIMIT)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._flusher = asyncio.create_task(self._flush_loop())
+        return self
+
+    async def close(self):
+        self._flusher.cancel()
+        self._server.close()
+        for writer in list(self._clients.values()):
+            writer.close()
+        await self._server.wait_closed()
+
+    async def serve_forever(self):
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def _handle(self, reader, writer):
+        client_id = next(self._ids)
+        # Number the rebuilding ops so the joiner's document ends at the current sequence
+        ops = self.document.ops()
+        first = self._seq - len(ops) + 1
+        writer.write(encode({'id': client_id, 'entries': [[first + i, 0, op] for i, op in enumerate(ops)]}))
+        self._clients[client_id] = writer
+        try:
+            await writer.drain()
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    ops = json.loads(line)
+                except ValueError:
+                    continue
+                for op in ops if isinstance(ops, list) else ():
+                    if isinstance(op, list) and op and isinstance(op[0], str):
+                        self._seq += 1
+                        self.document.apply(self._seq, client_id, op)
+                        self._pending.append([self._seq, client_id, op])
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            self._clients.pop(client_id, None)
+            writer.close()
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.frame)
+            if not self._pending:
+                continue
+            data = encode({'entries': self._pending})
+            self._pending = []
+            writers = [writer for writer in self._clients.values() if not writer.is_closing()]
+            for writer in writers:
+                writer.write(data)
+            # Entries keep batching while a slow client catches up
+            await asyncio.gather(*(writer.drain() for writer in writers), return_exceptions=True)
+
+class CollabClient:
+    """
+    Connection to a CollabServer. send() may be called from any thread; queued ops
+    are coalesced and sent as one batch per frame. Received entry batches are put
+    on `inbox`. Use connect()/close() from asyncio code, or start()/stop() to run
+    the connection on a background thread beside the Tk main loop.
+    """
+    def __init__(self, host='127.0.0.1', port=8765, frame=FRAME_INTERVAL):
+        self.host = host
+        self.port = port
+        self.frame = frame
+        self.client_id = None
+        self.inbox = queue.SimpleQueue()
+        self.error = None
+        self._outbox = []
+        self._lock = threading.Lock()
+        self._reader = None
+        self._writer = None
+        self._tasks = []
+        self._loop = None
+        self._thread = None
+        self._connected = threading.Event()
+
+    def send(self, op):
+        """Queue an op for the next batch."""
+        with self._lock:
+            self._outbox.append(op)
+
+    async def connect(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port, limit=_LINE_LIMIT)
+        welcome = json.loads(await self._reader.readline())
+        self.client_id = welcome['id']
+        self.inbox.put(welcome['entries'])
+        self._tasks = [asyncio.create_task(self._send_loop()), asyncio.create_task(self._recv_loop())]
+        return self
+
+    async def close(self):
+        await self._flush()
+        for task in self._tasks:
+            task.cancel()
+        self._writer.close()
+        try:
+            await self._writer.wait_closed()
+        except ConnectionError:
+            pass
+
+    async def _flush(self):
+        with self._lock:
+            ops, self._outbox = self._outbox, []
+        if ops and not self._writer.is_closing():
+            self._writer.write(encode(coalesce(ops)))
+            await self._writer.drain()
+
+    async def _send_loop(self):
+        while True:
+            await asyncio.sleep(self.frame)
+            await self._flush()
+
+    async def _recv_loop(self):
+        while True:
+            line = await self._reader.readline()
+            if not line:
+                break
+            self.inbox.put(json.loads(line)['entries'])
+
+    def start(self, timeout=5.0):
+        """Connect on a background thread and return once connected."""
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name='collab-client', daemon=True)
+        self._thread.start()
+        if not self._connected.wait(timeout):
+            raise ConnectionError(f"Timed out connecting to {self.host}:{self.port}")
+        if self.error:
+            self._loop = None
+            raise ConnectionError(f"Could not connect to {self.host}:{self.port}: {self.error}")
+        return self
+
+    def stop(self, timeout=5.0):
+        """Flush pending ops, close the connection and stop the background thread."""
+        if self._loop is None:
+            return
+        if self.error is None:
+            asyncio.run_coroutine_threadsafe(self.close(), self._loop).result(timeout)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+        self._loop = None
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self.connect())
+        except OSError as e:
+            self.error = e
+        self._connected.set()
+        if self.error is None:
+            self._loop.run_forever()
+        self._loop.close()
+
+class CanvasSession:
+    """
+    Mirrors a PaintCanvas into a collaborative session.
+    Local gestures reach the session through the canvas listener hooks and are
+    sent as ops: plain line strokes stream their points, other tools send their
+    finished items, so symmetry copies and soft brush dabs arrive as drawn. Entries from the server are drained on the Tk thread every
+    poll and applied to the document first, then to the canvas.
+    """
+    def __init__(self, canvas, client, poll_ms=16, on_layers_changed=None):
+        self.canvas = canvas
+        self.client = client
+        self.poll_ms = poll_ms
+        self.on_layers_changed = on_layers_changed
+        self.document = SessionDocument()
+        self.items = {}
+        self.object_of = {}
+        self.shapes = {}
+        self._uids = count(1)
+        self._press = (0, 0)
+        self._stroke = None
+        # Our in-progress stroke, once the server has turned it down
+        self._rejected = None
+        self._applying = False
+        canvas.layers[0].uid = BASE_LAYER
+        for layer in canvas.layers[1:]:
+            self.on_layer_added(layer)
+        canvas.listeners.append(self)
+        self._poll_id = canvas.after(poll_ms, self._poll)
+
+    def close(self):
+        """Detach from the canvas and disconnect."""
+        self.canvas.after_cancel(self._poll_id)
+        if self in self.canvas.listeners:
+            self.canvas.listeners.remove(self)
+        self.client.stop()
+
+    def _new_uid(self):
+        return f'{self.client.client_id}.{next(self._uids)}'
+
+    def _current_layer_uid(self):
+        return self.canvas.layers[self.canvas.current_layer].uid
+
+    def _register(self, obj, item_ids):
+        self.items[obj] = list(item_ids)
+        for item_id in item_ids:
+            self.object_of[item_id] = obj
+
+    def _forget(self, obj):
+        for item_id in self.items.pop(obj, ()):
+            self.object_of.pop(item_id, None)
+        shape = self.shapes.pop(obj, None)
+        if shape is not None:
+            self.canvas.shapes.discard(shape)
+
+    # --- Local canvas events ---
+    def on_press(self, tool, x, y):
+        self._press = (x, y)
+        self._stroke = None
+
+    def on_drag(self, tool, x, y):
+        if not tool.streamed:
+            return
+        if self._stroke is None:
+            self._stroke = self._new_uid()
+            self.client.send(['sb', self._stroke, self._current_layer_uid(), getattr(tool, 'color', 'white'), tool.size, *self._press])
+        self.client.send(['sp', self._stroke, [x, y]])
+
+    def on_release(self, tool, item_ids):
+        if self._stroke is not None:
+            if self._stroke == self._rejected:
+                # Turned down while still drawing, before its items were known
+                for item_id in item_ids:
+                    self.canvas.delete(item_id)
+            else:
+                self._register(self._stroke, item_ids)
+            self._stroke = self._rejected = None
+            return
+        from renderer import snapshot_item
+        layer = self._current_layer_uid()
+        for item_id in item_ids:
+            entry = snapshot_item(self.canvas, item_id)
+            if entry is None:
+                continue
+            kind, coords, options = entry
+            if kind == 'image' and item_id in self.canvas.sprites:
+                text, size, color = self.canvas.sprites[item_id]
+                kind, options = 'sprite', {'text': text, 'size': size, 'fill': color}
+            elif kind == 'image':
+                options = {'png': encode_image(options['image']), 'anchor': options['anchor']}
+            obj = self._new_uid()
+            self._register(obj, [item_id])
+            self.client.send(['oa', obj, layer, kind, coords, options])
+
+    def on_undo(self, item_ids):
+        for obj in {self.object_of.get(item_id) for item_id in item_ids} - {None}:
+            self.client.send(['od', obj])
+            self._forget(obj)
+
+    def on_items_deleted(self, item_ids):
+        self.on_undo(item_ids)
+
+    def on_shapes_changed(self, shapes):
+        for shape in shapes:
+            obj = self.object_of.get(shape.canvas_id)
+            if obj is not None:
+                self.client.send(['oe', obj, list(shape.coords())])
+
+    def on_layer_added(self, layer):
+        if self._applying:
+            return
+        layer.uid = self._new_uid()
+        self.client.send(['la', layer.uid, layer.name])
+
+    def on_layer_deleted(self, layer):
+        if not self._applying:
+            self.client.send(['ld', layer.uid])
+
+    def on_layers_reordered(self):
+        if self._applying:
+            return
+        order = [uid for uid in self.document.layers]
+        for index, layer in enumerate(self.canvas.layers):
+            if layer.uid in order and order.index(layer.uid) != index:
+                self.client.send(['lm', layer.uid, index])
+                order.remove(layer.uid)
+                order.insert(min(index, len(order)), layer.uid)
+
+    def on_layer_changed(self, layer):
+        info = self.document.layer_info.get(layer.uid)
+        if self._applying or info is None:
+            return
+        if info['visible'] != layer.visible:
+            self.client.send(['lv', layer.uid, layer.visible])
+        if info['name'] != layer.name:
+            self.client.send(['lr', layer.uid, layer.name])
+
+    # --- Remote entries ---
+    def _poll(self):
+        while True:
+            try:
+                entries = self.client.inbox.get_nowait()
+            except queue.Empty:
+                break
+            self._applying = True
+            try:
+                for seq, author, op in entries:
+                    self._apply(author, op, self.document.apply(seq, author, op))
+            finally:
+                self._applying = False
+        self._poll_id = self.canvas.after(self.poll_ms, self._poll)
+
+    def _apply(self, author, op, accepted):
+        kind, obj = op[0], op[1]
+        if kind.startswith('l'):
+            if accepted:
+                self._sync_layers()
+            return
+        if author == self.client.client_id:
+            if kind in ('sb', 'oa') and not accepted:
+                # Our item landed on a layer that was deleted first; drop it locally
+                if obj == self._stroke:
+                    self._rejected = obj
+                for item_id in self.items.get(obj, ()):
+                    self.canvas.delete(item_id)
+                self._forget(obj)
+            elif kind == 'oe' and accepted:
+                self._set_coords(obj, op[2])
+            return
+        if not accepted:
+            return
+        if kind in ('sb', 'oa'):
+            self._draw_object(obj)
+        elif kind == 'sp':
+            coords = self.document.objects[obj]['coords']
+            for item_id in self.items.get(obj, ()):
+                self.canvas.coords(item_id, *coords)
+        elif kind == 'oe':
+            self._set_coords(obj, op[2])
+        elif kind == 'od':
+            for item_id in self.items.get(obj, ()):
+                self.canvas.delete(item_id)
+            self._forget(obj)
+
+    def _draw_object(self, obj):
+        data = self.document.objects[obj]
+        layer = next((layer for layer in self.canvas.layers if layer.uid == data['layer']), None)
+        if layer is None:
+            return
+        kind, coords, options = data['kind'], data['coords'], data['options']
+        if kind == 'image' and 'png' in options:
+            try:
+                key = self.canvas.assets.add_image(decode_image(options['png']))
+            except (OSError, TypeError, ValueError):
+                # Not an image; nothing to draw
+                return
+            options = {'asset': key, 'anchor': options.get('anchor', 'nw')}
+        with self.canvas.drawing_on(layer):
+            item_id = self.canvas.create_from_snapshot(kind, coords, options, shape=kind in ('rectangle', 'oval'))
+        if item_id is None:
+            return
+        shape = self.canvas.shapes.find(item_id)
+        if shape is not None:
+            self.shapes[obj] = shape
+        self._register(obj, [item_id])
+
+    def _set_coords(self, obj, coords):
+        for item_id in self.items.get(obj, ()):
+            shape = self.canvas.shapes.find(item_id)
+            if shape is not None and len(coords) == 4:
+                shape.start, shape.end = tuple(coords[:2]), tuple(coords[2:])
+            self.canvas.coords(item_id, *coords)
+
+    def _sync_layers(self):
+        """Make the canvas layers match the document: membership, order, names and visibility."""
+        canvas, document = self.canvas, self.document
+        current = canvas.layers[canvas.current_layer]
+        for layer in list(canvas.layers):
+            if layer.uid in document.dead and len(canvas.layers) > 1:
+                canvas.delete_layer(canvas.layers.index(layer))
+        by_uid = {layer.uid: layer for layer in canvas.layers}
+        for uid in document.layers:
+            if uid not in by_uid:
+                by_uid[uid] = canvas.add_layer()
+                by_uid[uid].uid = uid
+        ordered = [by_uid[uid] for uid in document.layers]
+        ordered += [layer for layer in canvas.layers if layer.uid not in document.layer_info]
+        if ordered != canvas.layers:
+            canvas.layers[:] = ordered
+            canvas.restack_layers()
+        for index, layer in enumerate(canvas.layers):
+            info = document.layer_info.get(layer.uid)
+            if info is None:
+                continue
+            layer.name = info['name']
+            if layer.visible != info['visible']:
+                canvas.toggle_layer_visibility(index)
+        canvas.current_layer = canvas.layers.index(current) if current in canvas.layers else 0
+        for obj in [obj for obj in self.items if obj in document.dead]:
+            self._forget(obj)
+        if self.on_layers_changed:
+            self.on_layers_changed()
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Host a collaborative Paint App session.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+    server = CollabServer(args.host, args.port)
+    print(f"Serving Paint App session on {args.host}:{args.port}")
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
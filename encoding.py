@@ -0,0 +1,99 @@
+"""
+encoding.py - Automatic PNG/JPEG/WebP encoder settings for the Paint App
+
+Drawings made in this app are mostly flat colour with anti-aliased edges. Such
+images are palette-quantized before PNG encoding, which often halves the file,
+and they are stored losslessly in WebP. Photographic
+content keeps true colour. The zlib level and strategy follow a size/time
+target: 'fast', 'balanced' or 'small'.
+"""
+
+import os
+import time
+import zlib
+from io import BytesIO
+from PIL import Image
+
+FORMATS = {'.png': 'PNG', '.jpg': 'JPEG', '.jpeg': 'JPEG', '.webp': 'WEBP'}
+# zlib level for PNG, encoder method for WebP, and JPEG quality per target
+PNG_LEVELS = {'fast': 1, 'balanced': 6, 'small': 9}
+WEBP_METHODS = {'fast': 0, 'balanced': 4, 'small': 6}
+JPEG_QUALITY = {'fast': 80, 'balanced': 85, 'small': 78}
+# Share of pixels the 256 most common colours must cover for palette output
+FLAT_COVERAGE = 0.985
+
+class EncodeReport:
+    """What an encode wrote and how long it took."""
+    def __init__(self, path, format, nbytes, seconds, settings):
+        self.path = path
+        self.format = format
+        self.nbytes = nbytes
+        self.seconds = seconds
+        self.settings = settings
+
+    def __str__(self):
+        size = f"{self.nbytes / 1024:.1f} KB" if self.nbytes < 1 << 20 else f"{self.nbytes / (1 << 20):.2f} MB"
+        return f"Saved {os.path.basename(self.path)}: {size} in {self.seconds * 1000:.0f} ms ({self.settings})"
+
+def flat_colour_palette(image, max_colors=1 << 16):
+    """
+    Return the number of palette colours to quantize to, or None if the image is
+    photographic. Exact when the image has at most 256 colours.
+    """
+    sample = image if image.width * image.height <= 1 << 20 else image.reduce(max(2, round((image.width * image.height / (1 << 20)) ** 0.5)))
+    colors = sample.getcolors(max_colors)
+    if colors is None:
+        return None
+    if len(colors) <= 256:
+        return len(colors)
+    counts = sorted((count for count, _ in colors), reverse=True)
+    return 256 if sum(counts[:256]) >= FLAT_COVERAGE * sum(counts) else None
+
+def _flatten(image, background='white'):
+    if 'A' not in image.getbands():
+        return image.convert('RGB')
+    flat = Image.new('RGB', image.size, background)
+    flat.paste(image, mask=image.getchannel('A'))
+    return flat
+
+def prepare(image, format, target='balanced'):
+    """Return (image, save options, settings summary) for encoding image in the given format."""
+    if format == 'JPEG':
+        options = {'quality': JPEG_QUALITY[target], 'optimize': target != 'fast', 'subsampling': '4:2:0'}
+        if image.width * image.height > 256 * 256:
+            options['progressive'] = True
+        return _flatten(image), options, f"quality {options['quality']}"
+    colors = flat_colour_palette(image)
+    if format == 'WEBP':
+        method = WEBP_METHODS[target]
+        if colors is not None:
+            return image, {'lossless': True, 'method': method, 'quality': 80}, f"lossless, method {method}"
+        return image, {'quality': 82, 'method': method}, f"lossy, method {method}"
+    level = PNG_LEVELS[target]
+    if colors is not None:
+        mode = 'RGBA' if 'A' in image.getbands() else 'RGB'
+        method = Image.Quantize.FASTOCTREE if mode == 'RGBA' else Image.Quantize.MEDIANCUT
+        quantized = image.convert(mode).quantize(colors, method=method, dither=Image.Dither.NONE)
+        # Filtering rarely helps indexed data; run-length matching is fast and tight on flat areas
+        return quantized, {'compress_level': level, 'compress_type': zlib.Z_RLE if target == 'fast' else zlib.Z_DEFAULT_STRATEGY}, f"{colors}-colour palette, level {level}"
+    return image, {'compress_level': level, 'compress_type': zlib.Z_FILTERED}, f"true colour, level {level}"
+
+def encode(image, path, format=None, target='balanced'):
+    """Encode image to path with automatically chosen settings and return an EncodeReport."""
+    format = format or FORMATS.get(os.path.splitext(path)[1].lower(), 'PNG')
+    start = time.perf_counter()
+    if 'A' in image.getbands() and image.getchannel('A').getextrema() == (255, 255):
+        # Opaque renders do not need to carry an alpha channel
+        image = image.convert('RGB')
+    prepared, options, settings = prepare(image, format, target)
+    buffer = BytesIO()
+    prepared.save(buffer, format, **options)
+    if format == 'PNG' and target == 'small' and prepared.mode != 'P':
+        # Try the other strategy and keep whichever is smaller
+        alternative = BytesIO()
+        prepared.save(alternative, format, compress_level=9, compress_type=zlib.Z_DEFAULT_STRATEGY)
+        if alternative.tell() < buffer.tell():
+            buffer = alternative
+    with open(path, 'wb') as f:
+        f.write(buffer.getbuffer())
+    return EncodeReport(path, format, buffer.tell(), time.perf_counter() - start, settings)
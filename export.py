@@ -0,0 +1,79 @@
+"""
+export.py - Multi-resolution export presets for the Paint App
+
+The document is rendered once, at the largest scale any output asks for. Every
+smaller output is derived from a downscaling pyramid of that render: each
+level halves the one above with a cheap box reduce, and each output is resized
+from the smallest level that is still at least as large as the output. The
+encodes then run in parallel through encoding.encode(), so flat drawings get
+palette PNGs here too.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+from encoding import encode
+from renderer import iter_document, render
+
+class ExportPreset:
+    """One output of an export: a name suffix, a size rule, a format and an encoding.encode() target."""
+    def __init__(self, suffix, scale=1.0, max_size=None, format='PNG', ext='.png', target='balanced'):
+        self.suffix = suffix
+        self.scale = scale
+        self.max_size = max_size
+        self.format = format
+        self.ext = ext
+        self.target = target
+
+    def size_for(self, width, height):
+        """Pixel size of this output for a document of the given size."""
+        w, h = width * self.scale, height * self.scale
+        if self.max_size:
+            fit = min(1.0, self.max_size[0] / w, self.max_size[1] / h)
+            w, h = w * fit, h * fit
+        return max(1, round(w)), max(1, round(h))
+
+PRESETS = {
+    'full': ExportPreset(''),
+    '2x': ExportPreset('@2x', scale=2.0),
+    'web': ExportPreset('-web', max_size=(1280, 1280), format='JPEG', ext='.jpg', target='small'),
+    'thumbnail': ExportPreset('-thumb', max_size=(256, 256)),
+}
+
+def downscale_pyramid(image, sizes):
+    """Return {size: image} for each requested size, all derived from one source image."""
+    results = {}
+    level = image
+    for size in sorted(set(sizes), key=lambda s: s[0] * s[1], reverse=True):
+        # Halve while the next level would still cover the target
+        while level.width // 2 >= size[0] and level.height // 2 >= size[1]:
+            level = level.reduce(2)
+        results[size] = level if level.size == size else level.resize(size, Image.LANCZOS)
+    return results
+
+def _encode(image, path, preset):
+    return encode(image, path, preset.format, preset.target).path
+
+def export_items(items, size, base_path, presets=('full', '2x', 'web', 'thumbnail'), background='white', workers=None):
+    """
+    Render snapshotted items once and write one file per preset.
+    Files are named base_path + suffix + extension. Returns the written paths.
+    """
+    root, _ = os.path.splitext(base_path)
+    chosen = [PRESETS[name] if isinstance(name, str) else name for name in presets]
+    targets = [preset.size_for(*size) for preset in chosen]
+    scale = max(t[0] / size[0] for t in targets)
+    source = render(items, (max(1, round(size[0] * scale)), max(1, round(size[1] * scale))), scale, (0, 0), background)
+    if background:
+        # An opaque render needs no alpha channel to scale or encode
+        source = source.convert('RGB')
+    images = downscale_pyramid(source, targets)
+    with ThreadPoolExecutor(max_workers=workers or len(chosen)) as pool:
+        jobs = [pool.submit(_encode, images[target], root + preset.suffix + preset.ext, preset) for preset, target in zip(chosen, targets)]
+        return [job.result() for job in jobs]
+
+def export_canvas(canvas, base_path, presets=('full', '2x', 'web', 'thumbnail')):
+    """Export the drawing on the canvas's visible layers with the given presets."""
+    items = list(iter_document(canvas))
+    size = (max(1, canvas.winfo_width()), max(1, canvas.winfo_height()))
+    return export_items(items, size, base_path, presets, background=canvas.bg_color)
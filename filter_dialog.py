@@ -0,0 +1,148 @@
+"""
+filter_dialog.py - Filter dialog with live proxy preview for the Paint App
+"""
+
+import threading
+import tkinter as tk
+from filters import FILTERS, FilterJob, default_params, preview
+from renderer import render_snapshot
+
+class FilterDialog(tk.Toplevel):
+    """
+    Pick a filter and tune it against a small live preview of the active layer.
+    The layer is snapshotted on the Tk thread and rendered on a helper thread.
+    Apply filters that render tile by tile in the worker pool, rendering the
+    layer again first if it changed while the dialog was open, and polls for
+    finished tiles from after(), so the Tk loop keeps running. The filtered
+    raster then replaces the layer's items as one undoable action.
+    """
+    def __init__(self, parent, canvas, on_done=None, debounce_ms=60, poll_ms=50):
+        super().__init__(parent)
+        self.title("Filters")
+        self.canvas = canvas
+        self.on_done = on_done
+        self.debounce_ms = debounce_ms
+        self.poll_ms = poll_ms
+        self.layer = canvas.layers[canvas.current_layer]
+        self.raster = None
+        self.job = None
+        self._poll_id = None
+        self._pending_preview = None
+        self._photo = None
+        self.message = tk.Label(self, text="Rendering the layer...")
+        self.message.pack(padx=12, pady=12)
+        self.protocol('WM_DELETE_WINDOW', self._cancel)
+        self._render(self._build)
+
+    def _render(self, then):
+        """Snapshot the layer now, render it on a helper thread, then call then(rendered) from the Tk loop."""
+        self.item_ids = self.canvas.find_withtag(self.layer.content_tag)
+        self.version = self.layer.version
+        snapshot = self.canvas.snapshot_layer(self.layer)
+        result = []
+        thread = threading.Thread(target=lambda: result.append(render_snapshot(snapshot)), daemon=True)
+        thread.start()
+        def wait():
+            if thread.is_alive():
+                self._poll_id = self.after(self.poll_ms, wait)
+            else:
+                self._poll_id = None
+                then(result[0] if result else None)
+        wait()
+
+    def _build(self, rendered):
+        self.message.destroy()
+        if rendered is None:
+            tk.Label(self, text="The active layer is empty.").pack(padx=12, pady=12)
+            tk.Button(self, text="Close", command=self.destroy).pack(pady=(0, 8))
+            return
+        self.raster, self.origin = rendered
+        self.name_var = tk.StringVar(self, value=next(iter(FILTERS)))
+        self.name_var.trace_add('write', lambda *args: self._build_params())
+        tk.OptionMenu(self, self.name_var, *FILTERS).pack(fill=tk.X, padx=8, pady=4)
+        self.params_frame = tk.Frame(self)
+        self.params_frame.pack(fill=tk.X, padx=8)
+        self.preview_label = tk.Label(self, bg='#dddddd')
+        self.preview_label.pack(padx=8, pady=4)
+        self.status = tk.Label(self, anchor=tk.W)
+        self.status.pack(fill=tk.X, padx=8)
+        buttons = tk.Frame(self)
+        buttons.pack(pady=6)
+        self.apply_button = tk.Button(buttons, text="Apply", command=self._apply)
+        self.apply_button.pack(side=tk.LEFT, padx=4)
+        tk.Button(buttons, text="Cancel", command=self._cancel).pack(side=tk.LEFT, padx=4)
+        self._build_params()
+
+    def _build_params(self):
+        for child in self.params_frame.winfo_children():
+            child.destroy()
+        self.param_vars = {}
+        for key, (low, high, value) in FILTERS[self.name_var.get()].params.items():
+            var = tk.DoubleVar(self, value=value)
+            resolution = 1 if isinstance(low, int) and isinstance(high, int) else 0.1
+            tk.Scale(self.params_frame, label=key.title(), from_=low, to=high, resolution=resolution, orient=tk.HORIZONTAL, variable=var, command=lambda value: self._schedule_preview()).pack(fill=tk.X)
+            self.param_vars[key] = var
+        self._schedule_preview()
+
+    def params(self):
+        values = default_params(self.name_var.get())
+        for key, var in self.param_vars.items():
+            values[key] = type(values[key])(var.get())
+        return values
+
+    def _schedule_preview(self):
+        if self._pending_preview is not None:
+            self.after_cancel(self._pending_preview)
+        self._pending_preview = self.after(self.debounce_ms, self._show_preview)
+
+    def _show_preview(self):
+        from PIL import ImageTk
+        self._pending_preview = None
+        image, _ = preview(self.raster, self.name_var.get(), self.params())
+        self._photo = ImageTk.PhotoImage(image)
+        self.preview_label.config(image=self._photo)
+
+    def _apply(self):
+        self.apply_button.config(state=tk.DISABLED)
+        if self.layer not in self.canvas.layers:
+            self.status.config(text="The layer was deleted.")
+            return
+        if self.layer.version != self.version:
+            # The layer was drawn on, undone or moved since it was rendered
+            self.status.config(text="The layer changed; rendering it again...")
+            self._render(self._start_job)
+        else:
+            self._start_job((self.raster, self.origin))
+
+    def _start_job(self, rendered):
+        if rendered is None:
+            self.status.config(text="The active layer is empty.")
+            return
+        self.raster, self.origin = rendered
+        self.job = FilterJob(self.raster, self.name_var.get(), self.params()).start()
+        self._poll()
+
+    def _poll(self):
+        if not self.job.poll():
+            self.status.config(text=f"Filtering... {self.job.progress:.0%}")
+            self._poll_id = self.after(self.poll_ms, self._poll)
+            return
+        self._poll_id = None
+        if self.job.error is not None:
+            error = self.job.error
+            self.status.config(text=f"Filter failed: {str(error) or type(error).__name__}")
+            self.job = None
+            self.apply_button.config(state=tk.NORMAL)
+            return
+        self.canvas.replace_with_image(self.item_ids, *self.origin, self.job.result, layer=self.layer)
+        if self.on_done:
+            self.on_done()
+        self.destroy()
+
+    def _cancel(self):
+        for pending in (self._poll_id, self._pending_preview):
+            if pending is not None:
+                self.after_cancel(pending)
+        if self.job is not None:
+            self.job.cancel()
+        self.destroy()
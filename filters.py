@@ -0,0 +1,229 @@
+"""
+filters.py - Tiled image filters for the Paint App
+
+A filter runs on a layer's raster in overlapping tiles. Each tile carries a
+margin wide enough for the filter's kernel (its halo), is processed in a worker
+process, and only its interior is pasted back, so the seams match a single-pass
+result. While parameters change, the same filter runs in-process on a small
+proxy of the layer, with size-dependent parameters scaled to match.
+"""
+
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+from PIL import Image, ImageFilter, ImageOps
+
+TILE_SIZE = 1024
+PROXY_SIZE = 512
+
+def _blur(image, radius=4.0):
+    return image.filter(ImageFilter.GaussianBlur(radius))
+
+def _sharpen(image, radius=2.0, percent=150):
+    return image.filter(ImageFilter.UnsharpMask(radius, int(percent), 3))
+
+def _posterize(image, levels=4):
+    bits = max(1, min(8, math.ceil(math.log2(max(2, int(levels))))))
+    rgb = ImageOps.posterize(image.convert('RGB'), bits)
+    if 'A' in image.getbands():
+        rgb.putalpha(image.getchannel('A'))
+    return rgb
+
+def _hue_shift(image, degrees=30.0):
+    hsv = np.asarray(image.convert('RGB').convert('HSV')).copy()
+    hsv[..., 0] = (hsv[..., 0].astype(np.int16) + round(degrees * 256 / 360)) % 256
+    shifted = Image.fromarray(hsv, 'HSV').convert('RGB')
+    if 'A' in image.getbands():
+        shifted.putalpha(image.getchannel('A'))
+    return shifted
+
+def _pixelate(image, block=12):
+    # Exact block means, including the partial blocks at the right and bottom edges
+    block = max(1, int(block))
+    pixels = np.asarray(image, dtype=np.float32)
+    rows, cols = np.arange(0, image.height, block), np.arange(0, image.width, block)
+    sums = np.add.reduceat(np.add.reduceat(pixels, rows, axis=0), cols, axis=1)
+    heights, widths = np.diff(np.append(rows, image.height)), np.diff(np.append(cols, image.width))
+    counts = np.outer(heights, widths).reshape(len(rows), len(cols), *([1] * (pixels.ndim - 2)))
+    means = np.rint(sums / counts).astype(np.uint8)
+    return Image.fromarray(np.repeat(np.repeat(means, heights, axis=0), widths, axis=1), image.mode)
+
+class Filter:
+    """
+    An image filter with named parameters.
+    halo(params) is the margin in pixels a tile needs around it, `spatial` names
+    the parameters measured in pixels (scaled for proxy previews), and `grid`
+    names a parameter that tiles must be aligned to.
+    """
+    def __init__(self, name, function, params, halo=None, spatial=(), grid=None):
+        self.name = name
+        self.function = function
+        self.params = params
+        self.halo = halo or (lambda params: 0)
+        self.spatial = spatial
+        self.grid = grid
+
+    def __call__(self, image, params):
+        return self.function(image, **params)
+
+FILTERS = {f.name: f for f in (
+    Filter('Blur', _blur, {'radius': (0.5, 50.0, 4.0)}, halo=lambda p: math.ceil(3 * p['radius']), spatial=('radius',)),
+    Filter('Sharpen', _sharpen, {'radius': (0.5, 10.0, 2.0), 'percent': (10, 500, 150)}, halo=lambda p: math.ceil(3 * p['radius']), spatial=('radius',)),
+    Filter('Posterize', _posterize, {'levels': (2, 64, 4)}),
+    Filter('Hue Shift', _hue_shift, {'degrees': (-180.0, 180.0, 30.0)}),
+    Filter('Pixelate', _pixelate, {'block': (2, 128, 12)}, spatial=('block',), grid='block'),
+)}
+
+def default_params(name):
+    """Return the default parameter values of a filter."""
+    return {key: spec[2] for key, spec in FILTERS[name].params.items()}
+
+def tile_boxes(size, tile_size, halo):
+    """Yield (outer, inner) boxes covering an image of the given size; outer adds the halo."""
+    width, height = size
+    for y in range(0, height, tile_size):
+        for x in range(0, width, tile_size):
+            inner = (x, y, min(x + tile_size, width), min(y + tile_size, height))
+            outer = (max(0, x - halo), max(0, y - halo), min(width, inner[2] + halo), min(height, inner[3] + halo))
+            yield outer, inner
+
+def _run_tile(name, params, mode, size, data, crop):
+    """Worker entry point: filter one tile and return the bytes of its interior."""
+    tile = Image.frombytes(mode, size, data)
+    return FILTERS[name](tile, params).convert(mode).crop(crop).tobytes()
+
+def proxy_params(name, params, scale):
+    """Scale a filter's pixel-sized parameters for an image scaled by `scale`."""
+    scaled = dict(params)
+    for key in FILTERS[name].spatial:
+        scaled[key] = max(FILTERS[name].params[key][0], params[key] * scale)
+    return scaled
+
+def preview(image, name, params, max_size=PROXY_SIZE):
+    """Run a filter on a downscaled proxy of image. Returns (proxy result, scale)."""
+    scale = min(1.0, max_size / max(image.size))
+    proxy = image if scale == 1.0 else image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))), Image.BILINEAR)
+    return FILTERS[name](proxy, proxy_params(name, params, scale)), scale
+
+_pool = None
+
+def get_pool():
+    """Shared worker pool, started on first use with the spawn method so Tk is never forked."""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1, mp_context=multiprocessing.get_context('spawn'))
+    return _pool
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+class FilterJob:
+    """
+    A filter applied to a full image, tile by tile, in the worker pool.
+    start() returns at once while a helper thread hands the tiles to the pool;
+    poll() pastes the tiles that have finished and returns True when the whole
+    result is ready, so the Tk loop can call it from after() without blocking.
+    If a tile fails, or the pool breaks, poll() returns True with `error` set.
+    """
+    def __init__(self, image, name, params, tile_size=TILE_SIZE, executor=None):
+        self.source = image
+        self.name = name
+        self.params = dict(params)
+        self.executor = executor
+        self.result = Image.new(image.mode, image.size)
+        self.tile_size = tile_size
+        grid = FILTERS[name].grid
+        if grid:
+            # Pixelate blocks must not straddle tile edges
+            block = max(1, int(self.params[grid]))
+            self.tile_size = max(block, tile_size // block * block)
+        self._pending = []
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._submitter = None
+        self._pasted = 0
+        self.total = 0
+        self.error = None
+
+    def start(self):
+        """Submit the tiles from a helper thread, so cropping and pickling do not block the caller."""
+        executor = self.executor or get_pool()
+        boxes = list(tile_boxes(self.source.size, self.tile_size, FILTERS[self.name].halo(self.params)))
+        self.total = len(boxes)
+        self._submitter = threading.Thread(target=self._submit, args=(executor, boxes), daemon=True)
+        self._submitter.start()
+        return self
+
+    def _submit(self, executor, boxes):
+        for outer, inner in boxes:
+            if self._cancelled:
+                return
+            tile = self.source.crop(outer)
+            crop = (inner[0] - outer[0], inner[1] - outer[1], inner[2] - outer[0], inner[3] - outer[1])
+            try:
+                future = executor.submit(_run_tile, self.name, self.params, tile.mode, tile.size, tile.tobytes(), crop)
+            except Exception as e:
+                # A broken or shut down pool takes no more work
+                self._fail(e)
+                return
+            with self._lock:
+                self._pending.append((inner, future))
+
+    @property
+    def progress(self):
+        return 1.0 if not self.total else self._pasted / self.total
+
+    def poll(self):
+        """Paste finished tiles; return True once every tile is in or the job has failed."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        still_running = []
+        for inner, future in pending:
+            if self.error is not None or not future.done():
+                still_running.append((inner, future))
+                continue
+            try:
+                data = future.result()
+            except Exception as e:
+                self._fail(e)
+                continue
+            size = (inner[2] - inner[0], inner[3] - inner[1])
+            self.result.paste(Image.frombytes(self.result.mode, size, data), inner[:2])
+            self._pasted += 1
+        with self._lock:
+            self._pending[:0] = still_running
+        if self.error is not None:
+            self.cancel()
+            return True
+        return self._pasted == self.total
+
+    def _fail(self, error):
+        self.error = error
+        self._cancelled = True
+        if isinstance(error, BrokenProcessPool) and self.executor is None:
+            # Start a fresh shared pool on the next job
+            shutdown_pool()
+
+    def cancel(self):
+        self._cancelled = True
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for _, future in pending:
+            future.cancel()
+
+    def wait(self):
+        """Block until the result is complete and return it."""
+        self._submitter.join()
+        with self._lock:
+            pending = list(self._pending)
+        for _, future in pending:
+            future.result()
+        self.poll()
+        return self.result
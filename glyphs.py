@@ -0,0 +1,79 @@
+"""
+glyphs.py - Pre-rasterized text and emoji sprites for the Paint App
+
+Shaping colour emoji through Tk fonts is slow, and Tk text items cannot be
+rendered offscreen for export. The GlyphAtlas rasterizes each text run once per
+size and colour with Pillow and stores the result in the canvas AssetStore, so
+every further stamp is a single image placement sharing one PhotoImage.
+"""
+
+from PIL import Image, ImageDraw, ImageFont
+
+# Tk font sizes are in points; sprites are rasterized at screen resolution
+POINTS_TO_PIXELS = 96 / 72
+EMOJI_FONTS = ['seguiemj.ttf', 'Apple Color Emoji.ttc', 'NotoColorEmoji.ttf']
+TEXT_FONTS = ['comicbd.ttf', 'Comic Sans MS Bold.ttf', 'DejaVuSans-Bold.ttf', 'arialbd.ttf', 'Arial Bold.ttf']
+# Bitmap colour emoji fonts only come in this strike size
+NOTO_EMOJI_SIZE = 109
+
+def is_emoji(text):
+    """True if the text contains characters from the emoji and pictograph blocks."""
+    return any(ord(ch) >= 0x1F000 or 0x2600 <= ord(ch) <= 0x27BF or 0x2B00 <= ord(ch) <= 0x2BFF for ch in text)
+
+def _truetype(names, size):
+    for name in names:
+        for candidate in (size, NOTO_EMOJI_SIZE):
+            try:
+                return ImageFont.truetype(name, candidate)
+            except OSError:
+                continue
+    return None
+
+def rasterize(text, size, color='black'):
+    """Draw a text run into a tightly cropped RGBA image at the given point size."""
+    pixels = max(1, round(size * POINTS_TO_PIXELS))
+    font = _truetype(EMOJI_FONTS if is_emoji(text) else TEXT_FONTS, pixels)
+    if font is None:
+        font = _truetype(TEXT_FONTS, pixels)
+    if font is None:
+        try:
+            font = ImageFont.load_default(pixels)
+        except TypeError:
+            # Pillow older than 10.1 only has the fixed-size bitmap font
+            font = ImageFont.load_default()
+    x0, y0, x1, y1 = font.getbbox(text)
+    image = Image.new('RGBA', (max(1, x1 - x0), max(1, y1 - y0)))
+    ImageDraw.Draw(image).text((-x0, -y0), text, fill=color, font=font, embedded_color=True)
+    font_size = getattr(font, 'size', pixels)
+    if font_size != pixels:
+        # A fixed-strike font was drawn at its own size; scale to the request
+        scale = pixels / font_size
+        image = image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))), Image.LANCZOS)
+    return image
+
+class GlyphAtlas:
+    """
+    Cache of rasterized text runs keyed by (text, size, color).
+    sprite() returns an AssetStore key; the store shares the decoded image and its
+    PhotoImage between every placement.
+    """
+    def __init__(self, assets):
+        self.assets = assets
+        self.keys = {}
+
+    def sprite(self, text, size, color='black'):
+        """Return the asset key for the text run, rasterizing it on first use."""
+        spec = (text, size, color)
+        key = self.keys.get(spec)
+        if key is None:
+            key = self.keys[spec] = self.assets.add_image(rasterize(text, size, color))
+        return key
+
+    def warm(self, texts, size, color='black'):
+        """Rasterize several runs ahead of time, e.g. every emoji a tool can stamp."""
+        for text in texts:
+            self.sprite(text, size, color)
+
+    def clear(self):
+        """Forget every rasterized run; call it when the asset store is cleared."""
+        self.keys.clear()
@@ -0,0 +1,151 @@
+"""
+gradients.py - Linear, radial and conic gradients for the Paint App
+
+A gradient is drawn in two steps. The colour stops are interpolated once into
+a ramp of RAMP_SIZE RGBA entries, and every pixel then looks up its colour by
+index. The index comes from array math on the pixel grid: a projection onto the
+handle direction for linear gradients, the distance to the centre for radial
+ones, and the angle around the centre for conic ones.
+
+Distances and angles are the costly part. They are computed once per canvas
+size, in 16-bit fixed point, over a grid twice the canvas size. Any centre on
+the canvas is then a window into that field. A 65536-entry colour table maps
+field values straight to pixels for the current radius or start angle, so a
+frame is one table lookup. Ramps are cached by stops, fields by (type, size),
+and finished images by (type, stops, size, handles), so a preview that
+returns to an earlier handle position costs nothing.
+"""
+
+import math
+from collections import OrderedDict
+import numpy as np
+from PIL import Image, ImageColor
+
+GRADIENT_TYPES = ('linear', 'radial', 'conic')
+RAMP_SIZE = 1024
+# Conic angles are stored as 16-bit fractions of a turn, radial distances in eighths of a pixel
+ANGLE_STEPS = 1 << 16
+DISTANCE_STEPS = 8
+FIELD_LIMIT = 1 << 16
+# Finished images kept for reuse, by estimated size
+IMAGE_CACHE_BYTES = 64 << 20
+
+def normalize_stops(stops):
+    """
+    Sorted ((position, (r, g, b, a)), ...) from stops given as (position, colour)
+    pairs or as text like '0:#ff0000, 0.5:yellow, 1:blue'. Positions run from 0 to 1.
+    """
+    if isinstance(stops, str):
+        stops = [part.split(':', 1) for part in stops.split(',') if part.strip()]
+    normalized = []
+    for position, color in stops:
+        position = min(1.0, max(0.0, float(position)))
+        color = tuple(color) if not isinstance(color, str) else ImageColor.getcolor(color.strip(), 'RGBA')
+        normalized.append((position, color if len(color) == 4 else color + (255,)))
+    if not normalized:
+        raise ValueError("A gradient needs at least one colour stop")
+    return tuple(sorted(normalized, key=lambda stop: stop[0]))
+
+def make_ramp(stops, size=RAMP_SIZE):
+    """Interpolate normalized stops into a (size,) uint32 array of packed RGBA pixels."""
+    positions = [position for position, _ in stops]
+    samples = np.linspace(0.0, 1.0, size)
+    ramp = np.empty((size, 4), np.uint8)
+    for channel in range(4):
+        ramp[:, channel] = np.round(np.interp(samples, positions, [color[channel] for _, color in stops]))
+    return ramp.view(np.uint32).ravel()
+
+def polar_field(kind, xs, ys):
+    """
+    uint16 (len(ys), len(xs)) grid of pixel offsets from a centre: distances in
+    DISTANCE_STEPS per pixel, or angles as fractions of a turn clockwise from
+    the +x axis (y grows downward).
+    """
+    if kind == 'radial':
+        steps = np.hypot(ys[:, None], xs[None, :]) * np.float32(DISTANCE_STEPS)
+        # Distances past the 16-bit range are clamped to it
+        np.minimum(steps, FIELD_LIMIT - 1, out=steps)
+        return steps.astype(np.uint16)
+    steps = np.arctan2(ys[:, None], xs[None, :]) * np.float32(ANGLE_STEPS / (2 * math.pi))
+    # Negative angles wrap to the top of the turn
+    return steps.astype(np.int32).astype(np.uint16)
+
+class GradientCache:
+    """Renders gradients into RGBA images, caching ramps, polar fields and recent images."""
+    def __init__(self, max_bytes=IMAGE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.ramps = {}
+        self.fields = {}
+        self.images = OrderedDict()
+        self.cached_bytes = 0
+
+    def ramp(self, stops):
+        ramp = self.ramps.get(stops)
+        if ramp is None:
+            ramp = self.ramps[stops] = make_ramp(stops)
+        return ramp
+
+    def _field(self, kind, size, cx, cy):
+        """The polar field of every pixel of a size image around (cx, cy)."""
+        width, height = size
+        if not (0 <= cx <= width and 0 <= cy <= height):
+            # Off-canvas centres are rare; compute just this window
+            return polar_field(kind, np.arange(-cx, width - cx, dtype=np.float32) + 0.5, np.arange(-cy, height - cy, dtype=np.float32) + 0.5)
+        field = self.fields.get((kind, size))
+        if field is None:
+            # Only the current canvas size is worth keeping
+            self.fields = {key: value for key, value in self.fields.items() if key[1] == size}
+            field = self.fields[(kind, size)] = polar_field(kind, np.arange(-width, width, dtype=np.float32) + 0.5, np.arange(-height, height, dtype=np.float32) + 0.5)
+        return field[height - cy:2 * height - cy, width - cx:2 * width - cx]
+
+    def _pixels(self, kind, ramp, size, start, end):
+        """Packed RGBA pixels of a gradient: uint32 (height, width)."""
+        width, height = size
+        (x0, y0), (x1, y1) = start, end
+        dx, dy = x1 - x0, y1 - y0
+        last = RAMP_SIZE - 1
+        if kind == 'linear':
+            scale = last / max(dx * dx + dy * dy, 1e-9)
+            xs = (np.arange(width, dtype=np.float32) + np.float32(0.5 - x0)) * np.float32(dx * scale)
+            ys = (np.arange(height, dtype=np.float32) + np.float32(0.5 - y0)) * np.float32(dy * scale)
+            t = ys[:, None] + xs[None, :]
+            np.clip(t, 0, last, out=t)
+            return np.take(ramp, t.astype(np.uint16))
+        steps = np.arange(FIELD_LIMIT)
+        if kind == 'radial':
+            radius = max(math.hypot(dx, dy), 1e-9) * DISTANCE_STEPS
+            colors = ramp[np.minimum(steps * (last / radius), last).astype(np.uint16)]
+        elif kind == 'conic':
+            offset = round(math.atan2(dy, dx) / (2 * math.pi) * ANGLE_STEPS)
+            colors = ramp[((steps - offset) % ANGLE_STEPS) * RAMP_SIZE // ANGLE_STEPS]
+        else:
+            raise ValueError(f"Unknown gradient type: {kind}")
+        return np.take(colors, self._field(kind, size, x0, y0))
+
+    def render(self, kind, stops, size, start, end):
+        """
+        An RGBA image of the given size filled with a gradient running from the
+        start handle to the end handle: along the line, out to the radius, or
+        once around the centre. stops must come from normalize_stops().
+        """
+        size = (max(1, int(size[0])), max(1, int(size[1])))
+        start, end = (round(start[0]), round(start[1])), (round(end[0]), round(end[1]))
+        key = (kind, stops, size, start, end)
+        image = self.images.get(key)
+        if image is not None:
+            self.images.move_to_end(key)
+            return image
+        pixels = self._pixels(kind, self.ramp(stops), size, start, end)
+        image = Image.fromarray(pixels.view(np.uint8).reshape(size[1], size[0], 4), 'RGBA')
+        self.images[key] = image
+        self.cached_bytes += size[0] * size[1] * 4
+        while self.cached_bytes > self.max_bytes and len(self.images) > 1:
+            _, old = self.images.popitem(last=False)
+            self.cached_bytes -= old.width * old.height * 4
+        return image
+
+    def clear(self):
+        self.ramps.clear()
+        self.fields.clear()
+        self.images.clear()
+        self.cached_bytes = 0
@@ -0,0 +1,185 @@
+"""
+image_browser.py - Thumbnail image browser for the Paint App
+"""
+
+import os
+import queue
+import tkinter as tk
+from thumbnails import IMAGE_EXTENSIONS, list_images
+
+CELL_WIDTH = 120
+CELL_HEIGHT = 124
+SELECTED_FILL = '#ffe066'
+
+class ImageBrowser(tk.Toplevel):
+    """
+    Browse a folder as a grid of thumbnails and pick one image.
+    Thumbnails come from a ThumbnailCache: the background pool reads cached
+    entries or generates missing ones, and finished results are drawn from an
+    after() poll, so large folders open without blocking the Tk loop. Folders
+    open on double-click; choosing a file calls on_choose(path) and closes.
+    """
+    def __init__(self, parent, cache, on_choose, directory=None, title="Open Image", action="Open", extensions=IMAGE_EXTENSIONS, poll_ms=30):
+        super().__init__(parent)
+        self.title(title)
+        self.geometry("780x560")
+        self.cache = cache
+        self.on_choose = on_choose
+        self.extensions = extensions
+        self.poll_ms = poll_ms
+        self.directory = None
+        self.entries = []
+        self.cells = []
+        self.photos = {}
+        self.selected = None
+        self._columns = 0
+        self._generation = 0
+        self._futures = []
+        self._results = queue.SimpleQueue()
+        top = tk.Frame(self)
+        top.pack(fill=tk.X, padx=6, pady=4)
+        tk.Button(top, text="Up", command=self._up).pack(side=tk.LEFT)
+        self.path_var = tk.StringVar(self)
+        path_entry = tk.Entry(top, textvariable=self.path_var)
+        path_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=4)
+        path_entry.bind('<Return>', lambda e: self.show(self.path_var.get()))
+        body = tk.Frame(self)
+        body.pack(fill=tk.BOTH, expand=True, padx=6)
+        self.grid_view = tk.Canvas(body, bg='white', highlightthickness=0)
+        scrollbar = tk.Scrollbar(body, orient=tk.VERTICAL, command=self.grid_view.yview)
+        self.grid_view.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.grid_view.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.grid_view.bind('<Configure>', lambda e: self._layout())
+        self.grid_view.bind('<Button-1>', self._on_click)
+        self.grid_view.bind('<Double-Button-1>', self._on_double_click)
+        self.grid_view.bind('<MouseWheel>', lambda e: self.grid_view.yview_scroll(-1 if e.delta > 0 else 1, 'units'))
+        self.status = tk.Label(self, anchor=tk.W)
+        self.status.pack(fill=tk.X, padx=6)
+        buttons = tk.Frame(self)
+        buttons.pack(pady=6)
+        tk.Button(buttons, text=action, command=self._choose).pack(side=tk.LEFT, padx=4)
+        tk.Button(buttons, text="Cancel", command=self.destroy).pack(side=tk.LEFT, padx=4)
+        self.bind('<Return>', lambda e: self._choose())
+        self.bind('<Escape>', lambda e: self.destroy())
+        self._poll_id = self.after(self.poll_ms, self._poll)
+        self.show(directory or os.getcwd())
+
+    def show(self, directory):
+        """List a folder, drawing its cells at once and queueing its thumbnails."""
+        try:
+            folders, files = list_images(directory, self.extensions)
+        except OSError as e:
+            self.status.config(text=str(e))
+            return
+        self._cancel_pending()
+        self._generation += 1
+        self.directory = os.path.abspath(directory)
+        self.path_var.set(self.directory)
+        self.entries = folders + files
+        self.selected = None
+        self.photos.clear()
+        self.grid_view.delete('all')
+        self.cells = []
+        for path in self.entries:
+            name = os.path.basename(path)
+            label = name if len(name) <= 16 else name[:15] + '…'
+            box = self.grid_view.create_rectangle(0, 0, 0, 0, outline='', fill='')
+            if path in folders:
+                icon, font = '📁', ('Arial', 28)
+            elif path.lower().endswith(IMAGE_EXTENSIONS):
+                icon, font = '…', ('Arial', 12)
+            else:
+                # Files the thumbnail cache cannot read, such as SVG, show their type instead
+                icon, font = os.path.splitext(path)[1][1:].upper(), ('Arial', 18, 'bold')
+            thumb = self.grid_view.create_text(0, 0, text=icon, font=font)
+            text = self.grid_view.create_text(0, 0, text=label, width=CELL_WIDTH - 8)
+            self.cells.append((box, thumb, text))
+        self._columns = 0
+        self._layout()
+        self.grid_view.yview_moveto(0)
+        generation = self._generation
+        for index, path in enumerate(files, start=len(folders)):
+            if path.lower().endswith(IMAGE_EXTENSIONS):
+                future = self.cache.submit(path)
+                future.add_done_callback(lambda f, index=index: self._results.put((generation, index, f)))
+                self._futures.append(future)
+        self.status.config(text=f"{len(folders)} folders, {len(files)} images")
+
+    def _layout(self):
+        columns = max(1, self.grid_view.winfo_width() // CELL_WIDTH)
+        if columns == self._columns:
+            return
+        self._columns = columns
+        for index, (box, thumb, text) in enumerate(self.cells):
+            x, y = index % columns * CELL_WIDTH, index // columns * CELL_HEIGHT
+            self.grid_view.coords(box, x + 2, y + 2, x + CELL_WIDTH - 2, y + CELL_HEIGHT - 2)
+            self.grid_view.coords(thumb, x + CELL_WIDTH / 2, y + 54)
+            self.grid_view.coords(text, x + CELL_WIDTH / 2, y + 112)
+        rows = -(-len(self.cells) // columns)
+        self.grid_view.configure(scrollregion=(0, 0, columns * CELL_WIDTH, rows * CELL_HEIGHT))
+
+    def _poll(self):
+        from PIL import ImageTk
+        while True:
+            try:
+                generation, index, future = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if generation != self._generation or future.cancelled() or future.exception() is not None:
+                continue
+            image = future.result()
+            _, thumb, _ = self.cells[index]
+            if image is None:
+                self.grid_view.itemconfig(thumb, text='?')
+                continue
+            x, y = self.grid_view.coords(thumb)
+            self.grid_view.delete(thumb)
+            self.photos[index] = ImageTk.PhotoImage(image)
+            thumb = self.grid_view.create_image(x, y, image=self.photos[index])
+            self.cells[index] = (self.cells[index][0], thumb, self.cells[index][2])
+        self._poll_id = self.after(self.poll_ms, self._poll)
+
+    def _index_at(self, event):
+        x, y = self.grid_view.canvasx(event.x), self.grid_view.canvasy(event.y)
+        column, row = int(x // CELL_WIDTH), int(y // CELL_HEIGHT)
+        index = row * self._columns + column
+        return index if column < self._columns and 0 <= index < len(self.entries) else None
+
+    def _on_click(self, event):
+        index = self._index_at(event)
+        if self.selected is not None:
+            self.grid_view.itemconfig(self.cells[self.selected][0], fill='')
+        self.selected = index
+        if index is not None:
+            self.grid_view.itemconfig(self.cells[index][0], fill=SELECTED_FILL)
+            self.status.config(text=self.entries[index])
+
+    def _on_double_click(self, event):
+        self._on_click(event)
+        self._choose()
+
+    def _choose(self):
+        if self.selected is None:
+            return
+        path = self.entries[self.selected]
+        if os.path.isdir(path):
+            self.show(path)
+            return
+        self.destroy()
+        self.on_choose(path)
+
+    def _up(self):
+        parent = os.path.dirname(self.directory)
+        if parent != self.directory:
+            self.show(parent)
+
+    def _cancel_pending(self):
+        for future in self._futures:
+            future.cancel()
+        self._futures = []
+
+    def destroy(self):
+        self._cancel_pending()
+        self.after_cancel(self._poll_id)
+        super().destroy()
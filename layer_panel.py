@@ -0,0 +1,177 @@
+"""
+layer_panel.py - Layer sidebar with cached thumbnails for the Paint App
+"""
+
+import queue
+import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from renderer import iter_snapshot, render
+
+ROW_BG = '#ffffff'
+SELECTED_BG = '#ffe066'
+
+class LayerRow:
+    """Widgets showing one layer: a thumbnail and its name."""
+    def __init__(self, parent, layer, on_click):
+        self.layer = layer
+        self.index = None
+        self.text = None
+        self.photo = None
+        self.frame = tk.Frame(parent, bg=ROW_BG, bd=1, relief=tk.GROOVE)
+        self.thumb_label = tk.Label(self.frame, bg=ROW_BG, width=6, height=2)
+        self.thumb_label.pack(side=tk.LEFT, padx=2, pady=2)
+        self.name_label = tk.Label(self.frame, bg=ROW_BG, anchor=tk.W)
+        self.name_label.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        for widget in (self.frame, self.thumb_label, self.name_label):
+            widget.bind('<Button-1>', lambda e: on_click(layer))
+
+    def set_background(self, color):
+        for widget in (self.frame, self.thumb_label, self.name_label):
+            widget.config(bg=color)
+
+class LayerPanel(tk.Frame):
+    """
+    Scrollable list of layer rows with thumbnails.
+    refresh() diffs the canvas layers against the existing rows and only creates,
+    removes, re-grids or relabels the rows that changed. Thumbnails are cached by
+    layer version: a stale layer is snapshotted a few items per tick on the Tk
+    thread, then rendered at thumbnail resolution on a worker thread. The worker
+    is started on demand and released when the document is reset.
+    """
+    def __init__(self, parent, canvas, on_select=None, thumb_size=(48, 36), interval=300, items_per_tick=300):
+        super().__init__(parent)
+        self.canvas = canvas
+        self.on_select = on_select
+        self.thumb_size = thumb_size
+        self.interval = interval
+        self.items_per_tick = items_per_tick
+        self.rows = {}
+        self.selected = None
+        self._highlighted = None
+        self._thumb_versions = {}
+        self._job = None
+        self._results = queue.SimpleQueue()
+        self._executor = None
+        self._view = tk.Canvas(self, width=160, highlightthickness=0)
+        scrollbar = tk.Scrollbar(self, orient=tk.VERTICAL, command=self._view.yview)
+        self._view.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self._view.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.inner = tk.Frame(self._view)
+        self.inner.columnconfigure(0, weight=1)
+        self._view.create_window(0, 0, window=self.inner, anchor=tk.NW)
+        self.inner.bind('<Configure>', lambda e: self._view.configure(scrollregion=self._view.bbox('all')))
+        self.refresh()
+        canvas.listeners.append(self)
+        self._tick_id = self.after(self.interval, self._tick)
+
+    def on_document_reset(self):
+        """Drop thumbnail work for the old document and stop the worker thread."""
+        self._job = None
+        self._thumb_versions.clear()
+        self._results = queue.SimpleQueue()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def refresh(self):
+        """Bring the rows in line with the canvas layers, touching only what changed."""
+        layers = self.canvas.layers
+        live = set(layers)
+        for layer in [layer for layer in self.rows if layer not in live]:
+            row = self.rows.pop(layer)
+            row.frame.destroy()
+            self._thumb_versions.pop(layer, None)
+            if self._highlighted is row:
+                self._highlighted = None
+        for index, layer in enumerate(layers):
+            row = self.rows.get(layer)
+            if row is None:
+                row = self.rows[layer] = LayerRow(self.inner, layer, self._select)
+            if row.index != index:
+                row.frame.grid(row=index, column=0, sticky='ew')
+                row.index = index
+            text = f"{layer.name}{' (hidden)' if not layer.visible else ''}"
+            if row.text != text:
+                row.name_label.config(text=text)
+                row.text = text
+        if self.selected not in live:
+            self.selected = None
+        self._highlight()
+
+    def curselection(self):
+        """Return the selected layer index as a tuple, like Listbox.curselection()."""
+        if self.selected is None:
+            return ()
+        return (self.canvas.layers.index(self.selected),)
+
+    def select_index(self, index):
+        """Select the layer at the given index without calling on_select."""
+        if 0 <= index < len(self.canvas.layers):
+            self.selected = self.canvas.layers[index]
+            self._highlight()
+
+    def _select(self, layer):
+        self.selected = layer
+        self._highlight()
+        if self.on_select:
+            self.on_select(self.canvas.layers.index(layer))
+
+    def _highlight(self):
+        row = self.rows.get(self.selected)
+        if row is self._highlighted:
+            return
+        if self._highlighted is not None:
+            self._highlighted.set_background(ROW_BG)
+        if row is not None:
+            row.set_background(SELECTED_BG)
+        self._highlighted = row
+
+    def _tick(self):
+        """Apply finished thumbnails and advance the current snapshot by one chunk."""
+        self._apply_results()
+        self._advance_snapshot()
+        self._tick_id = self.after(self.interval, self._tick)
+
+    def _advance_snapshot(self):
+        if self._job is None:
+            layer = next((layer for layer in self.canvas.layers if self._thumb_versions.get(layer) != layer.version), None)
+            if layer is None:
+                return
+            self._job = (layer, layer.version, iter_snapshot(self.canvas, layer.content_tag, include_hidden=True), [])
+        layer, version, pending, items = self._job
+        chunk = list(islice(pending, self.items_per_tick))
+        items.extend(chunk)
+        if len(chunk) == self.items_per_tick:
+            return
+        self._job = None
+        self._thumb_versions[layer] = version
+        width, height = self.thumb_size
+        scale = min(width / max(1, self.canvas.winfo_width()), height / max(1, self.canvas.winfo_height()))
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='layer-thumbnails')
+        results = self._results
+        future = self._executor.submit(render, items, self.thumb_size, scale, (0, 0), 'white')
+        future.add_done_callback(lambda f: results.put((layer, f)))
+
+    def _apply_results(self):
+        from PIL import ImageTk
+        while True:
+            try:
+                layer, future = self._results.get_nowait()
+            except queue.Empty:
+                return
+            row = self.rows.get(layer)
+            if row is None or future.exception() is not None:
+                continue
+            row.photo = ImageTk.PhotoImage(future.result())
+            row.thumb_label.config(image=row.photo, width=self.thumb_size[0], height=self.thumb_size[1])
+
+    def destroy(self):
+        self.after_cancel(self._tick_id)
+        if self in self.canvas.listeners:
+            self.canvas.listeners.remove(self)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        super().destroy()
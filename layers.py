@@ -0,0 +1,43 @@
+"""
+layers.py - Vector layers for the Paint App
+"""
+
+LAYER_MARKER_TAG = 'layer_marker'
+# Items replaced by a raster of their layer; kept hidden so undo can bring them back
+ARCHIVED_TAG = 'archived'
+# Marquee outlining the region marked for copy and cut
+REGION_TAG = 'region'
+# Tinted overlay showing the pixel selection mask; it belongs to no layer
+MASK_TAG = 'mask_overlay'
+# Selection boxes, rubber bands and tool previews: drawn over the layers but part of none
+CHROME_TAG = 'chrome'
+
+class Layer:
+    """
+    A named group of canvas items. Every item on the layer carries the layer's tag,
+    so the whole layer can be raised, lowered, hidden or deleted with a single
+    canvas call. Each layer also owns one hidden marker item that anchors its
+    position in the stacking order while the layer is empty. `version` is bumped
+    whenever the layer's content changes, so caches can tell when to refresh.
+    """
+    _id_counter = 0
+    def __init__(self, name):
+        Layer._id_counter += 1
+        self.tag = f'layer{Layer._id_counter}'
+        self.name = name
+        self.visible = True
+        self.marker_id = None
+        self.version = 0
+        # Identifier shared with other clients in a collaborative session
+        self.uid = None
+        # Snapshots of items flattened into raster tiles, bottom to top, and the tiles by (column, row)
+        self.baked = []
+        self.tiles = {}
+        # RasterPlane that filters, cuts and fills paint into, and the image item showing it
+        self.raster = None
+        self.raster_id = None
+
+    @property
+    def content_tag(self):
+        """Tag expression matching the layer's drawn items but not its marker or archived items."""
+        return f'{self.tag}&&!{LAYER_MARKER_TAG}&&!{ARCHIVED_TAG}'
@@ -22,6 +22,15 @@ def load_plugins(app):
                 module.register(app)
 
 
+def start_watchdog(root):
+    """Start the stall watchdog if PAINT_STALL_MS sets its threshold in milliseconds."""
+    threshold = os.environ.get('PAINT_STALL_MS')
+    if not threshold:
+        return None
+    from stall_watchdog import StallWatchdog
+    return StallWatchdog(root, threshold=float(threshold) / 1000).start()
+
+
 def show_splash(root, on_close):
     splash = tk.Toplevel(root)
     splash.overrideredirect(True)
@@ -44,12 +53,19 @@ def show_splash(root, on_close):
 def main():
     root = tk.Tk()
     root.withdraw()  # Hide main window initially
+    watchdog = start_watchdog(root)
+    apps = []
     def start_app():
         root.deiconify()
         app = PaintAppUI(root)
+        apps.append(app)
         load_plugins(app)
     show_splash(root, start_app)
     root.mainloop()
+    for app in apps:
+        app.shutdown()
+    if watchdog:
+        watchdog.stop()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,244 @@
+"""
+masks.py - Pixel selection masks for the Paint App
+
+A Mask is a uint8 coverage array (0 outside, 255 inside, anything between
+after feathering) cropped to its bounding box, plus the canvas position of its
+top-left pixel. Set operations align two masks in their combined box with
+whole-array maximum/minimum, moving only changes the offset, and feathering
+and filling run in Pillow.
+
+The magic wand thresholds the colour distance to the seed pixel for the whole
+image at once. It then finds the region connected to the seed without a
+per-pixel flood fill. The matching pixels are split into horizontal runs, runs
+on neighbouring rows that overlap are linked, and a vectorized union-find
+labels the linked runs.
+"""
+
+import math
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter
+
+class Mask:
+    """A selection: coverage array cropped to its bounding box, at offset (x, y) on the canvas."""
+    def __init__(self, array, offset=(0, 0)):
+        self.array = np.asarray(array, dtype=np.uint8)
+        self.offset = (int(offset[0]), int(offset[1]))
+
+    @classmethod
+    def empty(cls):
+        return cls(np.zeros((0, 0), np.uint8))
+
+    @classmethod
+    def rectangle(cls, x0, y0, x1, y1):
+        x0, x1 = sorted((math.floor(x0), math.ceil(x1)))
+        y0, y1 = sorted((math.floor(y0), math.ceil(y1)))
+        return cls(np.full((y1 - y0, x1 - x0), 255, np.uint8), (x0, y0))
+
+    @classmethod
+    def ellipse(cls, x0, y0, x1, y1):
+        """Pixels whose centres fall inside the ellipse inscribed in the box."""
+        x0, x1 = sorted((x0, x1))
+        y0, y1 = sorted((y0, y1))
+        left, top = math.floor(x0), math.floor(y0)
+        cx, cy, rx, ry = (x0 + x1) / 2, (y0 + y1) / 2, max((x1 - x0) / 2, 1e-9), max((y1 - y0) / 2, 1e-9)
+        xs = (np.arange(left, math.ceil(x1)) + 0.5 - cx) / rx
+        ys = (np.arange(top, math.ceil(y1)) + 0.5 - cy) / ry
+        inside = ys[:, None] ** 2 + xs[None, :] ** 2 <= 1.0
+        return cls(inside.astype(np.uint8) * 255, (left, top)).crop()
+
+    @classmethod
+    def polygon(cls, points):
+        """Pixels inside a closed polygon such as a lasso outline."""
+        xs, ys = [x for x, _ in points], [y for _, y in points]
+        left, top = math.floor(min(xs)), math.floor(min(ys))
+        size = (math.ceil(max(xs)) - left + 1, math.ceil(max(ys)) - top + 1)
+        image = Image.new('L', size, 0)
+        ImageDraw.Draw(image).polygon([(x - left, y - top) for x, y in points], fill=255)
+        return cls(np.asarray(image), (left, top)).crop()
+
+    @property
+    def bbox(self):
+        """(x0, y0, x1, y1) on the canvas, exclusive of x1 and y1."""
+        height, width = self.array.shape
+        return (self.offset[0], self.offset[1], self.offset[0] + width, self.offset[1] + height)
+
+    @property
+    def area(self):
+        """Selected pixel count, with partial coverage counted fractionally."""
+        return int(self.array.sum(dtype=np.uint64)) / 255
+
+    def __bool__(self):
+        return bool(self.array.size) and bool(self.array.any())
+
+    def contains(self, x, y):
+        x, y = int(x) - self.offset[0], int(y) - self.offset[1]
+        height, width = self.array.shape
+        return 0 <= x < width and 0 <= y < height and bool(self.array[y, x])
+
+    def crop(self):
+        """Shrink to the smallest box holding every selected pixel."""
+        rows, cols = np.flatnonzero(self.array.any(axis=1)), np.flatnonzero(self.array.any(axis=0))
+        if not len(rows):
+            return Mask.empty()
+        if len(rows) == self.array.shape[0] and len(cols) == self.array.shape[1]:
+            return self
+        return Mask(self.array[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1], (self.offset[0] + cols[0], self.offset[1] + rows[0]))
+
+    def _in_box(self, box):
+        """This mask's coverage laid out over another canvas box."""
+        x0, y0, x1, y1 = box
+        out = np.zeros((y1 - y0, x1 - x0), np.uint8)
+        ax0, ay0, ax1, ay1 = self.bbox
+        ix0, iy0, ix1, iy1 = max(x0, ax0), max(y0, ay0), min(x1, ax1), min(y1, ay1)
+        if ix0 < ix1 and iy0 < iy1:
+            out[iy0 - y0:iy1 - y0, ix0 - x0:ix1 - x0] = self.array[iy0 - ay0:iy1 - ay0, ix0 - ax0:ix1 - ax0]
+        return out
+
+    def union(self, other):
+        if not other:
+            return self
+        if not self:
+            return other
+        a, b = self.bbox, other.bbox
+        box = (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+        return Mask(np.maximum(self._in_box(box), other._in_box(box)), box[:2])
+
+    def intersect(self, other):
+        a, b = self.bbox, other.bbox
+        box = (max(a[0], b[0]), max(a[1], b[1]), min(a[2], b[2]), min(a[3], b[3]))
+        if box[0] >= box[2] or box[1] >= box[3]:
+            return Mask.empty()
+        return Mask(np.minimum(self._in_box(box), other._in_box(box)), box[:2]).crop()
+
+    def subtract(self, other):
+        if not self or not other:
+            return self
+        return Mask(np.minimum(self.array, 255 - other._in_box(self.bbox)), self.offset).crop()
+
+    __or__, __and__, __sub__ = union, intersect, subtract
+
+    def invert(self, width, height):
+        """Everything in a width x height canvas that this mask does not cover."""
+        return Mask(255 - self._in_box((0, 0, width, height))).crop()
+
+    def move(self, dx, dy):
+        """The same selection shifted by (dx, dy); the array is shared, not copied."""
+        return Mask(self.array, (self.offset[0] + dx, self.offset[1] + dy))
+
+    def feather(self, radius):
+        """Soften the edge with a Gaussian blur, growing the box to hold the falloff."""
+        if radius <= 0 or not self:
+            return self
+        pad = math.ceil(radius * 3)
+        padded = np.pad(self.array, pad)
+        blurred = Image.fromarray(padded).filter(ImageFilter.GaussianBlur(radius))
+        return Mask(np.asarray(blurred), (self.offset[0] - pad, self.offset[1] - pad)).crop()
+
+    def to_image(self, box=None):
+        """The coverage as an 'L' image of the mask's box, or of another canvas box."""
+        return Image.fromarray(self.array if box is None else self._in_box(box), 'L')
+
+    def fill(self, image, color, origin=(0, 0)):
+        """Paint color onto an image whose top-left pixel sits at origin, through the mask."""
+        if self:
+            image.paste(color, (self.offset[0] - origin[0], self.offset[1] - origin[1]), self.to_image())
+        return image
+
+    def filled(self, color):
+        """An RGBA image of the mask's box: color wherever the mask covers, transparent elsewhere."""
+        image = Image.new('RGBA', self.to_image().size, color)
+        image.putalpha(self.to_image())
+        return image
+
+def _runs(match):
+    """Horizontal runs of True in a boolean image: (rows, starts, ends), sorted, ends exclusive."""
+    height, width = match.shape
+    padded = np.zeros((height, width + 2), bool)
+    padded[:, 1:-1] = match
+    flat = padded.ravel()
+    edges = np.flatnonzero(flat[1:] != flat[:-1]) + 1
+    starts, ends = edges[0::2], edges[1::2]
+    rows = starts // (width + 2)
+    return rows, starts - rows * (width + 2) - 1, ends - rows * (width + 2) - 1
+
+def _linked_runs(rows, starts, ends, width):
+    """Index pairs of runs on adjacent rows that share at least one column."""
+    stride = width + 1
+    start_keys, end_keys = rows * stride + starts, rows * stride + ends
+    # Runs on the row above whose end lies past this run's start and whose start lies before its end
+    below = rows > 0
+    first = np.searchsorted(end_keys, (rows - 1) * stride + starts, side='right')
+    last = np.searchsorted(start_keys, (rows - 1) * stride + ends, side='left')
+    counts = np.where(below, np.maximum(last - first, 0), 0)
+    lower = np.repeat(np.arange(len(rows)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return np.repeat(first, counts) + offsets, lower
+
+def _components(count, a, b):
+    """Union-find over count nodes and edges (a, b), by hooking roots and pointer jumping."""
+    parent = np.arange(count)
+    while True:
+        pa, pb = parent[a], parent[b]
+        low, high = np.minimum(pa, pb), np.maximum(pa, pb)
+        changed = low != high
+        if not changed.any():
+            return parent
+        np.minimum.at(parent, high[changed], low[changed])
+        while True:
+            jumped = parent[parent]
+            if np.array_equal(jumped, parent):
+                break
+            parent = jumped
+
+def color_match(pixels, seed, tolerance):
+    """Pixels within tolerance of the seed colour in every channel."""
+    match = None
+    for channel in range(pixels.shape[2]):
+        low = max(0, int(seed[channel]) - tolerance)
+        # Wrapping uint8 subtraction maps [low, low + span] to [0, span]
+        span = min(255, int(seed[channel]) + tolerance) - low
+        ok = (pixels[..., channel] - np.uint8(low)) <= span
+        match = ok if match is None else match & ok
+    return match
+
+def planar_pixels(image):
+    """
+    An image's (height, width, channels) pixel array with each channel stored
+    as one contiguous plane. color_match() reads a plane several times faster
+    than a channel interleaved with the others.
+    """
+    pixels = np.asarray(image)
+    if pixels.ndim == 2:
+        return pixels[..., None]
+    return np.moveaxis(np.ascontiguousarray(np.moveaxis(pixels, 2, 0)), 0, 2)
+
+def magic_wand(image, x, y, tolerance=32, contiguous=True, origin=(0, 0)):
+    """
+    Select the pixels of similar colour to the one at canvas (x, y); image's
+    top-left pixel sits at origin. image may be a PIL image or a pixel array;
+    callers that pick repeatedly should convert once with planar_pixels(). With contiguous set, only
+    the region connected to the seed (4-neighbour) is selected.
+    """
+    pixels = np.asarray(image)
+    px, py = int(x) - origin[0], int(y) - origin[1]
+    if not (0 <= px < pixels.shape[1] and 0 <= py < pixels.shape[0]):
+        return Mask.empty()
+    if pixels.ndim == 2:
+        pixels = pixels[..., None]
+    match = color_match(pixels, pixels[py, px], tolerance)
+    if not contiguous:
+        return Mask(match.view(np.uint8) * np.uint8(255), origin).crop()
+    rows, starts, ends = _runs(match)
+    upper, lower = _linked_runs(rows, starts, ends, pixels.shape[1])
+    labels = _components(len(rows), upper, lower)
+    seed = np.flatnonzero((rows == py) & (starts <= px) & (ends > px))[0]
+    keep = labels == labels[seed]
+    rows, starts, ends = rows[keep], starts[keep], ends[keep]
+    top, left = rows.min(), starts.min()
+    height, width = rows.max() - top + 1, ends.max() - left
+    # Mark run starts +1 and ends -1, then a running sum along each row fills them in
+    marks = np.zeros((height, width + 1), np.int8)
+    marks[rows - top, starts - left] = 1
+    marks[rows - top, ends - left] = -1
+    array = (np.cumsum(marks[:, :width], axis=1, dtype=np.int8) > 0).view(np.uint8) * np.uint8(255)
+    return Mask(array, (origin[0] + left, origin[1] + top))
@@ -0,0 +1,198 @@
+"""
+poster.py - Streaming poster export for the Paint App
+
+A print-resolution render does not fit in memory: 30000 x 20000 RGBA is 2.4 GB
+before an encoder makes its own copy. A poster is rendered in full-width
+horizontal strips instead. Each strip draws only the items that reach it, is
+filtered and compressed straight into the PNG data stream, and is dropped
+before the next one is drawn. Peak memory follows the strip size, not the
+poster size. Points are snapped to whole pixels so the strips join without
+seams. The zlib settings follow the same 'fast'/'balanced'/'small' targets as
+encoding.encode(); a streamed poster is always true colour. PosterJob runs the
+strips on a worker thread so the UI keeps responding.
+"""
+
+import os
+import struct
+import threading
+import zlib
+import numpy as np
+from encoding import PNG_LEVELS
+from renderer import iter_document, render
+
+# Rough size of one rendered RGBA strip
+STRIP_BYTES = 16 << 20
+# Compressed data gathered before an IDAT chunk is written
+CHUNK_BYTES = 1 << 20
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+class PngStream:
+    """
+    Writes an 8-bit RGB or RGBA PNG to a binary file, a block of rows at a time.
+    Rows use the Up filter (the difference from the row above), which turns
+    flat and vertically repeating areas into zeros that zlib packs well.
+    """
+    def __init__(self, file, width, height, mode='RGB', level=6, strategy=zlib.Z_FILTERED):
+        if mode not in ('RGB', 'RGBA'):
+            raise ValueError(f"Unsupported PNG mode: {mode}")
+        self.file = file
+        self.width = width
+        self.height = height
+        self.mode = mode
+        self.rows = 0
+        self._previous = np.zeros(width * len(mode), np.uint8)
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS, 9, strategy)
+        self._pending = bytearray()
+        file.write(PNG_SIGNATURE)
+        self._chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6 if mode == 'RGBA' else 2, 0, 0, 0))
+
+    def _chunk(self, kind, data):
+        self.file.write(struct.pack('>I', len(data)) + kind)
+        self.file.write(data)
+        self.file.write(struct.pack('>I', zlib.crc32(data, zlib.crc32(kind))))
+
+    def write(self, pixels):
+        """Append rows from a (rows, width, channels) uint8 array in the stream's mode."""
+        pixels = np.asarray(pixels, np.uint8)
+        if pixels.shape[1:] != (self.width, len(self.mode)):
+            raise ValueError(f"Expected rows of {self.width} {self.mode} pixels, got shape {pixels.shape}")
+        if self.rows + len(pixels) > self.height:
+            raise ValueError("More rows than the PNG header declares")
+        pixels = pixels.reshape(len(pixels), -1)
+        filtered = np.empty((len(pixels), pixels.shape[1] + 1), np.uint8)
+        filtered[:, 0] = 2
+        # uint8 subtraction wraps modulo 256, as the filter requires
+        np.subtract(pixels[0], self._previous, out=filtered[0, 1:])
+        np.subtract(pixels[1:], pixels[:-1], out=filtered[1:, 1:])
+        self._previous = pixels[-1].copy()
+        self.rows += len(pixels)
+        self._pending += self._compressor.compress(filtered)
+        if len(self._pending) >= CHUNK_BYTES:
+            self._chunk(b'IDAT', bytes(self._pending))
+            self._pending.clear()
+
+    def close(self):
+        """Finish the data stream and write the end chunk. Every declared row must have been written."""
+        if self.rows != self.height:
+            raise ValueError(f"PNG declares {self.height} rows but {self.rows} were written")
+        self._pending += self._compressor.flush()
+        self._chunk(b'IDAT', bytes(self._pending))
+        self._pending.clear()
+        self._chunk(b'IEND', b'')
+
+def vertical_extents(items, scale=1.0):
+    """
+    (n, 2) array of the first and past-the-last pixel row each item can touch at
+    the given scale. Text is given no bounds, since its height depends on the font.
+    """
+    extents = np.empty((len(items), 2))
+    for index, (kind, coords, options) in enumerate(items):
+        ys = coords[1::2]
+        if kind == 'image':
+            h = options['image'].height * scale
+            top = ys[0] * scale - (h / 2 if options['anchor'] == 'center' else 0)
+            extents[index] = (top - 1, top + h + 1)
+        elif kind == 'text' or not ys:
+            extents[index] = (-np.inf, np.inf)
+        else:
+            # Half the stroke plus the round caps' overhang
+            pad = max(1, round(options.get('width', 1) * scale)) / 2 + 1
+            extents[index] = (min(ys) * scale - pad, max(ys) * scale + pad)
+    return extents
+
+def export_poster(items, size, path, scale=1.0, background='white', strip_height=None, on_progress=None, target='balanced'):
+    """
+    Render snapshotted items for a document of the given size at scale and write
+    a PNG, one strip at a time, compressed for an encoding target. on_progress(rows_done,
+    rows_total) is called after each strip. Returns the PNG's pixel size.
+    """
+    width, height = max(1, round(size[0] * scale)), max(1, round(size[1] * scale))
+    mode = 'RGB' if background else 'RGBA'
+    strip_height = strip_height or max(1, STRIP_BYTES // (width * 4))
+    extents = vertical_extents(items, scale)
+    with open(path, 'wb') as file:
+        png = PngStream(file, width, height, mode, PNG_LEVELS[target])
+        for top in range(0, height, strip_height):
+            rows = min(strip_height, height - top)
+            reaching = np.flatnonzero((extents[:, 0] < top + rows) & (extents[:, 1] > top))
+            strip = render([items[i] for i in reaching], (width, rows), scale, (0, 0), background, (0, top), snap=True)
+            png.write(np.asarray(strip.convert(mode) if mode != 'RGBA' else strip))
+            # Free this strip before the next one is drawn
+            del strip
+            if on_progress:
+                on_progress(top + rows, height)
+        png.close()
+    return width, height
+
+def export_canvas_poster(canvas, path, scale, on_progress=None):
+    """Export the drawing on the canvas's visible layers as a poster PNG scaled up by scale."""
+    items = list(iter_document(canvas))
+    size = (max(1, canvas.winfo_width()), max(1, canvas.winfo_height()))
+    return export_poster(items, size, path, scale, canvas.bg_color, on_progress=on_progress)
+
+class PosterCancelled(Exception):
+    pass
+
+class PosterJob:
+    """
+    A poster export in the background. start() snapshots the canvas on the Tk
+    thread and hands the strips to a worker thread; an after() poll reports
+    progress and calls on_done(job) at the end. A cancelled or failed export
+    deletes the partial file.
+    """
+    def __init__(self, canvas, path, scale, on_progress=None, on_done=None, interval=100):
+        self.canvas = canvas
+        self.path = path
+        self.scale = scale
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.interval = interval
+        self.size = None
+        self.error = None
+        self.cancelled = False
+        self.done = False
+        self._rows = (0, 1)
+        self._thread = None
+        self._job = None
+
+    @property
+    def progress(self):
+        done, total = self._rows
+        return done / total
+
+    def start(self):
+        items = list(iter_document(self.canvas))
+        size = (max(1, self.canvas.winfo_width()), max(1, self.canvas.winfo_height()))
+        self._thread = threading.Thread(target=self._run, args=(items, size, self.canvas.bg_color), daemon=True)
+        self._thread.start()
+        self._job = self.canvas.after(self.interval, self._poll)
+        return self
+
+    def _run(self, items, size, background):
+        try:
+            self.size = export_poster(items, size, self.path, self.scale, background, on_progress=self._strip_done)
+        except Exception as e:
+            if not isinstance(e, PosterCancelled):
+                self.error = e
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    def _strip_done(self, done, total):
+        if self.cancelled:
+            raise PosterCancelled()
+        self._rows = (done, total)
+
+    def _poll(self):
+        if self._thread.is_alive():
+            if self.on_progress:
+                self.on_progress(self)
+            self._job = self.canvas.after(self.interval, self._poll)
+            return
+        self._job = None
+        self.done = True
+        if self.on_done:
+            self.on_done(self)
+
+    def cancel(self):
+        """Stop after the strip being drawn; on_done still runs once the worker has cleaned up."""
+        self.cancelled = True
@@ -0,0 +1,190 @@
+"""
+raster_history.py - Tile-diff undo history for raster edits in the Paint App
+
+Raster edits are recorded as the tiles they changed rather than as copies of the
+whole layer. Each changed tile is stored twice, before and after the edit, and
+compressed with zlib. Undo and redo write the stored tiles back into the layer
+array, so one step costs about as much as the area it touched.
+
+A RasterPlane is the array a layer's filters, cuts, fills and gradients paint
+into. The canvas shows it as one image item at the bottom of the layer.
+"""
+
+import zlib
+from contextlib import contextmanager
+import numpy as np
+from PIL import Image
+
+TILE_SIZE = 64
+
+def tile_box(box, shape, tile_size=TILE_SIZE):
+    """Widen an (x0, y0, x1, y1) box to tile boundaries, clipped to an array of the given shape."""
+    height, width = shape[:2]
+    x0, y0, x1, y1 = box if box is not None else (0, 0, width, height)
+    x0, y0 = max(0, int(x0) // tile_size * tile_size), max(0, int(y0) // tile_size * tile_size)
+    x1, y1 = min(width, -(-int(x1) // tile_size) * tile_size), min(height, -(-int(y1) // tile_size) * tile_size)
+    return x0, y0, x1, y1
+
+def changed_tiles(before, after, tile_size=TILE_SIZE):
+    """Return (row, col) indices of the tiles that differ between two equally shaped arrays."""
+    diff = before != after
+    if diff.ndim == 3:
+        diff = diff.any(axis=2)
+    if not diff.any():
+        return np.empty((0, 2), dtype=np.intp)
+    rows = np.logical_or.reduceat(diff, np.arange(0, diff.shape[0], tile_size), axis=0)
+    tiles = np.logical_or.reduceat(rows, np.arange(0, diff.shape[1], tile_size), axis=1)
+    return np.argwhere(tiles)
+
+class TileDiff:
+    """The compressed before and after contents of the tiles one edit changed."""
+    def __init__(self, shape, dtype, tiles):
+        self.shape = shape
+        self.dtype = dtype
+        # (y0, y1, x0, x1, compressed before, compressed after) per tile
+        self.tiles = tiles
+
+    @property
+    def nbytes(self):
+        return sum(len(before) + len(after) for *_, before, after in self.tiles)
+
+    def apply(self, array, after=True):
+        """Write the after (or before) tiles into array."""
+        for y0, y1, x0, x1, before, after_data in self.tiles:
+            block = array[y0:y1, x0:x1]
+            data = zlib.decompress(after_data if after else before)
+            block[...] = np.frombuffer(data, dtype=self.dtype).reshape(block.shape)
+
+class TileHistory:
+    """
+    Undo and redo stacks of tile diffs for one raster array.
+    Record an edit with record(before, after), or wrap an in-place edit in
+    `with history.edit(array, box):` so only the declared region is copied
+    and compared. limit_bytes drops the oldest steps once the compressed
+    history grows past it.
+    """
+    def __init__(self, tile_size=TILE_SIZE, level=1, limit_bytes=None):
+        self.tile_size = tile_size
+        self.level = level
+        self.limit_bytes = limit_bytes
+        self.undo_stack = []
+        self.redo_stack = []
+
+    @property
+    def nbytes(self):
+        """Compressed size of every stored step."""
+        return sum(diff.nbytes for diff in self.undo_stack) + sum(diff.nbytes for diff in self.redo_stack)
+
+    def diff(self, before, after, origin=(0, 0)):
+        """Build a TileDiff from two versions of a region whose top-left is at origin in the layer."""
+        ts, oy, ox = self.tile_size, origin[1], origin[0]
+        tiles = []
+        for row, col in changed_tiles(before, after, ts):
+            y0, x0 = row * ts, col * ts
+            y1, x1 = min(y0 + ts, before.shape[0]), min(x0 + ts, before.shape[1])
+            tiles.append((oy + y0, oy + y1, ox + x0, ox + x1,
+                          zlib.compress(np.ascontiguousarray(before[y0:y1, x0:x1]).tobytes(), self.level),
+                          zlib.compress(np.ascontiguousarray(after[y0:y1, x0:x1]).tobytes(), self.level)))
+        return TileDiff(after.shape, after.dtype, tiles)
+
+    def record(self, before, after, origin=(0, 0)):
+        """Push the difference between two versions of a region. Returns the diff, or None if nothing changed."""
+        diff = self.diff(before, after, origin)
+        if not diff.tiles:
+            return None
+        self.undo_stack.append(diff)
+        self.redo_stack.clear()
+        if self.limit_bytes is not None:
+            while len(self.undo_stack) > 1 and self.nbytes > self.limit_bytes:
+                self.undo_stack.pop(0)
+        return diff
+
+    @contextmanager
+    def edit(self, array, box=None):
+        """
+        Record the in-place edit made inside the with-block.
+        box (x0, y0, x1, y1) bounds the pixels the edit may touch; it is widened to
+        tile boundaries so recorded tiles line up with the layer grid.
+        """
+        x0, y0, x1, y1 = tile_box(box, array.shape, self.tile_size)
+        before = array[y0:y1, x0:x1].copy()
+        yield array
+        self.record(before, array[y0:y1, x0:x1], origin=(x0, y0))
+
+    def undo(self, array):
+        """Restore the tiles changed by the last step. Returns False if there is nothing to undo."""
+        if not self.undo_stack:
+            return False
+        diff = self.undo_stack.pop()
+        diff.apply(array, after=False)
+        self.redo_stack.append(diff)
+        return True
+
+    def redo(self, array):
+        """Reapply the last undone step. Returns False if there is nothing to redo."""
+        if not self.redo_stack:
+            return False
+        diff = self.redo_stack.pop()
+        diff.apply(array, after=True)
+        self.undo_stack.append(diff)
+        return True
+
+class RasterPlane:
+    """
+    A layer's pixels as one RGBA array, with a TileHistory of the edits made to
+    it. paint() composites an image over or under the plane, or replaces the
+    whole plane with it, and records the changed tiles as one step. The array
+    grows to fit what is painted; pixels left of or above the origin are off
+    the canvas and are dropped.
+    """
+    def __init__(self, size, history=None):
+        self.array = np.zeros((size[1], size[0], 4), np.uint8)
+        self.history = history or TileHistory()
+
+    @property
+    def size(self):
+        return self.array.shape[1], self.array.shape[0]
+
+    def image(self):
+        """A PIL copy of the plane, safe to hand to renders while the plane changes."""
+        # fromarray() shares the array's memory
+        return Image.fromarray(self.array, 'RGBA').copy()
+
+    def _grow(self, width, height):
+        if width <= self.array.shape[1] and height <= self.array.shape[0]:
+            return
+        grown = np.zeros((max(height, self.array.shape[0]), max(width, self.array.shape[1]), 4), np.uint8)
+        grown[:self.array.shape[0], :self.array.shape[1]] = self.array
+        self.array = grown
+
+    def paint(self, x, y, image, mode='over'):
+        """
+        Paint a PIL image with its top-left at (x, y). mode is 'over' or 'under'
+        the current pixels, or 'replace' to clear the rest of the plane; image
+        None with 'replace' clears it all. Returns the recorded TileDiff, or None
+        if no pixel changed.
+        """
+        x, y = round(x), round(y)
+        if image is not None:
+            image = image.convert('RGBA') if image.mode != 'RGBA' else image
+            image = image.crop((max(0, -x), max(0, -y), image.width, image.height))
+            x, y = max(0, x), max(0, y)
+            self._grow(x + image.width, y + image.height)
+        box = None if mode == 'replace' else (x, y, x + image.width, y + image.height)
+        x0, y0, x1, y1 = tile_box(box, self.array.shape, self.history.tile_size)
+        before = self.array[y0:y1, x0:x1].copy()
+        if mode == 'replace':
+            self.array[...] = 0
+            if image is not None:
+                self.array[y:y + image.height, x:x + image.width] = np.asarray(image)
+        elif image.width and image.height:
+            region = Image.fromarray(self.array[y:y + image.height, x:x + image.width], 'RGBA')
+            painted = Image.alpha_composite(region, image) if mode == 'over' else Image.alpha_composite(image, region)
+            self.array[y:y + image.height, x:x + image.width] = np.asarray(painted)
+        return self.history.record(before, self.array[y0:y1, x0:x1], origin=(x0, y0))
+
+    def undo(self):
+        return self.history.undo(self.array)
+
+    def redo(self):
+        return self.history.redo(self.array)
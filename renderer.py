@@ -0,0 +1,163 @@
+"""
+renderer.py - Offscreen rendering of canvas items for the Paint App
+
+Rendering happens in two steps. snapshot_item() reads an item's geometry and
+style from Tk into a plain tuple and must run on the Tk thread. render() draws
+a list of those tuples into a PIL image and is safe to run on a worker thread.
+"""
+
+import math
+from PIL import Image, ImageColor, ImageDraw, ImageFont
+
+def snapshot_item(canvas, item_id, include_hidden=False):
+    """Return (kind, coords, options) for a canvas item, or None if it should not be drawn."""
+    kind = canvas.type(item_id)
+    if not kind:
+        return None
+    if not include_hidden and canvas.itemcget(item_id, 'state') == 'hidden':
+        return None
+    coords = canvas.coords(item_id)
+    if kind == 'line':
+        options = {'fill': canvas.itemcget(item_id, 'fill'), 'width': float(canvas.itemcget(item_id, 'width') or 1)}
+    elif kind in ('rectangle', 'oval', 'polygon'):
+        options = {'fill': canvas.itemcget(item_id, 'fill'), 'outline': canvas.itemcget(item_id, 'outline'), 'width': float(canvas.itemcget(item_id, 'width') or 1)}
+    elif kind == 'text':
+        options = {'text': canvas.itemcget(item_id, 'text'), 'fill': canvas.itemcget(item_id, 'fill'), 'font': canvas.itemcget(item_id, 'font')}
+    elif kind == 'image':
+        source = getattr(canvas, 'images', {}).get(item_id)
+        if source is None:
+            return None
+        options = {'image': source[1], 'anchor': canvas.itemcget(item_id, 'anchor')}
+    else:
+        return None
+    return (kind, coords, options)
+
+def iter_snapshot(canvas, tag='all', include_hidden=False):
+    """
+    Yield snapshots of the items matching tag, bottom to top. A layer's baked
+    tiles yield the snapshots of the items they were made from, once.
+    """
+    tiles = getattr(canvas, 'bake_tiles', {})
+    expanded = set()
+    for item_id in canvas.find_withtag(tag):
+        layer = tiles.get(item_id)
+        if layer is not None:
+            if layer not in expanded and (include_hidden or canvas.itemcget(item_id, 'state') != 'hidden'):
+                expanded.add(layer)
+                yield from layer.baked
+            continue
+        entry = snapshot_item(canvas, item_id, include_hidden)
+        if entry is not None:
+            yield entry
+
+def iter_document(canvas):
+    """
+    Yield snapshots of the drawing on every visible layer, bottom to top, leaving
+    out the marquee, selection boxes and tool previews drawn over it.
+    """
+    for layer in canvas.layers:
+        if layer.visible:
+            yield from iter_snapshot(canvas, layer.content_tag)
+
+def render_snapshot(snapshot):
+    """Render an (items, bbox) layer snapshot. Returns (image, (x, y)), or None for an empty snapshot."""
+    if snapshot is None:
+        return None
+    items, (x0, y0, x1, y1) = snapshot
+    return render(items, (x1 - x0, y1 - y0), 1.0, (x0, y0)), (x0, y0)
+
+def _color(value):
+    if not value:
+        return None
+    try:
+        return ImageColor.getrgb(value)
+    except ValueError:
+        return None
+
+def _font_size(font):
+    """Best-effort pixel size from a Tk font description such as 'Arial 16 bold'."""
+    parts = font.replace('{', ' ').replace('}', ' ').split() if isinstance(font, str) else list(font)
+    for part in parts:
+        try:
+            return abs(int(part))
+        except (TypeError, ValueError):
+            continue
+    return 12
+
+def _load_font(size):
+    try:
+        return ImageFont.load_default(size)
+    except TypeError:
+        # Pillow older than 10.1 only has the fixed-size bitmap font
+        return ImageFont.load_default()
+
+def render(items, size, scale=1.0, origin=(0, 0), background=None, offset=(0, 0), snap=False):
+    """Draw snapshotted items into a new RGBA image of the given size.
+
+    Canvas point (x, y) lands on pixel ((x - origin[0]) * scale - offset[0], (y - origin[1]) * scale - offset[1]).
+    A whole-pixel offset renders one piece of a larger image. Pillow truncates
+    negative fractional coordinates toward zero, so pieces only join without
+    seams when snap rounds every point to a whole pixel before the offset.
+    """
+    image = Image.new('RGBA', size, _color(background) or (0, 0, 0, 0))
+    return draw_items(image, items, scale, origin, offset, snap)
+
+def draw_items(image, items, scale=1.0, origin=(0, 0), offset=(0, 0), snap=False):
+    """Draw snapshotted items on top of an existing RGBA image and return it."""
+    draw = ImageDraw.Draw(image)
+    ox, oy = origin
+    dx, dy = offset
+
+    def xy(coords):
+        points = [((coords[i] - ox) * scale, (coords[i + 1] - oy) * scale) for i in range(0, len(coords) - 1, 2)]
+        if snap:
+            return [(math.floor(x + 0.5) - dx, math.floor(y + 0.5) - dy) for x, y in points]
+        return [(x - dx, y - dy) for x, y in points]
+
+    for kind, coords, options in items:
+        width = max(1, round(options.get('width', 1) * scale))
+        if kind == 'line' and len(coords) >= 4:
+            fill = _color(options['fill'])
+            if fill:
+                points = xy(coords)
+                draw.line(points, fill=fill, width=width, joint='curve')
+                if width > 2:
+                    r = width // 2 if snap else width / 2
+                    for x, y in (points[0], points[-1]):
+                        draw.ellipse((x - r, y - r, x + r, y + r), fill=fill)
+        elif kind in ('rectangle', 'oval') and len(coords) == 4:
+            (x0, y0), (x1, y1) = xy(coords)
+            box = (min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1))
+            shape = draw.rectangle if kind == 'rectangle' else draw.ellipse
+            shape(box, fill=_color(options['fill']), outline=_color(options['outline']), width=width)
+        elif kind == 'polygon' and len(coords) >= 6:
+            draw.polygon(xy(coords), fill=_color(options['fill']), outline=_color(options['outline']), width=width)
+        elif kind == 'text' and options['text']:
+            font = _load_font(max(1, _font_size(options['font']) * scale))
+            fill = _color(options['fill']) or (0, 0, 0)
+            try:
+                draw.text(xy(coords)[0], options['text'], fill=fill, font=font, anchor='mm')
+            except ValueError:
+                # Bitmap fonts do not support anchors
+                draw.text(xy(coords)[0], options['text'], fill=fill, font=font)
+        elif kind == 'image':
+            source = options['image']
+            w, h = max(1, round(source.width * scale)), max(1, round(source.height * scale))
+            x, y = xy(coords)[0]
+            if options['anchor'] == 'center':
+                x, y = x - w / 2, y - h / 2
+            x, y = math.floor(x + 0.5), math.floor(y + 0.5)
+            # Only the part that lands on the image is scaled, so a piece of a huge render stays small
+            left, top = max(0, -x), max(0, -y)
+            right, bottom = min(w, image.width - x), min(h, image.height - y)
+            if left >= right or top >= bottom:
+                continue
+            if source.mode != 'RGBA':
+                source = source.convert('RGBA')
+            if (w, h) == source.size:
+                placed = source.crop((left, top, right, bottom))
+            else:
+                sx, sy = source.width / w, source.height / h
+                placed = source.resize((right - left, bottom - top), Image.BILINEAR, box=(left * sx, top * sy, right * sx, bottom * sy))
+            image.alpha_composite(placed, (x + left, y + top))
+    return image
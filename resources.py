@@ -0,0 +1,44 @@
+"""
+resources.py - Resource accounting for the Paint App
+
+resource_counts() reads what a canvas is holding on to: Tk items and images,
+Python-side image and archive tables, history entries, layers, cached assets
+and pending callbacks. Taking counts before and after a draw/undo/new cycle
+and comparing them with leaks() shows anything the document failed to release.
+"""
+
+import gc
+
+def resource_counts(canvas):
+    """Return a dict of the resources a canvas holds, by name."""
+    return {
+        'items': len(canvas.find_all()),
+        'tk_images': len(canvas.image_names()),
+        'images': len(canvas.images),
+        'sprites': len(canvas.sprites),
+        'archives': len(canvas._archives),
+        'raster_steps': len(canvas._raster_steps),
+        'tiles': len(canvas.bake_tiles),
+        'baked_actions': len(canvas.baked_history),
+        'shapes': len(canvas.shapes),
+        'selection': len(canvas.selection),
+        'undo': len(canvas.undo_stack),
+        'redo': len(canvas.redo_stack),
+        'layers': len(canvas.layers),
+        'timers': len(canvas._timers),
+        'assets': len(canvas.assets.sources),
+        'asset_bytes': canvas.assets.cached_bytes,
+    }
+
+def leaks(baseline, counts):
+    """Return {name: (baseline, now)} for every count that is above its baseline."""
+    return {name: (baseline.get(name, 0), value) for name, value in counts.items() if value > baseline.get(name, 0)}
+
+def assert_released(canvas, baseline):
+    """Collect garbage, then raise AssertionError naming every resource still above baseline."""
+    gc.collect()
+    # PhotoImages free their Tk image from __del__, which runs on collection
+    canvas.update_idletasks()
+    leaked = leaks(baseline, resource_counts(canvas))
+    if leaked:
+        raise AssertionError("Resources not released: " + ", ".join(f"{name} {before} -> {after}" for name, (before, after) in sorted(leaked.items())))
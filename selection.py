@@ -0,0 +1,176 @@
+"""
+selection.py - Multi-shape selection and group transforms for the Paint App
+"""
+
+import math
+from shapes import SHAPE_TAG, rotate_point
+from layers import CHROME_TAG
+
+SELECTION_TAG = 'selected'
+SELECTION_BOX_TAG = 'selection_box'
+
+class Selection:
+    """
+    Group of selected shapes that are transformed together.
+    Selected items share SELECTION_TAG, so move and scale previews are a constant
+    number of Tk calls no matter how many shapes are selected. Rotation is previewed
+    on the dashed selection box only. Shape geometry is updated once, in commit().
+    """
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.shapes = []
+        self.mode = 'move'
+        self._box_id = None
+        self._box = None
+        self._active = None
+        self._origin = (0, 0)
+        self._center = (0, 0)
+        self._applied = (0, 0)
+        self._amount = None
+
+    def __len__(self):
+        return len(self.shapes)
+
+    def __iter__(self):
+        return iter(self.shapes)
+
+    def __contains__(self, shape):
+        return shape in self.shapes
+
+    def set(self, shapes):
+        """Replace the selection with the given shapes."""
+        self.canvas.dtag(SELECTION_TAG, SELECTION_TAG)
+        self.shapes = [s for s in shapes if s.canvas_id]
+        for shape in self.shapes:
+            shape.selected = True
+            self.canvas.addtag_withtag(SELECTION_TAG, shape.canvas_id)
+        self._update_box()
+
+    def clear(self):
+        """Deselect every shape."""
+        for shape in self.shapes:
+            shape.selected = False
+        self.shapes = []
+        self.canvas.dtag(SELECTION_TAG, SELECTION_TAG)
+        self._update_box()
+
+    def toggle(self, shape):
+        """Add the shape to the selection, or remove it if already selected."""
+        if shape in self.shapes:
+            self.shapes.remove(shape)
+            shape.selected = False
+            self.canvas.dtag(shape.canvas_id, SELECTION_TAG)
+        elif shape.canvas_id:
+            self.shapes.append(shape)
+            shape.selected = True
+            self.canvas.addtag_withtag(SELECTION_TAG, shape.canvas_id)
+        self._update_box()
+
+    def select_enclosed(self, x0, y0, x1, y1, shapes, extend=False):
+        """Select every shape whose item lies fully inside the given rectangle."""
+        by_item = {s.canvas_id: s for s in shapes if s.canvas_id}
+        x0, x1 = min(x0, x1), max(x0, x1)
+        y0, y1 = min(y0, y1), max(y0, y1)
+        if not extend:
+            self.canvas.dtag(SELECTION_TAG, SELECTION_TAG)
+            for shape in self.shapes:
+                shape.selected = False
+            self.shapes = []
+        # Tag every enclosed shape item in one call, then read the group back
+        self.canvas.addtag_enclosed(SELECTION_TAG, x0, y0, x1, y1)
+        self.canvas.dtag('!' + SHAPE_TAG, SELECTION_TAG)
+        chosen = set(self.shapes)
+        for item_id in self.canvas.find_withtag(SELECTION_TAG):
+            shape = by_item.get(item_id)
+            if shape is not None and shape not in chosen:
+                shape.selected = True
+                self.shapes.append(shape)
+                chosen.add(shape)
+        self._update_box()
+
+    def begin(self, x, y, mode=None):
+        """Start a group transform at the given pointer position."""
+        if not self.shapes or self._box is None:
+            self._active = None
+            return
+        self._active = mode or self.mode
+        self._origin = (x, y)
+        x0, y0, x1, y1 = self._box
+        self._center = ((x0 + x1) / 2, (y0 + y1) / 2)
+        self._applied = (0, 0) if self._active == 'move' else 1.0
+        self._amount = self._applied
+
+    def update(self, x, y):
+        """Preview the active transform for the current pointer position."""
+        if self._active == 'move':
+            dx, dy = x - self._origin[0], y - self._origin[1]
+            step = (dx - self._applied[0], dy - self._applied[1])
+            self.canvas.move(SELECTION_TAG, *step)
+            self.canvas.move(SELECTION_BOX_TAG, *step)
+            self._applied = self._amount = (dx, dy)
+        elif self._active == 'scale':
+            cx, cy = self._center
+            start = math.hypot(self._origin[0] - cx, self._origin[1] - cy) or 1.0
+            factor = max(0.05, math.hypot(x - cx, y - cy) / start)
+            step = factor / self._applied
+            self.canvas.scale(SELECTION_TAG, cx, cy, step, step)
+            self.canvas.scale(SELECTION_BOX_TAG, cx, cy, step, step)
+            self._applied = self._amount = factor
+        elif self._active == 'rotate':
+            cx, cy = self._center
+            angle = math.atan2(y - cy, x - cx) - math.atan2(self._origin[1] - cy, self._origin[0] - cx)
+            self._amount = angle
+            self.canvas.coords(self._box_id, *self._box_polygon(angle))
+
+    def commit(self):
+        """Apply the previewed transform to the shape geometry once. Returns True if anything changed."""
+        mode, amount = self._active, self._amount
+        self._active = None
+        if mode == 'move' and amount != (0, 0):
+            for shape in self.shapes:
+                shape.move(*amount)
+        elif mode == 'scale' and amount != 1.0:
+            cx, cy = self._center
+            for shape in self.shapes:
+                shape.scale(cx, cy, amount, amount)
+        elif mode == 'rotate' and amount:
+            cx, cy = self._center
+            for shape in self.shapes:
+                shape.rotate(cx, cy, amount)
+                shape.draw(self.canvas)
+        else:
+            return False
+        self._update_box()
+        return True
+
+    def delete(self):
+        """Delete every selected shape from the canvas and return them."""
+        deleted = self.shapes
+        self.canvas.delete(SELECTION_TAG)
+        for shape in deleted:
+            shape.canvas_id = None
+            shape.selected = False
+        self.shapes = []
+        self._update_box()
+        return deleted
+
+    def _box_polygon(self, angle=0.0):
+        x0, y0, x1, y1 = self._box
+        cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+        coords = []
+        for x, y in ((x0, y0), (x1, y0), (x1, y1), (x0, y1)):
+            coords.extend(rotate_point(x, y, cx, cy, angle))
+        return coords
+
+    def _update_box(self):
+        """Fit the dashed selection box around the selected items."""
+        self._box = self.canvas.bbox(SELECTION_TAG) if self.shapes else None
+        if self._box is None:
+            if self._box_id:
+                self.canvas.delete(self._box_id)
+                self._box_id = None
+            return
+        if self._box_id:
+            self.canvas.coords(self._box_id, *self._box_polygon())
+        else:
+            self._box_id = self.canvas.create_polygon(*self._box_polygon(), outline='red', fill='', dash=(4, 2), width=1, tags=(SELECTION_BOX_TAG, CHROME_TAG))
@@ -2,9 +2,15 @@
 shapes.py - Shape drawing logic for the Paint App
 """
 
+import math
+
+SHAPE_TAG = 'shape'
+
 class Shape:
     """
     Base class for shapes, now supports selection and manipulation.
+    Each shape owns at most one canvas item; drawing again updates that item's
+    coordinates and style in place instead of deleting and re-creating it.
     """
     _id_counter = 0
     def __init__(self, start, end):
@@ -14,10 +20,35 @@ class Shape:
         Shape._id_counter += 1
         self.canvas_id = None
         self.selected = False
+        self.outline = 'black'
+        self.width = 3
+
+    def coords(self, dx=0, dy=0):
+        """Return the flat canvas coordinates of the shape, optionally offset."""
+        return (self.start[0] + dx, self.start[1] + dy, self.end[0] + dx, self.end[1] + dy)
 
-    def draw(self, canvas, outline='black', width=3, temp=False):
+    def style(self, outline, width, temp):
+        """Return the canvas item options for the given outline, width and preview flag."""
+        return {'outline': outline, 'width': width, 'dash': (2, 2) if temp else ''}
+
+    def create(self, canvas, coords, **style):
         # To be implemented by subclasses
-        pass
+        return None
+
+    def draw(self, canvas, outline=None, width=None, temp=False, tags=SHAPE_TAG):
+        """Create the canvas item on first use, then update it in place."""
+        style = self.style(outline or self.outline, width or self.width, temp)
+        if self.canvas_id:
+            canvas.coords(self.canvas_id, *self.coords())
+            canvas.itemconfig(self.canvas_id, **style)
+        else:
+            self.canvas_id = self.create(canvas, self.coords(), tags=tags, **style)
+        return self.canvas_id
+
+    def preview_move(self, canvas, dx, dy):
+        """Show the shape offset by (dx, dy) without committing the new geometry."""
+        if self.canvas_id:
+            canvas.coords(self.canvas_id, *self.coords(dx, dy))
 
     def contains(self, x, y):
         # To be implemented by subclasses for hit-testing
@@ -30,27 +61,63 @@ class Shape:
     def resize(self, new_end):
         self.end = new_end
 
+    def scale(self, cx, cy, fx, fy):
+        """Scale the shape geometry about (cx, cy)."""
+        self.start = (cx + (self.start[0] - cx) * fx, cy + (self.start[1] - cy) * fy)
+        self.end = (cx + (self.end[0] - cx) * fx, cy + (self.end[1] - cy) * fy)
+
+    def rotate(self, cx, cy, angle):
+        """Rotate the shape about (cx, cy) by angle radians.
+
+        Canvas rectangles and ovals stay axis-aligned, so their centre is rotated
+        and their extents are swapped on odd quarter turns.
+        """
+        mx, my = rotate_point((self.start[0] + self.end[0]) / 2, (self.start[1] + self.end[1]) / 2, cx, cy, angle)
+        hw, hh = abs(self.end[0] - self.start[0]) / 2, abs(self.end[1] - self.start[1]) / 2
+        if round(angle / (math.pi / 2)) % 2:
+            hw, hh = hh, hw
+        self.start = (mx - hw, my - hh)
+        self.end = (mx + hw, my + hh)
+
     def delete(self, canvas):
         if self.canvas_id:
             canvas.delete(self.canvas_id)
+            self.canvas_id = None
 
 class Rectangle(Shape):
-    def draw(self, canvas, outline='black', width=3, temp=False):
-        if self.canvas_id:
-            canvas.delete(self.canvas_id)
-        self.canvas_id = canvas.create_rectangle(self.start[0], self.start[1], self.end[0], self.end[1], outline=outline, width=width, dash=(2, 2) if temp else None)
-        return self.canvas_id
+    def create(self, canvas, coords, **style):
+        return canvas.create_rectangle(*coords, **style)
     def contains(self, x, y):
         x0, y0, x1, y1 = min(self.start[0], self.end[0]), min(self.start[1], self.end[1]), max(self.start[0], self.end[0]), max(self.start[1], self.end[1])
         return x0 <= x <= x1 and y0 <= y <= y1
 
 class Oval(Shape):
-    def draw(self, canvas, outline='black', width=3, temp=False):
-        if self.canvas_id:
-            canvas.delete(self.canvas_id)
-        self.canvas_id = canvas.create_oval(self.start[0], self.start[1], self.end[0], self.end[1], outline=outline, width=width, dash=(2, 2) if temp else None)
-        return self.canvas_id
+    def create(self, canvas, coords, **style):
+        return canvas.create_oval(*coords, **style)
     def contains(self, x, y):
         x0, y0, x1, y1 = min(self.start[0], self.end[0]), min(self.start[1], self.end[1]), max(self.start[0], self.end[0]), max(self.start[1], self.end[1])
         # Simple bounding box check for now
-        return x0 <= x <= x1 and y0 <= y <= y1 
\ No newline at end of file
+        return x0 <= x <= x1 and y0 <= y <= y1
+
+class Line(Shape):
+    def style(self, outline, width, temp):
+        return {'fill': outline, 'width': width, 'dash': (2, 2) if temp else ''}
+    def create(self, canvas, coords, **style):
+        return canvas.create_line(*coords, **style)
+    def rotate(self, cx, cy, angle):
+        self.start = rotate_point(self.start[0], self.start[1], cx, cy, angle)
+        self.end = rotate_point(self.end[0], self.end[1], cx, cy, angle)
+    def contains(self, x, y):
+        (x0, y0), (x1, y1) = self.start, self.end
+        dx, dy = x1 - x0, y1 - y0
+        length_sq = dx * dx + dy * dy
+        t = 0 if length_sq == 0 else max(0, min(1, ((x - x0) * dx + (y - y0) * dy) / length_sq))
+        px, py = x0 + t * dx, y0 + t * dy
+        reach = self.width / 2 + 3
+        return (x - px) ** 2 + (y - py) ** 2 <= reach * reach
+
+
+def rotate_point(x, y, cx, cy, angle):
+    """Rotate the point (x, y) about (cx, cy) by angle radians."""
+    cos_a, sin_a = math.cos(angle), math.sin(angle)
+    return (cx + (x - cx) * cos_a - (y - cy) * sin_a, cy + (x - cx) * sin_a + (y - cy) * cos_a)
@@ -0,0 +1,128 @@
+"""
+stall_watchdog.py - Event-loop stall watchdog for the Paint App
+
+A Tk after() heartbeat records when the main loop last ran. A daemon thread
+looks at it every interval. Once the heartbeat is overdue by more than the
+threshold, the thread captures the main thread's stack with
+sys._current_frames(), and samples it again after each further threshold
+until the loop comes back. It then writes one report to a size-rotated log:
+how long the loop was stalled and where the main thread spent that time.
+
+The watchdog is opt-in. Set PAINT_STALL_MS to a threshold in milliseconds
+before starting the app, or call StallWatchdog(root).start().
+"""
+
+import logging
+import logging.handlers
+import os
+import sys
+import threading
+import time
+import traceback
+
+STALL_THRESHOLD = 0.25
+LOG_BYTES = 1 << 20
+LOG_BACKUPS = 3
+
+def default_log_path():
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'paint_app', 'stalls.log')
+
+class StallWatchdog:
+    """
+    Reports main-loop stalls longer than threshold seconds. Create and start it
+    on the Tk thread; that is the thread whose stack is captured. A stall that
+    holds the GIL in C code also holds up this thread, so it is reported late
+    and only from the point where Python code runs again.
+    """
+    def __init__(self, root, threshold=STALL_THRESHOLD, interval=None, log_path=None, max_bytes=LOG_BYTES, backups=LOG_BACKUPS):
+        self.root = root
+        self.threshold = threshold
+        self.interval = interval or threshold / 4
+        self.log_path = log_path or default_log_path()
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.stalls = 0
+        self._main_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        # (last heartbeat before the stall, [(seconds overdue, stack lines)]) while stalled
+        self._stall = None
+        self._after_id = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._handler = None
+        self.logger = logging.getLogger('paint_app.stalls')
+
+    def start(self):
+        """Start the heartbeat and the watching thread. Returns self."""
+        directory = os.path.dirname(self.log_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._handler = logging.handlers.RotatingFileHandler(self.log_path, maxBytes=self.max_bytes, backupCount=self.backups, encoding='utf-8')
+        self._handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+        self.logger.addHandler(self._handler)
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self._stop.clear()
+        self._beat()
+        self._thread = threading.Thread(target=self._run, name='stall-watchdog', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop watching, reporting a stall that is still in progress, and close the log."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+        if self._stall is not None:
+            self._report(time.monotonic() - self._stall[0] - self.interval, self._stall[1], ended=False)
+            self._stall = None
+        if self._handler is not None:
+            self.logger.removeHandler(self._handler)
+            self._handler.close()
+            self._handler = None
+
+    def _beat(self):
+        self._last_beat = time.monotonic()
+        self._after_id = self.root.after(max(1, int(self.interval * 1000)), self._beat)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def check(self, now=None):
+        """Compare the heartbeat with the clock once; the watching thread calls this every interval."""
+        now = time.monotonic() if now is None else now
+        beat = self._last_beat
+        if self._stall is not None and beat > self._stall[0]:
+            self._report(beat - self._stall[0] - self.interval, self._stall[1])
+            self._stall = None
+        overdue = now - beat - self.interval
+        if overdue <= self.threshold:
+            return
+        if self._stall is None:
+            self._stall = (beat, [])
+        samples = self._stall[1]
+        if not samples or overdue - samples[-1][0] >= self.threshold:
+            samples.append((overdue, self._main_stack()))
+
+    def _main_stack(self):
+        frame = sys._current_frames().get(self._main_id)
+        return traceback.format_stack(frame) if frame is not None else []
+
+    def _report(self, duration, samples, ended=True):
+        self.stalls += 1
+        lines = [f"Main loop stalled for {duration:.3f} s" + ("" if ended else " (still stalled when the watchdog stopped)")]
+        previous = None
+        for overdue, stack in samples:
+            if stack == previous:
+                lines.append(f"  same stack at +{overdue:.3f} s")
+                continue
+            lines.append(f"  stack at +{overdue:.3f} s:")
+            lines.extend('  ' + line.rstrip('\n').replace('\n', '\n  ') for line in stack)
+            previous = stack
+        self.logger.warning('\n'.join(lines))
@@ -0,0 +1,448 @@
+"""
+svg_import.py - Streaming SVG import for the Paint App
+
+iter_svg() reads an SVG with an event-based parser and yields canvas entries
+as each element closes, dropping the element straight away, so the whole
+document tree never sits in memory. Entries use the (kind, coords, options,
+is_shape) form of PaintCanvas.create_from_snapshot(). Rectangles, ellipses
+and lines become editable shapes, and paths and polylines become strokes or
+filled polygons. Each top-level group yields ('layer', name) first, and the
+importer turns that into a new layer. SvgImport builds the items a chunk at
+a time from after_idle() callbacks.
+"""
+
+import math
+import os
+import re
+import xml.etree.ElementTree as ET
+from itertools import islice
+import numpy as np
+from PIL import ImageColor
+
+IDENTITY = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+# Elements whose content is not drawn directly
+SKIPPED = {'defs', 'clipPath', 'mask', 'symbol', 'marker', 'pattern', 'style', 'script', 'metadata', 'title', 'desc', 'linearGradient', 'radialGradient', 'filter'}
+INHERITED = ('fill', 'stroke', 'stroke-width', 'font-size', 'font-family')
+DEFAULT_STYLE = {'fill': 'black', 'stroke': 'none', 'stroke-width': '1', 'font-size': '16', 'font-family': 'Arial'}
+UNITS = {'px': 1.0, 'pt': 4 / 3, 'pc': 16.0, 'mm': 96 / 25.4, 'cm': 96 / 2.54, 'in': 96.0}
+CURVE_SEGMENTS = 12
+ELLIPSE_SEGMENTS = 32
+INKSCAPE_LABEL = '{http://www.inkscape.org/namespaces/inkscape}label'
+_NUMBER = r'[-+]?(?:\d*\.\d+|\d+\.?)(?:[eE][-+]?\d+)?'
+_PATH_TOKEN = re.compile(rf'([MmLlHhVvCcSsQqTtAaZz])|({_NUMBER})')
+_TRANSFORM = re.compile(r'(matrix|translate|scale|rotate|skewX|skewY)\s*\(([^)]*)\)')
+
+def _local(tag):
+    return tag.rsplit('}', 1)[-1]
+
+def _numbers(text):
+    return [float(value) for value in re.findall(_NUMBER, text or '')]
+
+def _length(value, default=0.0):
+    """Parse an SVG length in user units; percentages fall back to default."""
+    match = re.match(rf'\s*({_NUMBER})\s*([a-z%]*)', value or '')
+    if not match or match.group(2) == '%':
+        return default
+    return float(match.group(1)) * UNITS.get(match.group(2), 1.0)
+
+def multiply(m, n):
+    """Compose affine transforms (a, b, c, d, e, f): the result applies n first, then m."""
+    a, b, c, d, e, f = m
+    a2, b2, c2, d2, e2, f2 = n
+    return (a * a2 + c * b2, b * a2 + d * b2, a * c2 + c * d2, b * c2 + d * d2, a * e2 + c * f2 + e, b * e2 + d * f2 + f)
+
+def parse_transform(text):
+    """Parse an SVG transform attribute into one affine transform."""
+    matrix = IDENTITY
+    for name, args in _TRANSFORM.findall(text or ''):
+        values = _numbers(args)
+        if name == 'matrix' and len(values) == 6:
+            step = tuple(values)
+        elif name == 'translate' and values:
+            step = (1, 0, 0, 1, values[0], values[1] if len(values) > 1 else 0)
+        elif name == 'scale' and values:
+            step = (values[0], 0, 0, values[-1] if len(values) > 1 else values[0], 0, 0)
+        elif name == 'rotate' and values:
+            angle = math.radians(values[0])
+            cos, sin = math.cos(angle), math.sin(angle)
+            step = (cos, sin, -sin, cos, 0, 0)
+            if len(values) == 3:
+                cx, cy = values[1:]
+                step = multiply(multiply((1, 0, 0, 1, cx, cy), step), (1, 0, 0, 1, -cx, -cy))
+        elif name == 'skewX' and values:
+            step = (1, 0, math.tan(math.radians(values[0])), 1, 0, 0)
+        elif name == 'skewY' and values:
+            step = (1, math.tan(math.radians(values[0])), 0, 1, 0, 0)
+        else:
+            continue
+        matrix = multiply(matrix, step)
+    return matrix
+
+def apply(matrix, points):
+    """Transform an (n, 2) array of points."""
+    a, b, c, d, e, f = matrix
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    return np.column_stack([a * points[:, 0] + c * points[:, 1] + e, b * points[:, 0] + d * points[:, 1] + f])
+
+def parse_color(value):
+    """
+    Convert an SVG paint to a '#rrggbb' Tk colour, or '' for none. Colours
+    that cannot be read are treated as none rather than passed on to Tk.
+    """
+    value = (value or '').strip()
+    if value in ('', 'none', 'transparent') or value.startswith('url('):
+        return ''
+    if value == 'currentColor':
+        return 'black'
+    if value.startswith('rgb'):
+        parts = re.findall(r'([-+\d.]+)(%?)', value)[:3]
+        channels = [float(v) * 2.55 if pct else float(v) for v, pct in parts]
+        return '#%02x%02x%02x' % tuple(max(0, min(255, round(c))) for c in channels)
+    try:
+        # CSS names such as rebeccapurple, hsl() and #rgba forms Tk does not know
+        return '#%02x%02x%02x' % ImageColor.getrgb(value)[:3]
+    except ValueError:
+        return ''
+
+def _arc(start, rx, ry, rotation, large, sweep, end):
+    """Flatten an elliptical arc to points after start, following the SVG endpoint parameterization."""
+    (x1, y1), (x2, y2) = start, end
+    if not rx or not ry or start == end:
+        return [end]
+    rx, ry = abs(rx), abs(ry)
+    phi = math.radians(rotation)
+    cos, sin = math.cos(phi), math.sin(phi)
+    dx, dy = (x1 - x2) / 2, (y1 - y2) / 2
+    x1p, y1p = cos * dx + sin * dy, -sin * dx + cos * dy
+    scale = x1p ** 2 / rx ** 2 + y1p ** 2 / ry ** 2
+    if scale > 1:
+        rx, ry = rx * math.sqrt(scale), ry * math.sqrt(scale)
+    numerator = rx * rx * ry * ry - rx * rx * y1p * y1p - ry * ry * x1p * x1p
+    factor = math.sqrt(max(0.0, numerator / (rx * rx * y1p * y1p + ry * ry * x1p * x1p)))
+    if large == sweep:
+        factor = -factor
+    cxp, cyp = factor * rx * y1p / ry, -factor * ry * x1p / rx
+    cx, cy = cos * cxp - sin * cyp + (x1 + x2) / 2, sin * cxp + cos * cyp + (y1 + y2) / 2
+    theta = math.atan2((y1p - cyp) / ry, (x1p - cxp) / rx)
+    delta = math.atan2((-y1p - cyp) / ry, (-x1p - cxp) / rx) - theta
+    if sweep and delta < 0:
+        delta += 2 * math.pi
+    elif not sweep and delta > 0:
+        delta -= 2 * math.pi
+    angles = theta + delta * np.arange(1, CURVE_SEGMENTS + 1) / CURVE_SEGMENTS
+    xs, ys = rx * np.cos(angles), ry * np.sin(angles)
+    points = np.column_stack([cx + cos * xs - sin * ys, cy + sin * xs + cos * ys])
+    points[-1] = end
+    return list(map(tuple, points.tolist()))
+
+_T = np.arange(1, CURVE_SEGMENTS + 1)[:, None] / CURVE_SEGMENTS
+# Bernstein weights at each sample, so flattening a curve is one small matrix product
+QUADRATIC = np.hstack([(1 - _T) ** 2, 2 * (1 - _T) * _T, _T ** 2])
+CUBIC = np.hstack([(1 - _T) ** 3, 3 * (1 - _T) ** 2 * _T, 3 * (1 - _T) * _T ** 2, _T ** 3])
+
+def _bezier(points):
+    """Points along a quadratic or cubic Bezier after its start point."""
+    return list(map(tuple, ((QUADRATIC if len(points) == 3 else CUBIC) @ np.asarray(points, dtype=float)).tolist()))
+
+def parse_path(d):
+    """Flatten path data into a list of (points, closed) subpaths."""
+    tokens = [(command, float(number) if number else None) for command, number in _PATH_TOKEN.findall(d or '')]
+    subpaths, points = [], []
+    current = start = (0.0, 0.0)
+    control = None
+    command, i = None, 0
+
+    def take(count):
+        nonlocal i
+        values = [value for _, value in tokens[i:i + count]]
+        if len(values) < count or any(value is None for value in values):
+            raise ValueError("truncated path data")
+        i += count
+        return values
+
+    def finish(closed):
+        if len(points) > 1:
+            subpaths.append((list(points), closed))
+
+    while i < len(tokens):
+        if tokens[i][0]:
+            command = tokens[i][0]
+            i += 1
+        elif command is None:
+            break
+        relative = command.islower()
+        name = command.upper()
+        ox, oy = current if relative else (0.0, 0.0)
+        try:
+            if name == 'Z':
+                finish(True)
+                points, current, control, command = [], start, None, None
+                continue
+            if name == 'M':
+                x, y = take(2)
+                finish(False)
+                current = start = (ox + x, oy + y)
+                points, control = [current], None
+                # Further coordinate pairs are implicit line-tos
+                command = 'l' if relative else 'L'
+                continue
+            if not points:
+                points = [current]
+            if name in 'LHV':
+                if name == 'L':
+                    x, y = take(2)
+                    current = (ox + x, oy + y)
+                elif name == 'H':
+                    current = (ox + take(1)[0], current[1])
+                else:
+                    current = (current[0], oy + take(1)[0])
+                points.append(current)
+                control = None
+            elif name in 'CS':
+                if name == 'C':
+                    x1, y1, x2, y2, x, y = take(6)
+                    c1 = (ox + x1, oy + y1)
+                else:
+                    x2, y2, x, y = take(4)
+                    c1 = (2 * current[0] - control[0], 2 * current[1] - control[1]) if control and control[2] == 'C' else current
+                c2, end = (ox + x2, oy + y2), (ox + x, oy + y)
+                points.extend(_bezier([current, c1[:2], c2, end]))
+                current, control = end, (c2[0], c2[1], 'C')
+            elif name in 'QT':
+                if name == 'Q':
+                    x1, y1, x, y = take(4)
+                    c1 = (ox + x1, oy + y1)
+                else:
+                    x, y = take(2)
+                    c1 = (2 * current[0] - control[0], 2 * current[1] - control[1]) if control and control[2] == 'Q' else current
+                end = (ox + x, oy + y)
+                points.extend(_bezier([current, c1[:2], end]))
+                current, control = end, (c1[0], c1[1], 'Q')
+            elif name == 'A':
+                rx, ry, rotation, large, sweep, x, y = take(7)
+                end = (ox + x, oy + y)
+                points.extend(_arc(current, rx, ry, rotation, bool(large), bool(sweep), end))
+                current, control = end, None
+        except ValueError:
+            break
+    finish(False)
+    return subpaths
+
+def _style(element, parent):
+    """The element's inherited presentation properties, from attributes and its style attribute."""
+    style = dict(parent)
+    for key in INHERITED + ('display', 'visibility'):
+        if key in element.attrib:
+            style[key] = element.attrib[key]
+    for declaration in element.attrib.get('style', '').split(';'):
+        key, _, value = declaration.partition(':')
+        if value.strip():
+            style[key.strip()] = value.strip()
+    return style
+
+def _root_transform(element):
+    """Map the root viewBox onto the document's width and height."""
+    box = _numbers(element.attrib.get('viewBox'))
+    if len(box) != 4 or not box[2] or not box[3]:
+        return IDENTITY
+    width, height = _length(element.attrib.get('width'), box[2]), _length(element.attrib.get('height'), box[3])
+    sx, sy = width / box[2], height / box[3]
+    return (sx, 0, 0, sy, -box[0] * sx, -box[1] * sy)
+
+def _paint(style, matrix):
+    fill, stroke = parse_color(style.get('fill')), parse_color(style.get('stroke'))
+    width = _length(style.get('stroke-width'), 1.0) * math.sqrt(abs(matrix[0] * matrix[3] - matrix[1] * matrix[2]))
+    return fill, stroke, max(1.0, width)
+
+def _box_entry(kind, x, y, w, h, style, matrix):
+    """A rectangle or ellipse: an editable shape when the transform keeps it axis-aligned."""
+    if w <= 0 or h <= 0:
+        return None
+    fill, stroke, width = _paint(style, matrix)
+    if not fill and not stroke:
+        return None
+    if abs(matrix[1]) < 1e-9 and abs(matrix[2]) < 1e-9:
+        (x0, y0), (x1, y1) = apply(matrix, [(x, y), (x + w, y + h)]).tolist()
+        return (kind, [min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1)], {'fill': fill, 'outline': stroke, 'width': width if stroke else 1}, True)
+    if kind == 'rectangle':
+        corners = [(x, y), (x + w, y), (x + w, y + h), (x, y + h)]
+    else:
+        angles = 2 * math.pi * np.arange(ELLIPSE_SEGMENTS) / ELLIPSE_SEGMENTS
+        corners = np.column_stack([x + w / 2 * (1 + np.cos(angles)), y + h / 2 * (1 + np.sin(angles))])
+    return ('polygon', apply(matrix, corners).ravel().tolist(), {'fill': fill, 'outline': stroke, 'width': width if stroke else 1}, False)
+
+def _poly_entries(subpaths, style, matrix):
+    fill, stroke, width = _paint(style, matrix)
+    for points, closed in subpaths:
+        coords = apply(matrix, points).ravel().tolist()
+        if fill and len(coords) >= 6:
+            yield ('polygon', coords, {'fill': fill, 'outline': stroke, 'width': width if stroke else 1}, False)
+        elif stroke:
+            if closed:
+                coords += coords[:2]
+            yield ('line', coords, {'fill': stroke, 'width': width}, False)
+
+def element_entries(element, style, matrix):
+    """Yield the canvas entries for one closed SVG element."""
+    name, attrib = _local(element.tag), element.attrib
+
+    def get(key):
+        return _length(attrib.get(key))
+
+    if name == 'rect':
+        entry = _box_entry('rectangle', get('x'), get('y'), get('width'), get('height'), style, matrix)
+    elif name == 'circle':
+        r = get('r')
+        entry = _box_entry('oval', get('cx') - r, get('cy') - r, 2 * r, 2 * r, style, matrix)
+    elif name == 'ellipse':
+        rx, ry = get('rx'), get('ry')
+        entry = _box_entry('oval', get('cx') - rx, get('cy') - ry, 2 * rx, 2 * ry, style, matrix)
+    elif name == 'line':
+        _, stroke, width = _paint(style, matrix)
+        coords = apply(matrix, [(get('x1'), get('y1')), (get('x2'), get('y2'))]).ravel().tolist()
+        entry = ('line', coords, {'fill': stroke, 'width': width}, True) if stroke else None
+    elif name in ('polyline', 'polygon'):
+        values = _numbers(attrib.get('points'))
+        points = list(zip(values[0::2], values[1::2]))
+        yield from _poly_entries([(points, name == 'polygon')] if len(points) > 1 else [], style, matrix)
+        return
+    elif name == 'path':
+        yield from _poly_entries(parse_path(attrib.get('d')), style, matrix)
+        return
+    elif name == 'text':
+        text = ' '.join(''.join(element.itertext()).split())
+        xs, ys = _numbers(attrib.get('x')), _numbers(attrib.get('y'))
+        if not text:
+            return
+        (x, y), = apply(matrix, [(xs[0] if xs else 0.0, ys[0] if ys else 0.0)]).tolist()
+        size = _length(style.get('font-size'), 16.0) * math.sqrt(abs(matrix[0] * matrix[3] - matrix[1] * matrix[2]))
+        family = style.get('font-family', 'Arial').split(',')[0].strip(' \'"')
+        entry = ('text', [x, y], {'text': text, 'fill': parse_color(style.get('fill')) or 'black', 'font': (family, -max(1, round(size))), 'anchor': 'sw'}, False)
+    else:
+        return
+    if entry is not None:
+        yield entry
+
+def iter_svg(source):
+    """
+    Parse an SVG file or path incrementally and yield canvas entries, plus
+    ('layer', name) before the content of each top-level group.
+    """
+    stack = []
+    skipping = 0
+    in_text = 0
+    for event, element in ET.iterparse(source, events=('start', 'end')):
+        name = _local(element.tag)
+        if event == 'start':
+            parent_style, parent_matrix = stack[-1][1:3] if stack else (DEFAULT_STYLE, IDENTITY)
+            if not stack:
+                matrix = _root_transform(element)
+            else:
+                matrix = multiply(parent_matrix, parse_transform(element.attrib.get('transform')))
+            style = _style(element, parent_style)
+            hidden = skipping or name in SKIPPED or style.get('display') == 'none'
+            stack.append((element, style, matrix, hidden))
+            if hidden:
+                skipping += 1
+            elif name == 'text':
+                in_text += 1
+            elif name == 'g' and len(stack) == 2:
+                yield ('layer', element.attrib.get(INKSCAPE_LABEL) or element.attrib.get('id') or 'Imported')
+            continue
+        element, style, matrix, hidden = stack.pop()
+        if hidden:
+            skipping -= 1
+        elif name == 'text':
+            in_text -= 1
+        if in_text:
+            # Text runs are read when their text element closes
+            continue
+        if not hidden and style.get('visibility') not in ('hidden', 'collapse'):
+            yield from element_entries(element, style, matrix)
+        # Drop the finished element so the tree never grows
+        element.clear()
+        if stack:
+            parent = stack[-1][0]
+            if len(parent) and parent[-1] is element:
+                del parent[-1]
+
+class SvgImport:
+    """
+    Streams an SVG file onto a canvas. Entries are parsed lazily and built
+    chunk_size at a time from after_idle() callbacks, so the UI keeps
+    responding. Each top-level group becomes a new layer, and all the imported
+    items form one undo action.
+    """
+    def __init__(self, canvas, path, chunk_size=500, on_progress=None, on_done=None):
+        self.canvas = canvas
+        self.path = path
+        self.chunk_size = chunk_size
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.layer = canvas.layers[canvas.current_layer]
+        self.item_ids = []
+        self.error = None
+        self.done = False
+        self._file = open(path, 'rb')
+        self._size = max(1, os.fstat(self._file.fileno()).st_size)
+        self._entries = iter_svg(self._file)
+        self._job = None
+
+    @property
+    def progress(self):
+        return 1.0 if self.done else self._file.tell() / self._size
+
+    def start(self):
+        self._job = self.canvas.after_idle(self._run)
+        return self
+
+    def _run(self):
+        if self.step():
+            if self.on_progress:
+                self.on_progress(self)
+            self._job = self.canvas.after_idle(self._run)
+        else:
+            self._job = None
+
+    def step(self):
+        """Build up to chunk_size items. Returns False once the import has finished."""
+        canvas = self.canvas
+        count = 0
+        more = False
+        try:
+            for entry in islice(self._entries, self.chunk_size):
+                count += 1
+                if entry[0] == 'layer':
+                    self.layer = canvas.add_layer()
+                    canvas.rename_layer(len(canvas.layers) - 1, entry[1])
+                    continue
+                with canvas.drawing_on(self.layer):
+                    item_id = canvas.create_from_snapshot(*entry[:3], shape=entry[3])
+                if item_id:
+                    self.item_ids.append(item_id)
+            more = count == self.chunk_size
+        except ET.ParseError as e:
+            self.error = e
+        except Exception as e:
+            self.error = e
+            raise
+        finally:
+            # Any other error still closes the file and keeps the items built so far
+            if not more:
+                self._finish()
+        return more
+
+    def _finish(self):
+        self.done = True
+        self._file.close()
+        self.canvas.push_action(self.item_ids)
+        if self.on_done:
+            self.on_done(self)
+
+    def cancel(self):
+        """Stop importing; the items built so far stay as one undo action."""
+        if self._job is not None:
+            self.canvas.after_cancel(self._job)
+            self._job = None
+        if not self.done:
+            self._finish()
@@ -0,0 +1,89 @@
+"""
+symmetry.py - Rotational and mirror symmetry drawing for the Paint App
+"""
+
+import math
+import numpy as np
+from layers import CHROME_TAG
+from tools import Tool, _event_time
+
+SYMMETRY_PREVIEW_TAG = 'symmetry_preview'
+
+def symmetry_matrices(ways, mirror=False):
+    """Return the (K, 2, 2) transforms of an N-way rotational group, plus reflections if mirror is set."""
+    angles = 2 * math.pi * np.arange(ways) / ways
+    cos, sin = np.cos(angles), np.sin(angles)
+    rotations = np.stack([np.stack([cos, -sin], -1), np.stack([sin, cos], -1)], 1)
+    if not mirror:
+        return rotations
+    # Each rotation followed by a flip about the horizontal axis
+    return np.concatenate([rotations, rotations * np.array([[1], [-1]])])
+
+def replicate(points, matrices, center):
+    """Map (n, 2) points through every transform about center; returns (K, n, 2)."""
+    center = np.asarray(center, dtype=float)
+    return np.einsum('kij,nj->kni', matrices, np.asarray(points, dtype=float) - center) + center
+
+class SymmetryTool(Tool):
+    """
+    Wraps a stroke tool so every input point is replicated across all symmetry axes.
+    While dragging, each new segment is transformed for every copy in one array
+    operation and previewed as thin lines. On release the preview is removed and
+    the wrapped tool draws each transformed stroke once with draw_stroke(), so a
+    copy of the stroke is a single canvas item.
+    """
+    freehand = True
+
+    def __init__(self, tool, ways=6, mirror=False, center=None):
+        super().__init__(tool.name)
+        self.tool = tool
+        self.ways = ways
+        self.mirror = mirror
+        self.center = center
+        self.matrices = symmetry_matrices(ways, mirror)
+        self._points = []
+        self._times = []
+        self._center = None
+
+    @property
+    def color(self):
+        return getattr(self.tool, 'color', 'white')
+
+    @color.setter
+    def color(self, value):
+        self.tool.color = value
+
+    @property
+    def size(self):
+        return self.tool.size
+
+    @size.setter
+    def size(self, value):
+        self.tool.size = value
+
+    def on_press(self, event, canvas):
+        self._center = self.center or (canvas.winfo_width() / 2, canvas.winfo_height() / 2)
+        self._points = [(event.x, event.y)]
+        self._times = [_event_time(event)]
+        return None
+
+    def on_drag(self, event, canvas):
+        if not self._points:
+            return None
+        segments = replicate([self._points[-1], (event.x, event.y)], self.matrices, self._center)
+        width = max(1, self.size // 2)
+        for segment in segments.reshape(len(segments), 4).tolist():
+            canvas.create_line(*segment, fill=self.color, width=width, capstyle='round', tags=(SYMMETRY_PREVIEW_TAG, CHROME_TAG))
+        self._points.append((event.x, event.y))
+        self._times.append(_event_time(event))
+        return None
+
+    def on_release(self, event, canvas):
+        if not self._points:
+            return None
+        canvas.delete(SYMMETRY_PREVIEW_TAG)
+        strokes = replicate(self._points, self.matrices, self._center)
+        times = np.asarray(self._times, dtype=float)
+        self._points, self._times = [], []
+        item_ids = [self.tool.draw_stroke(canvas, stroke, times) for stroke in strokes]
+        return [item_id for item_id in item_ids if item_id]
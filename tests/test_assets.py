@@ -0,0 +1,30 @@
+from PIL import Image
+from assets import AssetStore
+
+class FakePhoto:
+    def __init__(self, image):
+        self.size = image.size
+
+def test_same_content_is_stored_once(tmp_path):
+    first, second = tmp_path / 'a.png', tmp_path / 'b.png'
+    Image.new('RGB', (8, 8), 'red').save(first)
+    second.write_bytes(first.read_bytes())
+    store = AssetStore(photo_factory=FakePhoto)
+    key = store.add_file(first)
+    assert store.add_file(second) == key
+    assert len(store.sources) == 1
+    assert store.add_image(Image.new('RGB', (8, 8), 'blue')) != key
+
+def test_variants_are_shared_and_evicted_lru():
+    store = AssetStore(max_bytes=2500, photo_factory=FakePhoto)
+    key = store.add_image(Image.new('RGB', (20, 20), 'red'))
+    photo = store.photo(key, (10, 10))
+    assert photo.size == (10, 10)
+    assert store.photo(key, (10, 10)) is photo
+    assert store.photo(key).size == (20, 20)
+    store.photo(key, (10, 10))
+    store.photo(key, (11, 9))
+    # The full-size variant was least recently used
+    assert (key, (20, 20)) not in store.variants
+    assert (key, (10, 10)) in store.variants
+    assert store.cached_bytes <= store.max_bytes
@@ -0,0 +1,109 @@
+from contextlib import contextmanager
+from baking import Baker
+from layers import Layer
+from renderer import iter_snapshot
+from shapes import SHAPE_TAG
+from timelapse import history_actions
+
+class FakePhoto:
+    def __init__(self, image):
+        self.pasted = 0
+    def paste(self, image):
+        self.pasted += 1
+
+class BakeCanvas:
+    """Lines and rectangles in stacking order, plus the image bookkeeping of PaintCanvas."""
+    def __init__(self):
+        self.items = {}
+        self.images = {}
+        self.bake_tiles = {}
+        self.baked_history = []
+        self.undo_stack = []
+        self._archives = {}
+        self._raster_steps = {}
+        self.next_id = 1
+
+    def _add(self, kind, coords, options, tags=()):
+        item_id, self.next_id = self.next_id, self.next_id + 1
+        self.items[item_id] = (kind, list(coords), options, tags)
+        return item_id
+
+    def create_line(self, *coords, tags=()):
+        return self._add('line', coords, {'fill': 'red', 'width': '4'}, tags)
+
+    def create_rectangle(self, *coords, tags=()):
+        return self._add('rectangle', coords, {'fill': 'blue', 'outline': '', 'width': '1'}, tags)
+
+    def find_withtag(self, tag):
+        return tuple(self.items)
+
+    def bbox(self, item_id):
+        coords = self.items[item_id][1]
+        return min(coords[0::2]) - 2, min(coords[1::2]) - 2, max(coords[0::2]) + 2, max(coords[1::2]) + 2
+
+    def gettags(self, item_id):
+        return self.items[item_id][3]
+
+    def type(self, item_id):
+        return self.items[item_id][0] if item_id in self.items else ''
+
+    def coords(self, item_id):
+        return self.items[item_id][1]
+
+    def itemcget(self, item_id, option):
+        return self.items[item_id][2].get(option, '')
+
+    def delete(self, *item_ids):
+        for item_id in item_ids:
+            self.items.pop(item_id, None)
+
+    @contextmanager
+    def drawing_on(self, layer):
+        yield layer
+
+    def place_image(self, x, y, image):
+        item_id = self._add('image', (x, y), {'anchor': 'nw'})
+        # Tiles go to the bottom of the stack
+        self.items = {item_id: self.items.pop(item_id), **self.items}
+        self.images[item_id] = (FakePhoto(image), image)
+        return item_id
+
+    def tag_lower(self, item_id, tag):
+        pass
+
+def test_bake_flattens_old_strokes_and_keeps_live_ones():
+    canvas, layer = BakeCanvas(), Layer("Layer 1")
+    old = [canvas.create_line(10, 10 + i, 600, 10 + i) for i in range(5)]
+    shape = canvas.create_rectangle(300, 300, 340, 340, tags=(SHAPE_TAG,))
+    over_shape = canvas.create_line(290, 320, 350, 320)
+    recent = canvas.create_line(20, 400, 60, 400)
+    canvas.undo_stack = [[item_id] for item_id in old + [shape, over_shape, recent]]
+    baked = Baker(canvas, threshold=4, keep_actions=1, tile_size=256).bake(layer)
+    assert baked == 5
+    assert canvas.undo_stack == [[recent]]
+    assert len(canvas.baked_history) == 7
+    assert set(layer.tiles) == {(0, 0), (1, 0), (2, 0)}
+    assert shape in canvas.items and over_shape in canvas.items and recent in canvas.items
+    assert not any(item_id in canvas.items for item_id in old)
+    tile = canvas.images[layer.tiles[(0, 0)]][1]
+    assert tile.getpixel((100, 12)) == (255, 0, 0, 255)
+
+def test_items_outside_the_history_are_not_baked():
+    canvas, layer = BakeCanvas(), Layer("Layer 1")
+    for i in range(5):
+        canvas.undo_stack.append([canvas.create_line(0, i * 10, 400, i * 10)])
+    # Like a brush sparkle: layer content that no undo action owns
+    sparkle = canvas.create_line(600, 600, 604, 600)
+    baked = Baker(canvas, threshold=2, keep_actions=1, tile_size=256).bake(layer)
+    assert baked == 4
+    assert sparkle in canvas.items
+    assert all(entry[1] != [600, 600, 604, 600] for entry in layer.baked)
+
+def test_exports_see_baked_vectors_not_tiles():
+    canvas, layer = BakeCanvas(), Layer("Layer 1")
+    for i in range(6):
+        canvas.undo_stack.append([canvas.create_line(0, i * 10, 700, i * 10)])
+    Baker(canvas, threshold=2, keep_actions=2, tile_size=256).bake(layer)
+    snapshots = list(iter_snapshot(canvas))
+    assert [kind for kind, _, _ in snapshots] == ['line'] * 6
+    assert [len(items) for items in history_actions(canvas)] == [1] * 6
@@ -0,0 +1,39 @@
+import unittest
+import numpy as np
+from brush_engine import StrokeResampler, dynamics, render_dabs, TILE_SIZE
+
+def resample(points, spacing=2.0):
+    resampler = StrokeResampler(spacing)
+    dabs = [resampler.start(points[0][0], points[0][1], 0)[0]]
+    for i, point in enumerate(points[1:], 1):
+        dabs.append(resampler.add([point], [i * 10])[0])
+    return np.vstack(dabs)
+
+class TestBrushEngine(unittest.TestCase):
+    def test_spacing_independent_of_event_rate(self):
+        coarse = resample([(0, 0), (50, 0), (50, 30)])
+        fine = resample([(0, 0)] + [(x, 0) for x in np.arange(0.7, 50, 0.7)] + [(50, 0)] + [(50, y) for y in np.arange(1.3, 30, 1.3)] + [(50, 30)])
+        self.assertEqual(len(coarse), 41)
+        self.assertTrue(np.allclose(coarse, fine))
+
+    def test_faster_strokes_are_thinner_and_lighter(self):
+        radii, alphas = dynamics([0.0, 5.0], size=10, flow=0.5)
+        self.assertEqual(radii[0], 5.0)
+        self.assertLess(radii[1], radii[0])
+        self.assertLess(alphas[1], alphas[0])
+
+    def test_render_is_tile_aligned_and_reaches_dab_opacity(self):
+        coverage, (x0, y0) = render_dabs([(100, 100)], radii=6, alphas=0.5)
+        self.assertEqual((x0 % TILE_SIZE, y0 % TILE_SIZE), (0, 0))
+        self.assertEqual(coverage.shape, (TILE_SIZE, TILE_SIZE))
+        self.assertAlmostEqual(coverage[100 - y0, 100 - x0], 0.5, places=5)
+        self.assertEqual(coverage[0, 0], 0)
+
+    def test_overlapping_dabs_build_up_like_over(self):
+        single, _ = render_dabs([(10, 10)], radii=4, alphas=0.5)
+        double, _ = render_dabs([(10, 10), (10, 10)], radii=4, alphas=0.5)
+        self.assertAlmostEqual(double[10, 10], 0.75, places=5)
+        self.assertTrue(np.all(double >= single))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+from PIL import Image
+from assets import AssetStore
+from clipboard import Clip, Clipboard, points_in_polygon
+from layers import Layer
+
+class FakePhoto:
+    def __init__(self, image):
+        self.size = image.size
+
+class ClipCanvas:
+    """Just enough of PaintCanvas for copy and paste: rectangles and placed assets."""
+    def __init__(self):
+        self.assets = AssetStore(photo_factory=FakePhoto)
+        self.images = {}
+        self.sprites = {}
+        self.items = {}
+        self.actions = []
+        self.layers = [type('Layer', (), {'content_tag': 'content'})()]
+        self.current_layer = 0
+
+    def create_rectangle(self, *coords, fill='', outline='black', width=1):
+        item_id = len(self.items) + 1
+        self.items[item_id] = ('rectangle', list(coords), {'fill': fill, 'outline': outline, 'width': width})
+        return item_id
+
+    def find_withtag(self, tag):
+        return tuple(self.items)
+
+    def find_overlapping(self, x0, y0, x1, y1):
+        return tuple(i for i in self.items if self.bbox(i)[0] <= x1 and self.bbox(i)[2] >= x0 and self.bbox(i)[1] <= y1 and self.bbox(i)[3] >= y0)
+
+    def bbox(self, *item_ids):
+        boxes = [self.items[i][1] for i in item_ids]
+        return min(b[0] for b in boxes), min(b[1] for b in boxes), max(b[2] for b in boxes), max(b[3] for b in boxes)
+
+    def type(self, item_id):
+        return self.items[item_id][0]
+
+    def coords(self, item_id):
+        return self.items[item_id][1]
+
+    def itemcget(self, item_id, option):
+        return self.items[item_id][2].get(option, '')
+
+    def gettags(self, item_id):
+        return ()
+
+    def place_image(self, x, y, image):
+        item_id = len(self.items) + 1
+        self.items[item_id] = ('image', [x, y, x + image.width, y + image.height], {'anchor': 'nw'})
+        self.images[item_id] = (FakePhoto(image), image)
+        return item_id
+
+    def tag_lower(self, item_id, below):
+        order = [i for i in self.items if i != item_id]
+        order.insert(order.index(below), item_id)
+        self.items = {i: self.items[i] for i in order}
+
+    def itemconfigure(self, item_id, **options):
+        self.items[item_id][2].update(options)
+
+    def place_asset(self, x, y, key, size=None, anchor='nw'):
+        photo, image = self.assets.variant(key, size)
+        item_id = len(self.items) + 1
+        self.items[item_id] = ('image', [x, y, x + image.width, y + image.height], {'anchor': anchor})
+        self.images[item_id] = (photo, image)
+        return item_id
+
+    def create_from_snapshot(self, kind, coords, options, shape=False):
+        return self.create_rectangle(*coords, fill=options['fill'], outline=options['outline'], width=options['width'])
+
+    def push_action(self, item_ids):
+        self.actions.append(list(item_ids))
+
+def test_points_in_polygon_handles_concave_lasso():
+    lasso = [(0, 0), (10, 0), (10, 10), (5, 4), (0, 10)]
+    assert points_in_polygon([(2, 2), (5, 8), (8, 6), (12, 5)], lasso).tolist() == [True, False, True, False]
+
+def test_copy_keeps_enclosed_items_as_geometry_and_crossing_items_as_raster():
+    canvas = ClipCanvas()
+    canvas.create_rectangle(20, 20, 40, 40, fill='red')
+    canvas.create_rectangle(80, 20, 200, 40, fill='blue')
+    clip = Clipboard().copy(canvas, [(0, 0), (100, 0), (100, 100), (0, 100)])
+    assert [entry[0] for entry in clip.entries] == ['rectangle']
+    key, x, y = clip.raster
+    assert (x, y) == (80, 20)
+    assert canvas.assets.source(key).size == (20, 21)
+    assert canvas.assets.source(key).getpixel((10, 10)) == (0, 0, 255, 255)
+
+def test_pastes_share_one_raster_buffer():
+    canvas = ClipCanvas()
+    key = canvas.assets.add_image(Image.new('RGBA', (3840, 2160), (255, 0, 0, 255)))
+    clipboard = Clipboard()
+    clipboard.clip = Clip([('rectangle', [0, 0, 10, 10], {'fill': 'red', 'outline': '', 'width': 1}, False)], (key, 0, 0), (0, 0))
+    for _ in range(20):
+        clipboard.paste(canvas)
+    assert len(canvas.actions) == 20 and all(len(action) == 2 for action in canvas.actions)
+    assert len(canvas.assets.sources) == 1 and len(canvas.assets.variants) == 1
+    photos = {id(canvas.images[i][0]) for i in canvas.images}
+    assert len(photos) == 1
+    assert canvas.items[canvas.actions[-1][1]][1] == [400, 400, 410, 410]
+
+def test_copy_records_where_the_raster_sits_among_the_entries():
+    canvas = ClipCanvas()
+    canvas.create_rectangle(20, 20, 40, 40, fill='red')
+    canvas.create_rectangle(80, 20, 200, 40, fill='blue')
+    canvas.create_rectangle(50, 50, 60, 60, fill='green')
+    clipboard = Clipboard()
+    assert clipboard.copy(canvas, [(0, 0), (100, 0), (100, 100), (0, 100)]).raster_index == 1
+    item_ids = clipboard.paste(canvas, 0, 0)
+    assert [canvas.items[i][0] for i in item_ids] == ['rectangle', 'image', 'rectangle']
+
+def cut_canvas():
+    """A PaintCanvas whose Tk calls go to a ClipCanvas."""
+    from canvas import PaintCanvas
+    canvas = PaintCanvas.__new__(PaintCanvas)
+    fake = ClipCanvas()
+    fake.layers = [Layer('Layer 1')]
+    for name in ('find_withtag', 'find_overlapping', 'bbox', 'type', 'coords', 'itemcget', 'gettags', 'itemconfigure',
+                 'tag_lower', 'place_image', 'place_asset', 'create_rectangle', 'assets', 'images', 'sprites', 'layers', 'items'):
+        setattr(canvas, name, getattr(fake, name))
+    canvas.addtag_withtag = lambda tag, item_id: None
+    canvas.current_layer, canvas._target_layer = 0, None
+    canvas.undo_stack, canvas.redo_stack, canvas._archives, canvas._raster_steps = [], [], {}, {}
+    canvas.shapes = type('Shapes', (), {'find': lambda self, item_id: None})()
+    canvas.fake = fake
+    return canvas
+
+def test_cut_remainder_keeps_the_stacking_order():
+    canvas = cut_canvas()
+    outside = canvas.create_rectangle(200, 200, 210, 210, fill='black')
+    crossing = canvas.create_rectangle(80, 20, 200, 40, fill='blue')
+    above = canvas.create_rectangle(150, 30, 160, 60, fill='yellow')
+    Clipboard().cut(canvas, [(0, 0), (100, 0), (100, 100), (0, 100)])
+    shown = [i for i in canvas.fake.items if canvas.fake.items[i][2].get('state') != 'hidden']
+    remainder = canvas.undo_stack[-1][0]
+    assert shown == [outside, remainder, above]
+    assert canvas.fake.items[crossing][2]['state'] == 'hidden'
@@ -0,0 +1,188 @@
+import asyncio
+import queue
+from contextlib import contextmanager
+from types import SimpleNamespace
+from PIL import ImageChops
+from assets import AssetStore
+from collab import CanvasSession, CollabServer, CollabClient, SessionDocument, coalesce
+
+FRAME = 0.005
+
+def test_coalesce_merges_consecutive_stroke_points():
+    ops = [['sb', 's1', 'base', 'red', 3, 0, 0], ['sp', 's1', [1, 1]], ['sp', 's1', [2, 2]], ['od', 'x'], ['sp', 's1', [3, 3]]]
+    assert coalesce(ops) == [['sb', 's1', 'base', 'red', 3, 0, 0], ['sp', 's1', [1, 1, 2, 2]], ['od', 'x'], ['sp', 's1', [3, 3]]]
+
+def test_delete_wins_over_concurrent_edits_and_adds():
+    doc = SessionDocument()
+    assert doc.apply(1, 1, ['la', 'a.1', 'Sketch'])
+    assert doc.apply(2, 1, ['oa', 'a.2', 'a.1', 'rectangle', [0, 0, 5, 5], {}])
+    assert doc.apply(3, 2, ['ld', 'a.1'])
+    # Ops from a client that had not yet seen the delete are dropped
+    assert not doc.apply(4, 1, ['oa', 'a.3', 'a.1', 'oval', [0, 0, 1, 1], {}])
+    assert not doc.apply(5, 1, ['oe', 'a.2', [1, 1, 6, 6]])
+    assert not doc.apply(5, 1, ['la', 'a.1', 'Again'])
+    assert doc.layers == ['base'] and doc.objects == {}
+
+async def _session(scripts):
+    server = await CollabServer(frame=FRAME).start()
+    clients = [await CollabClient(port=server.port, frame=FRAME).connect() for _ in scripts]
+    for client, script in zip(clients, scripts):
+        for op in script(client.client_id):
+            client.send(op)
+    total = sum(len(script(client.client_id)) for client, script in zip(clients, scripts))
+    for _ in range(400):
+        if server.document.seq >= total:
+            break
+        await asyncio.sleep(FRAME)
+    await asyncio.sleep(FRAME * 10)
+    # A client joining late rebuilds the same state from the server's document
+    clients.append(await CollabClient(port=server.port, frame=FRAME).connect())
+    await asyncio.sleep(FRAME * 4)
+    documents = []
+    for client in clients:
+        doc = SessionDocument()
+        while not client.inbox.empty():
+            for seq, author, op in client.inbox.get():
+                doc.apply(seq, author, op)
+        documents.append(doc)
+        await client.close()
+    await server.close()
+    return documents
+
+def test_clients_converge_through_server():
+    def drawer(cid):
+        ops = [['la', f'{cid}.1', f'Layer {cid}'], ['sb', f'{cid}.2', f'{cid}.1', 'red', 3, 0, 0]]
+        ops += [['sp', f'{cid}.2', [i, i]] for i in range(1, 50)]
+        ops += [['oa', f'{cid}.3', 'base', 'oval', [0, 0, cid, cid], {'outline': 'blue'}], ['oe', '1.3', [9, 9, 9, 9]]]
+        return ops
+    def deleter(cid):
+        return [['ld', '1.1'], ['od', '2.3'], ['lv', 'base', False]]
+
+    documents = asyncio.run(_session([drawer, drawer, deleter]))
+    first = documents[0].snapshot()
+    assert all(doc.snapshot() == first for doc in documents[1:])
+    assert first['layer_info']['base']['visible'] is False
+    # Nothing deletes the second drawer's layer, so its whole stroke survives
+    assert '2.1' in first['layers']
+    assert len(first['objects']['2.2']['coords']) == 100
+
+def test_document_ops_rebuild_it_compactly():
+    doc = SessionDocument()
+    ops = [['la', 'a.1', 'Sketch'], ['la', 'a.2', 'Ink'], ['lm', 'a.2', 0], ['lr', 'base', 'Paper'], ['lv', 'a.1', False],
+           ['sb', 'a.3', 'a.1', 'red', 3, 0, 0], ['sp', 'a.3', [1, 1]], ['sp', 'a.3', [2, 2]], ['oa', 'a.4', 'base', 'oval', [0, 0, 4, 4], {}], ['od', 'a.4']]
+    for seq, op in enumerate(ops, 1):
+        doc.apply(seq, 1, op)
+    rebuilt = SessionDocument()
+    compact = doc.ops()
+    for seq, op in enumerate(compact, 1):
+        assert rebuilt.apply(seq, 0, op)
+    assert rebuilt.snapshot() == doc.snapshot() and len(compact) < len(ops)
+
+class SessionCanvas:
+    def __init__(self):
+        self.layers = [SimpleNamespace(uid=None, name='Layer 1')]
+        self.current_layer = 0
+        self.listeners = []
+        self.deleted = []
+    def after(self, ms, callback):
+        return None
+    def delete(self, item_id):
+        self.deleted.append(item_id)
+
+def test_stroke_rejected_while_drawing_is_removed_on_release():
+    canvas, sent = SessionCanvas(), []
+    session = CanvasSession(canvas, SimpleNamespace(client_id=1, send=sent.append))
+    brush = SimpleNamespace(freehand=True, streamed=True, color='red', size=3)
+    session.on_press(brush, 0, 0)
+    session.on_drag(brush, 1, 1)
+    stroke = sent[0][1]
+    session._apply(1, sent[0], False)
+    session.on_drag(brush, 2, 2)
+    session.on_release(brush, [7, 8])
+    assert canvas.deleted == [7, 8] and stroke not in session.items
+
+class ItemCanvas(SessionCanvas):
+    """SessionCanvas that keeps its items, enough for the tools and for snapshot_item()."""
+    def __init__(self):
+        super().__init__()
+        self.items, self.images, self.sprites = {}, {}, {}
+        self.assets = AssetStore(photo_factory=lambda image: image)
+        self.shapes = SimpleNamespace(find=lambda item_id: None)
+    def winfo_width(self):
+        return 200
+    winfo_height = winfo_width
+    def _add(self, kind, coords, options):
+        item_id = len(self.items) + 1
+        self.items[item_id] = (kind, list(coords), options)
+        return item_id
+    def create_line(self, *coords, **options):
+        return self._add('line', coords, options)
+    def place_image(self, x, y, image, anchor='nw'):
+        item_id = self._add('image', (x, y), {'anchor': anchor})
+        self.images[item_id] = (None, image)
+        return item_id
+    def delete(self, item_id):
+        super().delete(item_id)
+        self.items.pop(item_id, None)
+    def type(self, item_id):
+        return self.items[item_id][0] if item_id in self.items else None
+    def itemcget(self, item_id, option):
+        return self.items[item_id][2].get(option, '')
+    def coords(self, item_id, *coords):
+        if coords:
+            self.items[item_id] = (self.items[item_id][0], list(coords), self.items[item_id][2])
+        return [float(c) for c in self.items[item_id][1]]
+    @contextmanager
+    def drawing_on(self, layer):
+        yield layer
+    def create_from_snapshot(self, kind, coords, options, shape=False):
+        if kind == 'image':
+            return self.place_image(*coords, self.assets.source(options['asset']), options['anchor'])
+        return self.create_line(*coords, fill=options['fill'], width=options['width'])
+
+class RelayClient:
+    """Stands in for a CollabClient; relay() plays the server, numbering what every client sent."""
+    def __init__(self, client_id, relayed):
+        self.client_id, self.relayed, self.inbox = client_id, relayed, queue.SimpleQueue()
+    def send(self, op):
+        self.relayed.append((self.client_id, op))
+
+def relay(relayed, sessions):
+    entries = [[seq, author, op] for seq, (author, op) in enumerate(relayed, 1)]
+    relayed.clear()
+    for session in sessions:
+        session.client.inbox.put(entries)
+        session._poll()
+
+def draw_with_peer(tool):
+    relayed = []
+    local, remote = ItemCanvas(), ItemCanvas()
+    sessions = [CanvasSession(canvas, RelayClient(cid, relayed)) for cid, canvas in ((1, local), (2, remote))]
+    points = [(120, 100), (130, 104), (140, 110), (150, 120)]
+    tool.on_press(SimpleNamespace(x=120, y=100, time=1), local)
+    sessions[0].on_press(tool, 120, 100)
+    for t, (x, y) in enumerate(points[1:], 2):
+        tool.on_drag(SimpleNamespace(x=x, y=y, time=t * 16), local)
+        sessions[0].on_drag(tool, x, y)
+    item_ids = tool.on_release(SimpleNamespace(x=150, y=120, time=80), local)
+    local.delete('symmetry_preview')
+    sessions[0].on_release(tool, item_ids)
+    relay(relayed, sessions)
+    assert sessions[0].document.snapshot() == sessions[1].document.snapshot()
+    return local, remote, item_ids
+
+def test_symmetry_strokes_reach_peers_mirrored():
+    from symmetry import SymmetryTool
+    from tools import BrushTool
+    local, remote, item_ids = draw_with_peer(SymmetryTool(BrushTool('red', 3), ways=4, mirror=True))
+    assert len(item_ids) == 8
+    assert [remote.coords(i) for i in remote.items] == [local.coords(i) for i in item_ids]
+
+def test_soft_brush_strokes_reach_peers_as_dabs():
+    from symmetry import SymmetryTool
+    from tools import DabBrushTool
+    local, remote, item_ids = draw_with_peer(SymmetryTool(DabBrushTool('blue', 12), ways=2))
+    assert len(item_ids) == 2 and all(remote.type(i) == 'image' for i in remote.items)
+    assert [remote.coords(i) for i in remote.items] == [local.coords(i) for i in item_ids]
+    for mine, theirs in zip(item_ids, remote.items):
+        assert ImageChops.difference(local.images[mine][1], remote.images[theirs][1]).getbbox() is None
@@ -0,0 +1,29 @@
+import numpy as np
+from PIL import Image, ImageDraw
+from encoding import encode, flat_colour_palette
+
+def cartoon(mode='RGB'):
+    image = Image.new(mode, (320, 240), 'white')
+    draw = ImageDraw.Draw(image)
+    for i, color in enumerate(['#ff0000', '#00ff00', '#0000ff', '#ffa500', '#800080']):
+        draw.ellipse((20 + 50 * i, 30, 120 + 50 * i, 200), fill=color, outline='black', width=3)
+    return image
+
+def test_flat_drawings_are_palette_png_and_lossless(tmp_path):
+    for mode in ('RGB', 'RGBA'):
+        image = cartoon(mode)
+        report = encode(image, str(tmp_path / 'flat.png'))
+        saved = Image.open(report.path)
+        assert saved.mode == 'P' and 'palette' in report.settings
+        assert np.array_equal(np.asarray(saved.convert(mode)), np.asarray(image))
+        assert report.nbytes == (tmp_path / 'flat.png').stat().st_size
+    webp = encode(cartoon(), str(tmp_path / 'flat.webp'))
+    assert webp.format == 'WEBP' and 'lossless' in webp.settings
+    assert np.array_equal(np.asarray(Image.open(webp.path).convert('RGB')), np.asarray(cartoon()))
+
+def test_photographic_content_keeps_true_colour(tmp_path):
+    noise = Image.fromarray(np.random.default_rng(0).integers(0, 256, (200, 200, 3), dtype=np.uint8))
+    assert flat_colour_palette(noise) is None
+    report = encode(noise, str(tmp_path / 'photo.png'), target='fast')
+    assert Image.open(report.path).mode == 'RGB' and 'true colour' in report.settings
+    assert 'photo.png' in str(report)
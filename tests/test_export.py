@@ -0,0 +1,56 @@
+from PIL import Image
+from export import PRESETS, downscale_pyramid, export_canvas, export_items
+from layers import Layer, CHROME_TAG, REGION_TAG
+
+def test_pyramid_derives_each_size_from_one_source():
+    source = Image.new('RGB', (1600, 1200), 'red')
+    sizes = [(800, 600), (256, 192), (1600, 1200)]
+    images = downscale_pyramid(source, sizes)
+    assert {size: image.size for size, image in images.items()} == {size: size for size in sizes}
+    assert images[(1600, 1200)] is source
+
+def test_export_writes_every_preset(tmp_path):
+    items = [('rectangle', [10, 10, 190, 90], {'fill': 'blue', 'outline': 'black', 'width': 2})]
+    paths = export_items(items, (200, 100), str(tmp_path / 'drawing.png'))
+    sizes = {p.rsplit('/', 1)[1]: Image.open(p).size for p in paths}
+    assert sizes == {'drawing.png': (200, 100), 'drawing@2x.png': (400, 200), 'drawing-web.jpg': (200, 100), 'drawing-thumb.png': (200, 100)}
+    assert Image.open(tmp_path / 'drawing@2x.png').convert('RGB').getpixel((200, 100)) == (0, 0, 255)
+    assert PRESETS['thumbnail'].size_for(1920, 1080) == (256, 144)
+    # Flat drawings go through encoding.encode() and come out as palette PNGs
+    assert Image.open(tmp_path / 'drawing.png').mode == 'P'
+
+class LayeredCanvas:
+    """Line items with tags, answering '&&' and '!' tag expressions like tk.Canvas."""
+    bg_color = 'white'
+    def __init__(self, layers):
+        self.layers = layers
+        self.items = []
+    def add(self, y, color, *tags):
+        self.items.append((y, color, set(tags)))
+    def find_withtag(self, expression):
+        terms = expression.split('&&')
+        match = lambda tags: all((term[1:] not in tags) if term.startswith('!') else term in tags for term in terms)
+        return tuple(i for i, (_, _, tags) in enumerate(self.items) if match(tags))
+    def type(self, item_id):
+        return 'line'
+    def coords(self, item_id):
+        return [0, self.items[item_id][0], 40, self.items[item_id][0]]
+    def itemcget(self, item_id, option):
+        return {'fill': self.items[item_id][1], 'width': '4', 'state': ''}[option]
+    def winfo_width(self):
+        return 40
+    def winfo_height(self):
+        return 40
+
+def test_export_canvas_leaves_out_chrome_and_hidden_layers(tmp_path):
+    shown, hidden = Layer('shown'), Layer('hidden')
+    hidden.visible = False
+    canvas = LayeredCanvas([shown, hidden])
+    canvas.add(5, 'red', shown.tag)
+    canvas.add(15, 'blue', hidden.tag)
+    canvas.add(25, 'black', REGION_TAG, CHROME_TAG)
+    canvas.add(35, 'black', CHROME_TAG)
+    path, = export_canvas(canvas, str(tmp_path / 'drawing.png'), presets=('full',))
+    image = Image.open(path).convert('RGB')
+    assert image.getpixel((20, 5)) == (255, 0, 0)
+    assert image.getpixel((20, 15)) == image.getpixel((20, 25)) == image.getpixel((20, 35)) == (255, 255, 255)
@@ -0,0 +1,59 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+from PIL import Image
+from filters import FILTERS, FilterJob, default_params, preview, proxy_params, _run_tile
+
+def sample_image(size=(300, 200)):
+    rng = np.random.default_rng(3)
+    return Image.fromarray(rng.integers(0, 256, size[::-1] + (4,), dtype=np.uint8))
+
+def test_tiled_filters_match_single_pass():
+    image = sample_image()
+    with ThreadPoolExecutor(2) as pool:
+        for name in FILTERS:
+            params = default_params(name)
+            tiled = FilterJob(image, name, params, tile_size=64, executor=pool).start().wait()
+            whole = FILTERS[name](image, params).convert(image.mode)
+            diff = np.abs(np.asarray(tiled, dtype=int) - np.asarray(whole, dtype=int))
+            # Gaussian blur is approximated with box passes, so allow rounding at tile edges
+            assert diff.max() <= 2, name
+
+def test_proxy_preview_scales_pixel_parameters():
+    image = sample_image((2048, 1024))
+    proxy, scale = preview(image, 'Blur', {'radius': 8.0}, max_size=512)
+    assert proxy.size == (512, 256) and scale == 0.25
+    assert proxy_params('Blur', {'radius': 8.0}, scale) == {'radius': 2.0}
+    small = image.resize(proxy.size, Image.BILINEAR)
+    assert np.array_equal(np.asarray(proxy), np.asarray(FILTERS['Blur'](small, {'radius': 2.0})))
+    assert not np.array_equal(np.asarray(proxy), np.asarray(FILTERS['Blur'](small, {'radius': 8.0})))
+
+def test_worker_entry_point_crops_halo():
+    tile = sample_image((40, 40))
+    data = _run_tile('Posterize', {'levels': 4}, tile.mode, tile.size, tile.tobytes(), (5, 5, 25, 25))
+    assert len(data) == 20 * 20 * 4
+
+class FailingExecutor:
+    """Hands back futures that fail, or refuses work like a broken pool."""
+    def __init__(self, broken=False):
+        self.broken = broken
+        self.futures = []
+    def submit(self, *args):
+        if self.broken:
+            raise BrokenProcessPool("A child process terminated abruptly")
+        future = Future()
+        self.futures.append(future)
+        return future
+
+def test_failed_tiles_end_the_job_with_an_error():
+    executor = FailingExecutor()
+    job = FilterJob(sample_image(), 'Blur', {'radius': 1.0}, tile_size=64, executor=executor).start()
+    job._submitter.join()
+    executor.futures[0].set_exception(MemoryError("tile too large"))
+    assert job.poll() and isinstance(job.error, MemoryError)
+    assert all(future.cancelled() for future in executor.futures[1:])
+
+def test_broken_pool_ends_the_job_with_an_error():
+    job = FilterJob(sample_image(), 'Blur', {'radius': 1.0}, tile_size=64, executor=FailingExecutor(broken=True)).start()
+    job._submitter.join()
+    assert job.poll() and isinstance(job.error, BrokenProcessPool)
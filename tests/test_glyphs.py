@@ -0,0 +1,28 @@
+from assets import AssetStore
+from glyphs import GlyphAtlas, rasterize
+
+def test_rasterize_crops_to_drawn_text():
+    image = rasterize('Hi', 16, 'red')
+    assert image.mode == 'RGBA'
+    assert image.getbbox() is not None
+    assert rasterize('Hi', 32).height > image.height
+
+def test_atlas_rasterizes_each_run_once(monkeypatch):
+    calls = []
+    import glyphs
+    monkeypatch.setattr(glyphs, 'rasterize', lambda *args: calls.append(args) or rasterize(*args))
+    atlas = GlyphAtlas(AssetStore(photo_factory=lambda image: image))
+    keys = [atlas.sprite('🌟', 32) for _ in range(100)]
+    assert len(set(keys)) == 1 and len(calls) == 1
+    assert atlas.sprite('🌟', 24) != keys[0]
+    assert atlas.assets.photo(keys[0]) is atlas.assets.photo(keys[0])
+
+def test_canvas_warms_every_stamp_emoji(monkeypatch):
+    from canvas import PaintCanvas
+    from tools import ToolManager
+    canvas = PaintCanvas.__new__(PaintCanvas)
+    canvas.tool_manager = ToolManager()
+    canvas.glyphs = GlyphAtlas(AssetStore(photo_factory=lambda image: image))
+    canvas.warm_glyphs()
+    stamp = canvas.tool_manager.tools['Stamp']
+    assert set(canvas.glyphs.keys) == {(emoji, stamp.size, 'black') for emoji in stamp.emojis}
@@ -0,0 +1,101 @@
+from types import SimpleNamespace
+import numpy as np
+from gradients import GradientCache, make_ramp, normalize_stops
+from layers import Layer
+from masks import Mask
+from selection import Selection
+from shapes import Oval, Rectangle
+from tools import GradientTool, ToolManager
+
+STOPS = normalize_stops('0:#ff0000, 0.5:#00ff00, 1:#0000ff80')
+
+def test_stops_are_parsed_sorted_and_interpolated():
+    assert normalize_stops([(1, 'blue'), (0, (255, 0, 0))]) == ((0.0, (255, 0, 0, 255)), (1.0, (0, 0, 255, 255)))
+    ramp = make_ramp(STOPS, 5).view(np.uint8).reshape(5, 4)
+    assert ramp.tolist() == [[255, 0, 0, 255], [128, 128, 0, 255], [0, 255, 0, 255], [0, 128, 128, 192], [0, 0, 255, 128]]
+
+def test_gradient_types_follow_their_handles():
+    cache = GradientCache()
+    linear = cache.render('linear', STOPS, (100, 10), (0, 5), (100, 5))
+    assert linear.getpixel((0, 5))[0] > 250 and linear.getpixel((99, 5))[2] > 250
+    assert linear.getpixel((50, 0)) == linear.getpixel((50, 9))
+    radial = cache.render('radial', STOPS, (100, 100), (50, 50), (90, 50))
+    assert radial.getpixel((50, 50))[0] > 240 and radial.getpixel((70, 50))[1] > 240 and radial.getpixel((0, 0)) == (0, 0, 255, 128)
+    conic = cache.render('conic', STOPS, (100, 100), (50, 50), (50, 0))
+    # Starting straight up, a quarter turn clockwise is the right-hand side
+    assert conic.getpixel((50, 10))[0] > 250 and conic.getpixel((50, 90))[1] > 240
+
+def test_renders_are_cached_and_fields_match_off_canvas_centres():
+    cache = GradientCache()
+    image = cache.render('conic', STOPS, (64, 48), (10, 20), (30, 5))
+    assert cache.render('conic', STOPS, (64, 48), (10.2, 19.8), (30, 5)) is image
+    for kind in ('radial', 'conic'):
+        inside = np.asarray(cache.render(kind, STOPS, (64, 48), (0, 0), (20, 20)))
+        # The same gradient one pixel to the left, centred off the canvas and computed directly
+        outside = np.asarray(cache.render(kind, STOPS, (64, 48), (-1, 0), (19, 20)))
+        assert np.array_equal(inside[:, 1:], outside[:, :-1])
+
+class GradientCanvas:
+    def __init__(self, mask=None):
+        self.mask = mask
+        self.selection = []
+        self.placed = []
+
+    def winfo_width(self):
+        return 80
+
+    def winfo_height(self):
+        return 60
+
+    def delete(self, tag):
+        pass
+
+    def paint_image(self, x, y, image, below=False):
+        self.placed.append((x, y, image))
+        return len(self.placed)
+
+def test_tool_fills_the_selection_mask():
+    canvas = GradientCanvas(Mask.ellipse(10, 10, 30, 30))
+    tool = GradientTool('linear')
+    tool.stops = STOPS
+    tool.on_press(SimpleNamespace(x=10, y=10, state=0), canvas)
+    assert tool.on_release(SimpleNamespace(x=30, y=10, state=0), canvas) == 1
+    x, y, image = canvas.placed[0]
+    assert (x, y, image.size) == (10, 10, (20, 20))
+    assert image.getpixel((0, 0))[3] == 0 and image.getpixel((10, 10))[3] > 200
+    tool.on_press(SimpleNamespace(x=5, y=5, state=0), canvas)
+    assert tool.on_release(SimpleNamespace(x=5, y=5, state=0), canvas) is None
+
+def event_canvas(shapes):
+    """A PaintCanvas in object selection mode with the given shapes selected; Tk calls are faked."""
+    from canvas import PaintCanvas
+    canvas = PaintCanvas.__new__(PaintCanvas)
+    canvas.master, canvas.listeners, canvas.mask = None, [], None
+    canvas.layers, canvas.current_layer = [Layer('Layer 1')], 0
+    canvas.tool_manager, canvas.selection_mode = ToolManager(), True
+    canvas.undo_stack, canvas.redo_stack, canvas._recording, canvas._current_action = [], [], False, []
+    canvas.baker = SimpleNamespace(maybe_bake=lambda layer: 0)
+    canvas.selection = Selection(SimpleNamespace(dtag=lambda *args: None, addtag_withtag=lambda *args: None, bbox=lambda tag: None))
+    for index, shape in enumerate(shapes):
+        shape.canvas_id = index + 1
+    canvas.selection.set(shapes)
+    fake = GradientCanvas()
+    canvas.placed = fake.placed
+    for name in ('winfo_width', 'winfo_height', 'delete', 'paint_image'):
+        setattr(canvas, name, getattr(fake, name))
+    canvas.gettags = lambda item_id: ()
+    return canvas
+
+def test_picking_the_gradient_keeps_selected_shapes_as_the_target():
+    rectangle, oval = Rectangle((5, 5), (25, 15)), Oval((40, 20), (60, 50))
+    canvas = event_canvas([rectangle, oval])
+    canvas.select_gradient('radial')
+    assert not canvas.selection_mode and canvas.tool_manager.current_tool.kind == 'radial'
+    canvas._on_press(SimpleNamespace(x=30, y=30, state=0))
+    canvas._on_release(SimpleNamespace(x=60, y=30, state=0))
+    (x, y, image), = canvas.placed
+    assert (x, y, image.size) == (5, 5, (55, 45))
+    assert canvas.undo_stack == [[1]]
+    assert list(canvas.selection) == [rectangle, oval]
+    # Between the two shapes nothing is filled
+    assert image.getpixel((25, 5))[3] == 0 and image.getpixel((10, 5))[3] == 255
@@ -0,0 +1,71 @@
+import numpy as np
+from PIL import Image
+from masks import Mask, _runs, magic_wand, planar_pixels
+from tools import CONTROL_MASK, SHIFT_MASK, combine_masks
+
+def test_masks_are_cropped_to_their_box():
+    mask = Mask.rectangle(10, 20, 30, 25)
+    assert mask.bbox == (10, 20, 30, 25)
+    assert mask.area == 100
+    ellipse = Mask.ellipse(0, 0, 40, 20)
+    assert ellipse.bbox == (0, 0, 40, 20)
+    assert ellipse.contains(20, 10) and not ellipse.contains(1, 1)
+    lasso = Mask.polygon([(5, 5), (25, 5), (5, 25)])
+    assert lasso.contains(7, 7) and not lasso.contains(24, 24)
+    assert Mask(np.zeros((8, 8), np.uint8), (3, 3)).crop().bbox == (0, 0, 0, 0)
+
+def test_set_operations_and_move():
+    a, b = Mask.rectangle(0, 0, 10, 10), Mask.rectangle(5, 5, 15, 15)
+    assert (a | b).area == 175 and (a | b).bbox == (0, 0, 15, 15)
+    assert (a & b).area == 25 and (a & b).bbox == (5, 5, 10, 10)
+    assert (a - b).area == 75 and not (a - b).contains(7, 7)
+    assert not (a & Mask.rectangle(20, 20, 30, 30))
+    moved = a.move(100, 50)
+    assert moved.bbox == (100, 50, 110, 60) and moved.array is a.array
+    assert a.invert(20, 20).area == 300
+
+def test_feather_softens_the_edge_and_fill_uses_coverage():
+    mask = Mask.rectangle(20, 20, 40, 40).feather(3)
+    assert mask.bbox[0] < 20 and mask.bbox[2] > 40
+    assert mask.array[mask.array.shape[0] // 2, mask.array.shape[1] // 2] == 255
+    assert 0 < mask.array[mask.array.shape[0] // 2, 0] < 255
+    image = Image.new('RGB', (60, 60), 'white')
+    Mask.rectangle(10, 10, 20, 20).fill(image, (255, 0, 0), origin=(5, 5))
+    assert image.getpixel((5, 5)) == (255, 0, 0) and image.getpixel((15, 15)) == (255, 255, 255)
+    assert Mask.rectangle(0, 0, 2, 2).filled('blue').getpixel((1, 1)) == (0, 0, 255, 255)
+
+def test_runs_split_rows_into_spans():
+    match = np.array([[1, 1, 0, 1], [0, 0, 0, 0], [1, 1, 1, 1]], bool)
+    rows, starts, ends = _runs(match)
+    assert rows.tolist() == [0, 0, 2]
+    assert starts.tolist() == [0, 3, 0]
+    assert ends.tolist() == [2, 4, 4]
+
+def test_magic_wand_follows_connected_pixels_only():
+    image = Image.new('RGB', (50, 40), 'white')
+    image.paste((0, 0, 0), (0, 18, 50, 20))
+    # White above the bar is cut off from the U-shaped white area below it
+    image.paste((0, 0, 0), (20, 25, 30, 40))
+    mask = magic_wand(image, 105, 130, tolerance=10, origin=(100, 100))
+    assert mask.bbox == (100, 120, 150, 140)
+    assert mask.contains(145, 139) and not mask.contains(125, 139)
+    assert not mask.contains(105, 105)
+    everywhere = magic_wand(image, 5, 30, tolerance=10, contiguous=False)
+    assert everywhere.contains(5, 5) and everywhere.area == 50 * 40 - 100 - 150
+    assert not magic_wand(image, 500, 500)
+
+def test_magic_wand_tolerance_is_per_channel():
+    pixels = np.zeros((4, 4, 3), np.uint8)
+    pixels[:, 2:] = (20, 0, 0)
+    assert magic_wand(pixels, 0, 0, tolerance=19).area == 8
+    assert magic_wand(pixels, 0, 0, tolerance=20).area == 16
+    planar = planar_pixels(Image.fromarray(pixels))
+    assert (planar == pixels).all()
+    assert magic_wand(planar, 0, 0, tolerance=19).area == 8
+
+def test_modifiers_combine_with_the_current_selection():
+    current, new = Mask.rectangle(0, 0, 10, 10), Mask.rectangle(5, 0, 15, 10)
+    assert combine_masks(current, new, 0) is new
+    assert combine_masks(current, new, SHIFT_MASK).area == 150
+    assert combine_masks(current, new, CONTROL_MASK).area == 50
+    assert combine_masks(None, new, SHIFT_MASK) is new
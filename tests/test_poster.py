@@ -0,0 +1,85 @@
+import io
+import numpy as np
+from PIL import Image
+from poster import PngStream, PosterJob, export_poster, vertical_extents
+from layers import Layer, CHROME_TAG
+from renderer import render
+
+ITEMS = [
+    ('rectangle', [10, 10.4, 190, 90], {'fill': 'blue', 'outline': 'black', 'width': 2}),
+    ('oval', [40, 5, 120, 95.5], {'fill': '#00ff00', 'outline': '', 'width': 1}),
+    ('line', [0, 0, 200, 100], {'fill': 'red', 'width': 6}),
+    ('image', [150, 50], {'image': Image.new('RGBA', (21, 33), (255, 0, 255, 128)), 'anchor': 'center'}),
+    ('text', [100, 50], {'text': 'Poster', 'fill': 'black', 'font': 'Arial 12'}),
+]
+
+def test_strips_join_into_the_whole_render(tmp_path):
+    path = tmp_path / 'poster.png'
+    progress = []
+    size = export_poster(ITEMS, (200, 100), str(path), scale=2.5, strip_height=17, on_progress=lambda done, total: progress.append(done))
+    assert size == (500, 250)
+    assert progress[0] == 17 and progress[-1] == 250
+    whole = render(ITEMS, size, 2.5, (0, 0), 'white', snap=True).convert('RGB')
+    with Image.open(path) as poster:
+        assert poster.mode == 'RGB'
+        assert np.array_equal(np.asarray(poster), np.asarray(whole))
+
+def test_png_stream_writes_rgba_in_blocks():
+    pixels = np.random.default_rng(1).integers(0, 256, (30, 7, 4), dtype=np.uint8)
+    buffer = io.BytesIO()
+    png = PngStream(buffer, 7, 30, 'RGBA')
+    for top in range(0, 30, 8):
+        png.write(pixels[top:top + 8])
+    png.close()
+    buffer.seek(0)
+    assert np.array_equal(np.asarray(Image.open(buffer)), pixels)
+
+def test_vertical_extents_cover_strokes_and_images():
+    extents = vertical_extents(ITEMS, scale=2.0)
+    assert extents[0][0] <= 20.8 - 2 and extents[0][1] >= 180 + 2
+    assert extents[3][0] <= 100 - 33 and extents[3][1] >= 100 + 33
+    assert np.isinf(extents[4]).all()
+
+class PosterCanvas:
+    """One layer holding a red bar, plus a chrome item, with after() run by hand."""
+    bg_color = 'white'
+    def __init__(self):
+        self.layers = [Layer('Layer 1')]
+        self.tags = {1: {self.layers[0].tag}, 2: {CHROME_TAG}}
+        self.calls = []
+    def find_withtag(self, expression):
+        terms = expression.split('&&')
+        return tuple(i for i, tags in self.tags.items() if all((t[1:] not in tags) if t.startswith('!') else t in tags for t in terms))
+    def type(self, item_id):
+        return 'rectangle'
+    def coords(self, item_id):
+        return [0, 0, 40, 10] if item_id == 1 else [0, 20, 40, 30]
+    def itemcget(self, item_id, option):
+        return {'fill': 'red', 'outline': '', 'width': '1', 'state': ''}[option]
+    def winfo_width(self):
+        return 40
+    def winfo_height(self):
+        return 40
+    def after(self, ms, callback):
+        self.calls.append(callback)
+
+def finish(job, canvas):
+    job._thread.join()
+    canvas.calls.pop()()
+    return job
+
+def test_poster_job_draws_the_layers_in_the_background(tmp_path):
+    canvas, path, finished = PosterCanvas(), tmp_path / 'poster.png', []
+    job = finish(PosterJob(canvas, str(path), 2, on_done=finished.append).start(), canvas)
+    assert finished == [job] and job.size == (80, 80) and job.progress == 1.0
+    image = Image.open(path)
+    assert image.getpixel((40, 10)) == (255, 0, 0)
+    assert image.getpixel((40, 50)) == (255, 255, 255)
+
+def test_cancelled_poster_job_removes_the_partial_file(tmp_path):
+    canvas, path = PosterCanvas(), tmp_path / 'poster.png'
+    job = PosterJob(canvas, str(path), 2)
+    job.cancel()
+    finish(job.start(), canvas)
+    assert job.done and job.size is None and job.error is None
+    assert not path.exists()
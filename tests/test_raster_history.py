@@ -0,0 +1,136 @@
+import tkinter as tk
+from types import SimpleNamespace
+from unittest import mock
+import numpy as np
+from PIL import Image
+from layers import Layer, ARCHIVED_TAG
+from masks import Mask
+from raster_history import RasterPlane, TileHistory, changed_tiles
+
+def test_changed_tiles_includes_partial_edge_tiles():
+    before = np.zeros((100, 130), dtype=np.uint8)
+    after = before.copy()
+    after[99, 129] = 1
+    after[0, 0] = 1
+    assert changed_tiles(before, after, 64).tolist() == [[0, 0], [1, 2]]
+
+def test_fills_on_4k_layer_undo_and_redo_with_small_history():
+    layer = np.zeros((2160, 3840, 4), dtype=np.uint8)
+    history = TileHistory()
+    for i in range(10):
+        box = (100 * i, 50 * i, 100 * i + 1500, 50 * i + 1000)
+        with history.edit(layer, box):
+            layer[box[1]:box[3], box[0]:box[2]] = (i * 20, 255 - i * 20, 128, 255)
+    assert history.nbytes < 4 * 1024 * 1024
+    final = layer.copy()
+    for _ in range(10):
+        assert history.undo(layer)
+    assert not layer.any()
+    assert not history.undo(layer)
+    for _ in range(10):
+        assert history.redo(layer)
+    assert np.array_equal(layer, final)
+
+def test_plane_paints_over_under_and_replaces():
+    plane = RasterPlane((8, 8))
+    red, blue = Image.new('RGBA', (4, 4), (255, 0, 0, 255)), Image.new('RGBA', (4, 4), (0, 0, 255, 255))
+    assert plane.paint(-2, -2, red) is not None
+    assert plane.image().getpixel((1, 1)) == (255, 0, 0, 255) and plane.image().getpixel((2, 2))[3] == 0
+    plane.paint(0, 0, blue, 'under')
+    plane.paint(6, 10, blue)
+    assert plane.size == (10, 14) and plane.image().getpixel((1, 1))[0] == 255 and plane.image().getpixel((3, 3))[2] == 255
+    plane.paint(2, 2, red, 'replace')
+    assert plane.array[:2].sum() == 0 and plane.image().getpixel((5, 5)) == (255, 0, 0, 255)
+    assert plane.paint(2, 2, red, 'over') is None
+    while plane.undo():
+        pass
+    assert not plane.array.any()
+
+class PlaneCanvasItems:
+    """Items and tags behind an offscreen PaintCanvas, answering its '&&' and '!' tag expressions."""
+    def __init__(self):
+        self.tags = {}
+    def create(self, kind, args, kw):
+        item_id = len(self.tags) + 1
+        tags = kw.get('tags', ())
+        self.tags[item_id] = {tags} if isinstance(tags, str) else set(tags)
+        return item_id
+    def find_withtag(self, expression):
+        if isinstance(expression, int):
+            return (expression,) if expression in self.tags else ()
+        terms = expression.split('&&')
+        match = lambda tags: all((term[1:] not in tags) if term.startswith('!') else term in tags for term in terms)
+        return tuple(item_id for item_id, tags in self.tags.items() if match(tags))
+    def delete(self, *tags):
+        for tag in tags:
+            for item_id in self.find_withtag(tag):
+                del self.tags[item_id]
+    def patched(self):
+        return mock.patch.multiple(tk.Canvas, _create=self.create, delete=self.delete)
+
+class FakePhoto:
+    def __init__(self, image):
+        self.size = image.size
+    def width(self):
+        return self.size[0]
+    def height(self):
+        return self.size[1]
+    def paste(self, image):
+        pass
+
+def plane_canvas(items, size=(3840, 2160)):
+    from canvas import PaintCanvas
+    canvas = PaintCanvas.__new__(PaintCanvas)
+    canvas.layers, canvas.current_layer, canvas._target_layer, canvas.listeners = [Layer('Layer 1')], 0, None, []
+    canvas.images, canvas.sprites, canvas._archives, canvas._raster_steps, canvas.bake_tiles = {}, {}, {}, {}, {}
+    canvas.undo_stack, canvas.redo_stack = [], []
+    canvas.shapes = SimpleNamespace(find=lambda item_id: None)
+    canvas.find_withtag = items.find_withtag
+    canvas.gettags = lambda item_id: tuple(items.tags[item_id])
+    canvas.addtag_withtag = lambda tag, item_id: items.tags[item_id].add(tag)
+    canvas.dtag = lambda item_id, tag: items.tags[item_id].discard(tag)
+    canvas.find_overlapping = lambda *box: tuple(items.tags)
+    canvas.itemcget = lambda item_id, option: ''
+    canvas.itemconfigure = canvas.tag_lower = canvas.tag_raise = lambda *args, **kwargs: None
+    canvas.winfo_width, canvas.winfo_height = lambda: size[0], lambda: size[1]
+    return canvas
+
+def test_ten_fills_on_a_4k_layer_keep_a_small_history():
+    items = PlaneCanvasItems()
+    with items.patched(), mock.patch('PIL.ImageTk.PhotoImage', FakePhoto):
+        canvas = plane_canvas(items)
+        layer = canvas.layers[0]
+        for i in range(10):
+            canvas.mask = Mask.rectangle(100 * i, 50 * i, 100 * i + 1500, 50 * i + 1000)
+            assert canvas.fill_mask((i * 20, 255 - i * 20, 128))
+        history = layer.raster.history
+        assert history.nbytes < 4 * 1024 * 1024
+        # One plane shows every fill; no full-size raster is kept per step
+        assert list(canvas.images) == [layer.raster_id] and not canvas._archives
+        final = layer.raster.array.copy()
+        for _ in range(10):
+            canvas.undo()
+        assert not layer.raster.array.any() and not canvas.images[layer.raster_id][1].getbbox()
+        for _ in range(10):
+            canvas.redo()
+        assert np.array_equal(layer.raster.array, final) and len(canvas.undo_stack) == 10
+
+def test_replacing_the_bottom_of_a_layer_rewrites_its_plane():
+    items = PlaneCanvasItems()
+    with items.patched(), mock.patch('PIL.ImageTk.PhotoImage', FakePhoto):
+        canvas = plane_canvas(items, (64, 64))
+        layer = canvas.layers[0]
+        strokes = [canvas.create_line(0, i, 10, i) for i in range(3)]
+        step = canvas.replace_with_image(strokes, 4, 4, Image.new('RGBA', (8, 8), 'red'))
+        assert all(ARCHIVED_TAG in items.tags[item_id] for item_id in strokes)
+        assert layer.raster.image().getpixel((5, 5)) == (255, 0, 0, 255)
+        second = canvas.replace_with_image(canvas.find_withtag(layer.content_tag), 0, 0, Image.new('RGBA', (64, 64), 'blue'))
+        assert len(layer.raster.history.undo_stack) == 2 and second != step
+        canvas.undo()
+        canvas.undo()
+        assert not layer.raster.array.any()
+        assert not any(ARCHIVED_TAG in items.tags[item_id] for item_id in strokes)
+        # A new step drops the undone ones and their placeholders
+        canvas.mask = Mask.rectangle(0, 0, 4, 4)
+        canvas.fill_mask('green')
+        assert not layer.raster.history.redo_stack and step not in canvas._raster_steps and not canvas.redo_stack
@@ -0,0 +1,23 @@
+import unittest
+from PIL import Image
+from renderer import render
+
+class TestRenderer(unittest.TestCase):
+    def test_render_scales_items(self):
+        items = [
+            ('rectangle', [0, 0, 100, 100], {'fill': 'red', 'outline': '', 'width': 1}),
+            ('line', [0, 150, 200, 150], {'fill': '#0000ff', 'width': 10}),
+        ]
+        image = render(items, (50, 50), scale=0.25, background='white')
+        self.assertEqual(image.getpixel((10, 10)), (255, 0, 0, 255))
+        self.assertEqual(image.getpixel((30, 37)), (0, 0, 255, 255))
+        self.assertEqual(image.getpixel((40, 10)), (255, 255, 255, 255))
+
+    def test_render_places_images(self):
+        source = Image.new('RGBA', (10, 10), (0, 255, 0, 255))
+        image = render([('image', [20, 20], {'image': source, 'anchor': 'nw'})], (40, 40))
+        self.assertEqual(image.getpixel((25, 25)), (0, 255, 0, 255))
+        self.assertEqual(image.getpixel((5, 5))[3], 0)
+
+if __name__ == '__main__':
+    unittest.main()
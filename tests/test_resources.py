@@ -0,0 +1,111 @@
+import tkinter as tk
+from types import SimpleNamespace
+from unittest import mock
+import pytest
+from PIL import Image
+import filters
+from resources import assert_released, leaks, resource_counts
+
+@pytest.fixture
+def canvas():
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        pytest.skip("no display")
+    from canvas import PaintCanvas
+    canvas = PaintCanvas(root)
+    yield canvas
+    root.destroy()
+
+def event(x, y):
+    return type('Event', (), {'x': x, 'y': y, 'time': 0, 'state': 0})()
+
+def test_leaks_reports_only_growth():
+    assert leaks({'items': 3, 'undo': 2}, {'items': 3, 'undo': 5, 'layers': 1}) == {'undo': (2, 5), 'layers': (0, 1)}
+
+def test_draw_undo_new_cycle_returns_to_baseline(canvas):
+    # Let the startup warm-up run, so the stamp sprites are part of the baseline
+    canvas.update_idletasks()
+    baseline = resource_counts(canvas)
+    for name in ('Brush', 'Rectangle'):
+        canvas.tool_manager.select_tool(name)
+        canvas._on_press(event(10, 10))
+        for i in range(1, 20):
+            canvas._on_drag(event(10 + i, 10 + i))
+        canvas._on_release(event(30, 30))
+    canvas.place_asset(5, 5, canvas.assets.add_image(Image.new('RGB', (64, 64), 'red')))
+    canvas.place_sprite(40, 40, 'Hi', 16)
+    canvas.add_layer()
+    canvas.undo()
+    assert leaks(baseline, resource_counts(canvas))
+    canvas.new_document()
+    assert_released(canvas, baseline)
+
+def offscreen_canvas(items):
+    """A PaintCanvas whose Tk calls are faked, keeping its item ids in the items set."""
+    from assets import AssetStore
+    from baking import Baker
+    from canvas import PaintCanvas
+    from glyphs import GlyphAtlas
+    from selection import Selection
+    from tools import ToolManager
+    from zorder import ShapeOrder
+    canvas = PaintCanvas.__new__(PaintCanvas)
+    for name in ('dtag', 'addtag_withtag', 'after_cancel', 'update_idletasks'):
+        setattr(canvas, name, lambda *args: None)
+    canvas.bbox = lambda tag: None
+    canvas.find_all = lambda: tuple(items)
+    canvas.image_names = lambda: ()
+    canvas.listeners, canvas._timers = [], set()
+    canvas.images, canvas.sprites, canvas._archives, canvas._raster_steps, canvas.bake_tiles, canvas.baked_history = {}, {}, {}, {}, {}, []
+    canvas.undo_stack, canvas.redo_stack = [], []
+    canvas.assets = AssetStore(photo_factory=lambda image: image)
+    canvas.glyphs = GlyphAtlas(canvas.assets)
+    canvas.tool_manager = ToolManager()
+    canvas.baker = Baker(canvas)
+    canvas.shapes = ShapeOrder()
+    canvas.selection = Selection(canvas)
+    return canvas
+
+def test_new_document_releases_everything_offscreen():
+    items, reset = set(), []
+    def create(self, kind, args, kw):
+        items.add(len(items) + 1)
+        return len(items)
+    with mock.patch.object(tk.Canvas, '_create', create), mock.patch.object(tk.Canvas, 'delete', lambda self, tag: items.clear()):
+        canvas = offscreen_canvas(items)
+        from layers import Layer
+        canvas.layers = [Layer('Layer 1'), Layer('Layer 2')]
+        canvas.listeners.append(SimpleNamespace(on_document_reset=lambda: reset.append(True)))
+        from shapes import Rectangle
+        shape = Rectangle((0, 0), (5, 5))
+        shape.canvas_id = create(None, 'rectangle', (), {})
+        canvas.shapes.append(shape)
+        canvas.selection.set([shape])
+        canvas.images[2], canvas.sprites[2], canvas._archives[2], canvas.bake_tiles[3] = 'photo', 'Hi', [], canvas.layers[0]
+        canvas.baked_history.append([1]), canvas.undo_stack.append([1]), canvas.redo_stack.append([2])
+        canvas.glyphs.sprite('Hi', 16)
+        canvas._timers.add('after#1')
+        canvas.region, canvas.mask, canvas._mask_photo = [0, 0, 5, 5], 'mask', 'photo'
+        pool = filters._pool = mock.Mock()
+        canvas.new_document()
+    counts = resource_counts(canvas)
+    # Only the new layer's marker item is left
+    assert counts.pop('layers') == 1 and counts.pop('items') == 1
+    # The stamp sprites are warmed again; the 'Hi' run is gone
+    stamp = canvas.tool_manager.tools['Stamp']
+    assert counts.pop('assets') == len(set(canvas.glyphs.keys.values()))
+    assert not any(counts.values()), counts
+    assert set(canvas.glyphs.keys) == {(emoji, stamp.size, 'black') for emoji in stamp.emojis}
+    assert canvas.region is None and canvas.mask is None
+    pool.shutdown.assert_called_once()
+    assert filters._pool is None and reset == [True]
+
+def test_layer_panel_stops_its_worker_on_reset():
+    from layer_panel import LayerPanel
+    panel = LayerPanel.__new__(LayerPanel)
+    panel._job, panel._thumb_versions, panel._results = ('job',), {'layer': 3}, None
+    executor = panel._executor = mock.Mock()
+    panel.on_document_reset()
+    executor.shutdown.assert_called_once_with(wait=False, cancel_futures=True)
+    assert panel._executor is None and panel._job is None and not panel._thumb_versions
@@ -0,0 +1,164 @@
+import tkinter as tk
+import unittest
+from unittest import mock
+from shapes import Rectangle, Line
+from selection import Selection, SELECTION_TAG, SELECTION_BOX_TAG
+from layers import Layer, CHROME_TAG
+
+class TagCanvas:
+    """Minimal stand-in for the tag and geometry commands of tk.Canvas."""
+    def __init__(self):
+        self.items = {}
+        self.next_id = 0
+        self.calls = 0
+    def _ids(self, tag):
+        if isinstance(tag, int):
+            return [tag] if tag in self.items else []
+        if tag.startswith('!'):
+            return [i for i, item in self.items.items() if tag[1:] not in item['tags']]
+        return [i for i, item in self.items.items() if tag in item['tags']]
+    def _create(self, *coords, tags=(), **kwargs):
+        self.next_id += 1
+        self.items[self.next_id] = {'coords': list(coords), 'tags': set([tags] if isinstance(tags, str) else tags)}
+        return self.next_id
+    create_rectangle = create_line = create_polygon = _create
+    def coords(self, item_id, *coords):
+        self.calls += 1
+        self.items[item_id]['coords'] = list(coords)
+    def itemconfig(self, item_id, **kwargs):
+        self.calls += 1
+    def delete(self, tag):
+        self.calls += 1
+        for i in self._ids(tag):
+            del self.items[i]
+    def dtag(self, tag, tag_to_delete):
+        self.calls += 1
+        for i in self._ids(tag):
+            self.items[i]['tags'].discard(tag_to_delete)
+    def addtag_withtag(self, new_tag, tag):
+        self.calls += 1
+        for i in self._ids(tag):
+            self.items[i]['tags'].add(new_tag)
+    def addtag_enclosed(self, new_tag, x0, y0, x1, y1):
+        self.calls += 1
+        for item in self.items.values():
+            xs, ys = item['coords'][0::2], item['coords'][1::2]
+            if min(xs) >= x0 and max(xs) <= x1 and min(ys) >= y0 and max(ys) <= y1:
+                item['tags'].add(new_tag)
+    def find_withtag(self, tag):
+        return tuple(self._ids(tag))
+    def move(self, tag, dx, dy):
+        self.calls += 1
+        for i in self._ids(tag):
+            c = self.items[i]['coords']
+            self.items[i]['coords'] = [v + (dx if k % 2 == 0 else dy) for k, v in enumerate(c)]
+    def scale(self, tag, cx, cy, fx, fy):
+        self.calls += 1
+        for i in self._ids(tag):
+            c = self.items[i]['coords']
+            self.items[i]['coords'] = [cx + (v - cx) * fx if k % 2 == 0 else cy + (v - cy) * fy for k, v in enumerate(c)]
+    def bbox(self, tag):
+        self.calls += 1
+        ids = self._ids(tag)
+        if not ids:
+            return None
+        xs = [v for i in ids for v in self.items[i]['coords'][0::2]]
+        ys = [v for i in ids for v in self.items[i]['coords'][1::2]]
+        return (min(xs), min(ys), max(xs), max(ys))
+
+def make_shapes(canvas, count):
+    shapes = []
+    for i in range(count):
+        shape = Rectangle((i * 10, 0), (i * 10 + 5, 5))
+        shape.draw(canvas)
+        shapes.append(shape)
+    return shapes
+
+class TestSelection(unittest.TestCase):
+    def test_group_move_uses_constant_calls(self):
+        canvas = TagCanvas()
+        shapes = make_shapes(canvas, 500)
+        selection = Selection(canvas)
+        selection.set(shapes)
+        selection.begin(0, 0)
+        canvas.calls = 0
+        for step in range(1, 11):
+            selection.update(step, step * 2)
+        self.assertEqual(canvas.calls, 20)
+        self.assertEqual(shapes[0].start, (0, 0))
+        selection.commit()
+        self.assertEqual(shapes[3].start, (40, 20))
+        self.assertEqual(canvas.items[shapes[3].canvas_id]['coords'], [40, 20, 45, 25])
+
+    def test_rubber_band_ignores_non_shape_items(self):
+        canvas = TagCanvas()
+        shapes = make_shapes(canvas, 5)
+        stroke = canvas.create_line(1, 1, 2, 2)
+        selection = Selection(canvas)
+        selection.select_enclosed(-1, -1, 26, 6, shapes)
+        self.assertEqual(selection.shapes, shapes[:3])
+        self.assertNotIn(SELECTION_TAG, canvas.items[stroke]['tags'])
+
+    def test_scale_and_rotate_commit_geometry(self):
+        canvas = TagCanvas()
+        line = Line((0, 0), (10, 0))
+        line.draw(canvas)
+        selection = Selection(canvas)
+        selection.set([line])
+        selection.begin(10, 0, mode='scale')
+        selection.update(15, 0)
+        selection.commit()
+        self.assertEqual((line.start, line.end), ((-5, 0), (15, 0)))
+        selection.begin(15, 0, mode='rotate')
+        selection.update(5, 10)
+        selection.commit()
+        self.assertAlmostEqual(line.start[0], 5)
+        self.assertAlmostEqual(line.start[1], -10)
+        self.assertAlmostEqual(line.end[1], 10)
+
+    def test_chrome_is_kept_out_of_the_layers(self):
+        from canvas import PaintCanvas
+        canvas = PaintCanvas.__new__(PaintCanvas)
+        canvas.layers, canvas.current_layer, canvas._target_layer = [Layer('Layer 1')], 0, None
+        filed = []
+        canvas.addtag_withtag = lambda tag, item_id: filed.append(item_id)
+        ids = iter(range(1, 10))
+        with mock.patch.object(tk.Canvas, '_create', lambda self, kind, args, kw: next(ids)):
+            canvas._create('polygon', (0, 0, 5, 5), {'tags': (SELECTION_BOX_TAG, CHROME_TAG)})
+            canvas._create('rectangle', (0, 0, 5, 5), {'tags': CHROME_TAG})
+            stroke = canvas._create('line', (0, 0, 5, 5), {})
+        self.assertEqual(filed, [stroke])
+        self.assertEqual(canvas.layers[0].version, 1)
+
+    def test_click_skips_shapes_on_hidden_layers(self):
+        from canvas import PaintCanvas
+        from zorder import ShapeOrder
+        tags = TagCanvas()
+        below, above = Rectangle((0, 0), (10, 10)), Rectangle((0, 0), (10, 10))
+        below.draw(tags), above.draw(tags)
+        shown, hidden = Layer('Layer 1'), Layer('Layer 2')
+        hidden.visible = False
+        canvas = PaintCanvas.__new__(PaintCanvas)
+        canvas.shapes, canvas.selection = ShapeOrder([below, above]), Selection(tags)
+        canvas._shape_layer = lambda shape: hidden if shape is above else shown
+        canvas._select_shape(5, 5)
+        self.assertEqual(canvas.selection.shapes, [below])
+
+    def test_undo_forgets_the_shape_it_deletes(self):
+        from canvas import PaintCanvas
+        from zorder import ShapeOrder
+        tags = TagCanvas()
+        kept, undone = make_shapes(tags, 2)
+        canvas = PaintCanvas.__new__(PaintCanvas)
+        canvas.shapes, canvas.selection = ShapeOrder([kept, undone]), Selection(tags)
+        canvas.undo_stack, canvas.redo_stack, canvas._archives, canvas._raster_steps = [[undone.canvas_id]], [], {}, {}
+        canvas.touch_layers = canvas._emit = lambda *args: None
+        canvas.delete = tags.delete
+        canvas.selection.set([kept, undone])
+        canvas.undo()
+        self.assertEqual(list(canvas.shapes), [kept])
+        self.assertEqual(canvas.selection.shapes, [kept])
+        self.assertIsNone(canvas.shapes.find(undone.canvas_id))
+
+if __name__ == '__main__':
+    unittest.main()
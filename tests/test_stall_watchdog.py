@@ -0,0 +1,45 @@
+from stall_watchdog import StallWatchdog
+
+class FakeRoot:
+    """Accepts after() calls without running them, so the heartbeat only moves when a test moves it."""
+    def after(self, ms, callback):
+        return 'after#1'
+
+    def after_cancel(self, after_id):
+        pass
+
+def slow_handler(watchdog, now):
+    watchdog.check(now)
+
+def test_stall_is_reported_with_the_main_thread_stack(tmp_path):
+    log = tmp_path / 'stalls.log'
+    # A long interval keeps the watching thread asleep; the test drives check() itself
+    watchdog = StallWatchdog(FakeRoot(), threshold=0.2, interval=30, log_path=str(log)).start()
+    beat = watchdog._last_beat
+    watchdog.check(beat + 30.1)
+    assert watchdog._stall is None
+    slow_handler(watchdog, beat + 30.3)
+    watchdog.check(beat + 30.35)
+    watchdog.check(beat + 30.6)
+    watchdog._last_beat = beat + 31.0
+    watchdog.check(beat + 31.0)
+    watchdog.stop()
+    text = log.read_text()
+    assert 'Main loop stalled for 1.000 s' in text
+    assert text.count('stack at') == 2
+    assert 'in slow_handler' in text
+    assert watchdog.stalls == 1
+
+def test_reports_rotate_and_unfinished_stalls_are_flushed(tmp_path):
+    log = tmp_path / 'stalls.log'
+    watchdog = StallWatchdog(FakeRoot(), threshold=0.1, interval=30, log_path=str(log), max_bytes=2000, backups=2).start()
+    for _ in range(6):
+        beat = watchdog._last_beat
+        watchdog.check(beat + 30.5)
+        watchdog._last_beat = beat + 31
+        watchdog.check(beat + 31)
+    watchdog.check(watchdog._last_beat + 30.5)
+    watchdog.stop()
+    assert watchdog.stalls == 7
+    assert (tmp_path / 'stalls.log.1').exists() and not (tmp_path / 'stalls.log.3').exists()
+    assert 'still stalled' in log.read_text()
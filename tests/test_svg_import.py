@@ -0,0 +1,90 @@
+from contextlib import contextmanager
+from types import SimpleNamespace
+from io import BytesIO
+import pytest
+from svg_import import SvgImport, iter_svg, parse_color, parse_path
+
+DRAWING = b'''<svg xmlns="http://www.w3.org/2000/svg" width="200" height="100" viewBox="0 0 400 200">
+<defs><rect width="5" height="5"/></defs>
+<rect x="10" y="10" width="40" height="20" fill="red"/>
+<g id="Sky" transform="translate(10,0)" style="stroke:rgb(0,0,255);stroke-width:4">
+  <circle cx="100" cy="100" r="20" fill="none"/>
+  <path d="M0 0 L10 10 h10 z m 50 50 l 5 5" fill="none"/>
+  <text x="5" y="50" font-size="20">Hello <tspan>World</tspan></text>
+  <rect width="10" height="10" transform="rotate(45)"/>
+</g>
+</svg>'''
+
+class ImportCanvas:
+    def __init__(self):
+        self.layers = [SimpleNamespace(name='Layer 1')]
+        self.current_layer = 0
+        self.created = []
+        self.actions = []
+        self._target = None
+    def add_layer(self):
+        self.layers.append(SimpleNamespace(name=f'Layer {len(self.layers) + 1}'))
+        return self.layers[-1]
+    def rename_layer(self, index, name):
+        self.layers[index].name = name
+    @contextmanager
+    def drawing_on(self, layer):
+        self._target = layer
+        yield layer
+    def create_from_snapshot(self, kind, coords, options, shape=False):
+        self.created.append((self._target.name, kind, shape))
+        return len(self.created)
+    def push_action(self, item_ids):
+        self.actions.append(list(item_ids))
+
+def test_entries_map_to_shapes_strokes_and_layers():
+    entries = list(iter_svg(BytesIO(DRAWING)))
+    assert [entry[0] for entry in entries] == ['rectangle', 'layer', 'oval', 'line', 'line', 'text', 'polygon']
+    rect, layer, oval, closed, open_line, text, rotated = entries
+    assert rect == ('rectangle', [5.0, 5.0, 25.0, 15.0], {'fill': '#ff0000', 'outline': '', 'width': 1}, True)
+    assert layer == ('layer', 'Sky')
+    assert oval[1] == [45.0, 40.0, 65.0, 60.0] and oval[2]['outline'] == '#0000ff' and oval[2]['width'] == 2.0
+    assert closed[1] == [5.0, 0.0, 10.0, 5.0, 15.0, 5.0, 5.0, 0.0] and open_line[1] == [30.0, 25.0, 32.5, 27.5]
+    assert text[2]['text'] == 'Hello World' and text[2]['font'] == ('Arial', -10)
+    assert rotated[3] is False and len(rotated[1]) == 8
+
+def test_arc_and_curves_end_on_their_endpoints():
+    (points, closed), = parse_path('M 0 0 A 10 10 0 0 1 20 0 Q 30 10 40 0 T 60 0')
+    assert not closed
+    assert points[12] == (20.0, 0.0) and points[-1] == (60.0, 0.0)
+    assert min(y for _, y in points[:13]) == pytest.approx(-10.0, abs=0.5)
+
+def test_import_builds_items_in_chunks(tmp_path):
+    path = tmp_path / 'drawing.svg'
+    path.write_bytes(DRAWING)
+    canvas = ImportCanvas()
+    job = SvgImport(canvas, path, chunk_size=3)
+    assert job.step() and job.step()
+    assert not job.step() and job.done
+    assert [layer.name for layer in canvas.layers] == ['Layer 1', 'Sky']
+    assert [target for target, _, _ in canvas.created] == ['Layer 1'] + ['Sky'] * 5
+    assert canvas.actions == [[1, 2, 3, 4, 5, 6]]
+
+def test_colours_are_converted_for_tk():
+    assert parse_color('rebeccapurple') == '#663399'
+    assert parse_color('hsl(120, 100%, 50%)') == '#00ff00'
+    assert parse_color('#0f08') == '#00ff00'
+    assert parse_color('rgb(100%, 0%, 0%)') == '#ff0000'
+    assert parse_color('not-a-colour') == parse_color('none') == ''
+
+def test_failed_import_still_closes_the_file_and_keeps_its_items(tmp_path):
+    path = tmp_path / 'drawing.svg'
+    path.write_bytes(DRAWING)
+    canvas, finished = ImportCanvas(), []
+    create = canvas.create_from_snapshot
+    def create_then_fail(kind, coords, options, shape=False):
+        if kind == 'text':
+            raise RuntimeError("Tk rejected the item")
+        return create(kind, coords, options, shape)
+    canvas.create_from_snapshot = create_then_fail
+    job = SvgImport(canvas, path, chunk_size=100, on_done=finished.append)
+    with pytest.raises(RuntimeError):
+        job.step()
+    assert job.done and job._file.closed and finished == [job]
+    assert isinstance(job.error, RuntimeError)
+    assert canvas.actions == [[1, 2, 3, 4]]
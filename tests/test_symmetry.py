@@ -0,0 +1,55 @@
+import numpy as np
+from layers import CHROME_TAG
+from symmetry import SymmetryTool, SYMMETRY_PREVIEW_TAG, replicate, symmetry_matrices
+from tools import BrushTool, ToolManager
+
+class StrokeCanvas:
+    def __init__(self):
+        self.items = {}
+        self.created = 0
+    def winfo_width(self):
+        return 200
+    def winfo_height(self):
+        return 100
+    def create_line(self, *coords, **kwargs):
+        self.created += 1
+        self.items[self.created] = (coords, kwargs)
+        return self.created
+    def delete(self, tag):
+        self.items = {k: v for k, v in self.items.items() if tag not in v[1].get('tags', ())}
+
+def event(x, y, t):
+    return type('Event', (), {'x': x, 'y': y, 'time': t})()
+
+def test_replicate_rotates_and_mirrors_about_center():
+    copies = replicate([(110, 50)], symmetry_matrices(4, mirror=True), (100, 50))
+    assert copies.shape == (8, 1, 2)
+    points = {tuple(np.round(p[0]).astype(int)) for p in copies}
+    assert points == {(110, 50), (100, 60), (90, 50), (100, 40)}
+    assert np.allclose(copies[5, 0], (100, 40))
+
+def test_symmetry_brush_emits_one_item_per_copy():
+    canvas = StrokeCanvas()
+    tool = SymmetryTool(BrushTool(color='red', size=4), ways=8, mirror=True)
+    tool.on_press(event(120, 50, 1), canvas)
+    for i in range(1, 30):
+        assert tool.on_drag(event(120 + i, 50 + i, 1 + i), canvas) is None
+    assert len(canvas.items) == 16 * 29
+    # Previews are chrome, so they are not filed into the layer
+    assert all(CHROME_TAG in options['tags'] for _, options in canvas.items.values())
+    item_ids = tool.on_release(event(149, 79, 31), canvas)
+    assert len(item_ids) == 16 and len(canvas.items) == 16
+    coords, options = canvas.items[item_ids[0]]
+    assert len(coords) == 60 and options['fill'] == 'red' and SYMMETRY_PREVIEW_TAG not in options.get('tags', ())
+
+def test_tool_manager_wraps_stroke_tools_only():
+    manager = ToolManager()
+    manager.set_symmetry(6)
+    assert isinstance(manager.current_tool, SymmetryTool) and manager.current_tool.name == 'Brush'
+    manager.current_tool.color = 'blue'
+    assert manager.tools['Brush'].color == 'blue'
+    manager.select_tool('Rectangle')
+    assert not isinstance(manager.current_tool, SymmetryTool)
+    manager.select_tool('Soft Brush')
+    manager.set_symmetry(1)
+    assert manager.current_tool is manager.tools['Soft Brush']
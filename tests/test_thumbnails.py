@@ -0,0 +1,43 @@
+import os
+from PIL import Image
+from thumbnails import ThumbnailCache, list_images
+
+def test_thumbnails_are_cached_until_the_file_changes(tmp_path):
+    source = tmp_path / 'art' / 'photo.jpg'
+    source.parent.mkdir()
+    Image.new('RGB', (800, 400), 'red').save(source)
+    cache = ThumbnailCache(tmp_path / 'cache', size=(64, 64))
+    assert cache.cached(source) is None
+    thumb = cache.load(source)
+    assert thumb.size == (64, 32)
+    assert cache.cached(source).size == (64, 32)
+    assert len(os.listdir(cache.directory)) == 1
+    Image.new('RGB', (400, 400), 'blue').save(source)
+    os.utime(source, ns=(1, 1))
+    assert cache.cached(source) is None
+    assert cache.submit(source).result().size == (64, 64)
+    cache.shutdown()
+
+def test_evict_drops_least_recently_used(tmp_path):
+    cache = ThumbnailCache(tmp_path / 'cache', max_bytes=1 << 20)
+    paths = []
+    for i in range(3):
+        paths.append(tmp_path / f'{i}.png')
+        Image.effect_noise((256, 256), 64).save(paths[-1])
+        cache.load(paths[-1])
+    entries = [cache.entry_path(path) for path in paths]
+    for age, entry in enumerate(entries):
+        os.utime(entry, ns=(age * 10**9, age * 10**9))
+    os.utime(entries[0])
+    cache.max_bytes = os.path.getsize(entries[0]) + os.path.getsize(entries[2]) + 1
+    cache.evict()
+    assert [os.path.exists(entry) for entry in entries] == [True, False, True]
+
+def test_list_images_skips_other_files(tmp_path):
+    (tmp_path / 'b.PNG').write_bytes(b'')
+    (tmp_path / 'a.jpg').write_bytes(b'')
+    (tmp_path / 'notes.txt').write_bytes(b'')
+    (tmp_path / 'sub').mkdir()
+    folders, files = list_images(tmp_path)
+    assert [os.path.basename(p) for p in folders] == ['sub']
+    assert [os.path.basename(p) for p in files] == ['a.jpg', 'b.PNG']
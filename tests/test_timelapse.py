@@ -0,0 +1,17 @@
+import pytest
+from PIL import Image, ImageSequence
+from timelapse import export_timelapse
+
+ACTIONS = [[('rectangle', [10 * i, 10, 10 * i + 8, 30], {'fill': 'red', 'outline': '', 'width': 1})] for i in range(7)]
+
+@pytest.mark.parametrize('ext', ['.gif', '.png', '.webp'])
+def test_timelapse_frames_replay_history(tmp_path, ext):
+    path = tmp_path / ('replay' + ext)
+    assert export_timelapse(ACTIONS, (80, 40), str(path), fps=20, actions_per_frame=2) == 5
+    with Image.open(path) as animation:
+        assert animation.n_frames == 5
+        frames = [frame.convert('RGB') for frame in ImageSequence.Iterator(animation)]
+    assert frames[0].getpixel((14, 20)) == (255, 255, 255)
+    assert frames[1].getpixel((14, 20)) == (255, 0, 0)
+    assert frames[1].getpixel((24, 20)) == (255, 255, 255)
+    assert frames[-1].getpixel((64, 20)) == (255, 0, 0)
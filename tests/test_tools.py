@@ -1,5 +1,5 @@
 import unittest
-from tools import BrushTool, EraserTool
+from tools import BrushTool, EraserTool, RectangleTool, LineTool
 from canvas import PaintCanvas
 import tkinter as tk
 
@@ -10,6 +10,26 @@ class DummyCanvas:
         self.lines.append((x0, y0, x1, y1, kwargs))
         return len(self.lines)
 
+class PreviewCanvas:
+    def __init__(self):
+        self.items = {}
+        self.created = 0
+        self.shapes = []
+    def _create(self, kind, *coords, **kwargs):
+        self.created += 1
+        self.items[self.created] = [kind, coords, kwargs]
+        return self.created
+    def create_rectangle(self, *coords, **kwargs):
+        return self._create('rectangle', *coords, **kwargs)
+    def create_line(self, *coords, **kwargs):
+        return self._create('line', *coords, **kwargs)
+    def coords(self, item_id, *coords):
+        self.items[item_id][1] = coords
+    def itemconfig(self, item_id, **kwargs):
+        self.items[item_id][2].update(kwargs)
+    def delete(self, item_id):
+        del self.items[item_id]
+
 class DummyRoot(tk.Tk):
     def __init__(self):
         super().__init__()
@@ -44,6 +64,32 @@ class TestTools(unittest.TestCase):
         self.assertEqual(len(canvas.lines), 1)
         self.assertEqual(canvas.lines[0][4]['fill'], 'white')
         self.assertEqual(canvas.lines[0][4]['width'], 8)
+    def test_rectangle_preview_updates_in_place(self):
+        tool = RectangleTool(color='blue', size=2)
+        canvas = PreviewCanvas()
+        Event = type('Event', (), {})
+        def event(x, y):
+            e = Event()
+            e.x, e.y = x, y
+            return e
+        tool.on_press(event(0, 0), canvas)
+        for i in range(1, 20):
+            self.assertIsNone(tool.on_drag(event(i, i), canvas))
+        self.assertEqual(canvas.created, 1)
+        self.assertEqual(canvas.items[1][2]['dash'], (2, 2))
+        item_id = tool.on_release(event(30, 40), canvas)
+        self.assertEqual(item_id, 1)
+        self.assertEqual(canvas.items[1][1], (0, 0, 30, 40))
+        self.assertEqual(canvas.items[1][2]['dash'], '')
+        self.assertEqual(canvas.items[1][2]['outline'], 'blue')
+        self.assertEqual(len(canvas.shapes), 1)
+    def test_line_click_without_drag(self):
+        tool = LineTool(color='green')
+        canvas = PreviewCanvas()
+        tool.on_press(type('Event', (), {'x': 5, 'y': 5})(), canvas)
+        item_id = tool.on_release(type('Event', (), {'x': 5, 'y': 5})(), canvas)
+        self.assertEqual(canvas.items[item_id][0], 'line')
+        self.assertEqual(canvas.items[item_id][2]['fill'], 'green')
 
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -0,0 +1,50 @@
+import pytest
+from shapes import Rectangle
+from zorder import ShapeOrder
+
+def make_shapes(count):
+    shapes = []
+    for i in range(count):
+        shape = Rectangle((i, i), (i + 1, i + 1))
+        shape.canvas_id = i + 1
+        shapes.append(shape)
+    return shapes
+
+def test_reorder_operations_keep_order_and_index():
+    a, b, c, d = make_shapes(4)
+    order = ShapeOrder([a, b, c, d])
+    order.to_front(a)
+    order.to_back(d)
+    assert list(order) == [d, b, c, a]
+    order.place_above(b, c)
+    order.place_below(a, d)
+    assert list(order) == [a, d, c, b]
+    assert list(reversed(order)) == [b, c, d, a]
+    assert order.above(c) is b and order.above(b) is None and order.below(a) is None
+    order.remove(d)
+    assert list(order) == [a, c, b] and order.find(4) is None and order.find(3) is c
+    with pytest.raises(ValueError):
+        order.remove(d)
+
+def test_large_scene_deletes_do_not_rebuild():
+    shapes = make_shapes(50000)
+    order = ShapeOrder(shapes)
+    for shape in shapes[::2]:
+        order.remove(shape)
+    assert len(order) == 25000
+    assert order.find(2) is shapes[1] and order.below(shapes[3]) is shapes[1]
+
+def test_neighbours_within_a_group_skip_other_groups():
+    shapes = make_shapes(6)
+    # Shapes alternate between two layers
+    order = ShapeOrder(shapes, group_of=lambda shape: shape.canvas_id % 2)
+    a, b, c, d, e, f = shapes
+    assert order.above(a, same_group=True) is c and order.below(e, same_group=True) is c
+    assert order.above(e, same_group=True) is None and order.above(e) is f
+    order.place_above(a, c)
+    assert list(order) == [b, c, a, d, e, f] and order.above(a, same_group=True) is e
+    order.to_back(e)
+    order.to_front(b)
+    assert order.below(c, same_group=True) is e and order.above(f, same_group=True) is b
+    order.remove(c)
+    assert order.above(e, same_group=True) is a and order.below(a, same_group=True) is e
@@ -0,0 +1,139 @@
+"""
+thumbnails.py - On-disk thumbnail cache for the Paint App
+
+Thumbnails are stored as small PNG files named by a hash of the image's
+absolute path, file size, modification time and the thumbnail size. Editing
+or replacing an image changes its key, so a stale thumbnail is never shown.
+Old entries are simply not read again. Reading an entry refreshes its mtime,
+and evict() removes the least recently used files once the cache passes its
+size limit.
+"""
+
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageOps
+
+THUMBNAIL_SIZE = (96, 96)
+CACHE_BYTES = 64 << 20
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.webp')
+
+def default_cache_dir():
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'paint_app', 'thumbnails')
+
+def make_thumbnail(source, size=THUMBNAIL_SIZE):
+    """Decode an image at reduced size where the format allows it and shrink it to fit size."""
+    with Image.open(source) as image:
+        # JPEG can decode straight to a fraction of its size
+        image.draft('RGB', size)
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail(size)
+        return image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+
+class ThumbnailCache:
+    """
+    Thumbnails on disk, keyed by path, size and modification time. load() may run
+    on any thread; the shared pool decodes images in the background.
+    """
+    def __init__(self, directory=None, size=THUMBNAIL_SIZE, max_bytes=CACHE_BYTES, workers=None):
+        self.directory = directory or default_cache_dir()
+        self.size = tuple(size)
+        self.max_bytes = max_bytes
+        self.workers = workers or os.cpu_count() or 1
+        self._pool = None
+        self._lock = threading.Lock()
+        self._written = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='thumbnails')
+        return self._pool
+
+    def entry_path(self, path):
+        """The cache file for an image as it is on disk now."""
+        info = os.stat(path)
+        key = f'{os.path.abspath(path)}:{info.st_size}:{info.st_mtime_ns}:{self.size[0]}x{self.size[1]}'
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest() + '.png')
+
+    def cached(self, path):
+        """Return the cached thumbnail, or None if there is no fresh one."""
+        try:
+            entry = self.entry_path(path)
+            with Image.open(entry) as image:
+                image.load()
+            os.utime(entry)
+            return image
+        except OSError:
+            return None
+
+    def load(self, path):
+        """Return the thumbnail of an image, generating and storing it on a miss. None if it cannot be read."""
+        image = self.cached(path)
+        if image is not None:
+            return image
+        try:
+            image = make_thumbnail(path, self.size)
+            entry = self.entry_path(path)
+        except (OSError, ValueError, Image.DecompressionBombError):
+            return None
+        temporary = f'{entry}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            image.save(temporary, 'PNG')
+            os.replace(temporary, entry)
+        except OSError:
+            return image
+        with self._lock:
+            self._written += os.path.getsize(entry)
+            due = self._written > self.max_bytes // 10
+            if due:
+                self._written = 0
+        if due:
+            self.evict()
+        return image
+
+    def submit(self, path):
+        """Load a thumbnail on the background pool; returns a Future."""
+        return self.pool.submit(self.load, path)
+
+    def evict(self):
+        """Delete the least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.name.endswith('.png'):
+                    info = entry.stat()
+                    entries.append((info.st_mtime_ns, info.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+        return total
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+def list_images(directory, extensions=IMAGE_EXTENSIONS):
+    """Return (subdirectories, image files) of a directory, each sorted by name."""
+    folders, files = [], []
+    with os.scandir(directory) as scan:
+        for entry in scan:
+            if entry.name.startswith('.'):
+                continue
+            if entry.is_dir():
+                folders.append(entry.path)
+            elif entry.name.lower().endswith(extensions):
+                files.append(entry.path)
+    folders.sort(key=lambda path: os.path.basename(path).lower())
+    files.sort(key=lambda path: os.path.basename(path).lower())
+    return folders, files
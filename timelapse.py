@@ -0,0 +1,207 @@
+"""
+timelapse.py - Animated replays of the drawing history for the Paint App
+
+Frames are built incrementally: each undoable action in the canvas history is
+drawn on top of the previous frame instead of re-rendering the document. Every
+few actions the frame is handed to a streaming writer, which encodes only the
+rectangle that changed since the last frame and writes it out straight away.
+Memory therefore stays at about two frames, however long the replay is.
+
+GIF frames go through Pillow's single-frame GIF helpers. APNG and animated WebP
+are assembled chunk by chunk from single-frame encodes, because Pillow's own
+multi-frame writers hold every frame until the end.
+"""
+
+import io
+import os
+import struct
+import zlib
+from PIL import Image, ImageChops, GifImagePlugin
+from renderer import snapshot_item, draw_items
+
+def history_actions(canvas):
+    """Yield the snapshotted items of each action, oldest first, starting with those retired by baking."""
+    yield from getattr(canvas, 'baked_history', ())
+    for action in canvas.undo_stack:
+        items = [snapshot_item(canvas, item_id, include_hidden=True) for item_id in action]
+        yield [item for item in items if item is not None]
+
+def iter_frames(actions, size, actions_per_frame=1, background='white', scale=1.0):
+    """Draw actions onto one running frame and yield it every actions_per_frame actions."""
+    frame = Image.new('RGBA', (max(1, round(size[0] * scale)), max(1, round(size[1] * scale))), background)
+    yield frame
+    pending = 0
+    for items in actions:
+        draw_items(frame, items, scale)
+        pending += 1
+        if pending == actions_per_frame:
+            pending = 0
+            yield frame
+    if pending:
+        yield frame
+
+class FrameWriter:
+    """Base for streaming writers: tracks the last frame and the rectangle each new frame changed."""
+    def __init__(self, path, size, duration, loop=0):
+        self.fp = open(path, 'wb')
+        self.size = size
+        self.duration = duration
+        self.loop = loop
+        self.frames = 0
+        self._previous = None
+
+    def add(self, frame):
+        """Encode the part of frame that differs from the previous one."""
+        if self._previous is None:
+            box = (0, 0) + frame.size
+        else:
+            box = ImageChops.difference(frame, self._previous).getbbox(alpha_only=False) or (0, 0, 1, 1)
+        box = self._align(box)
+        self._write(frame.crop(box).convert('RGB'), box[:2])
+        self._previous = frame.copy()
+        self.frames += 1
+
+    def _align(self, box):
+        return box
+
+    def close(self):
+        self.fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class GifWriter(FrameWriter):
+    """Animated GIF; each changed rectangle is quantized with its own palette and drawn over the last frame."""
+    def _write(self, region, offset):
+        region = region.quantize(256)
+        if self.frames == 0:
+            header, _ = GifImagePlugin.getheader(region, info={'loop': self.loop})
+            self.fp.write(b''.join(header))
+        for data in GifImagePlugin.getdata(region, offset, duration=self.duration, disposal=1, include_color_table=True):
+            self.fp.write(data)
+
+    def close(self):
+        self.fp.write(b';')
+        super().close()
+
+def _png_chunks(data):
+    """Yield (type, payload) for each chunk of an encoded PNG."""
+    pos = 8
+    while pos < len(data):
+        length, kind = struct.unpack('>I4s', data[pos:pos + 8])
+        yield kind, data[pos + 8:pos + 8 + length]
+        pos += 12 + length
+
+class ApngWriter(FrameWriter):
+    """Animated PNG; every frame is a PNG encode whose image data is rewrapped as fdAT chunks."""
+    def __init__(self, path, size, duration, loop=0, frame_count=1):
+        super().__init__(path, size, duration, loop)
+        self.frame_count = frame_count
+        self._sequence = 0
+
+    def _chunk(self, kind, payload):
+        self.fp.write(struct.pack('>I', len(payload)) + kind + payload + struct.pack('>I', zlib.crc32(kind + payload)))
+
+    def _write(self, region, offset):
+        buffer = io.BytesIO()
+        region.save(buffer, 'PNG', compress_level=6)
+        chunks = list(_png_chunks(buffer.getvalue()))
+        if self.frames == 0:
+            self.fp.write(b'\x89PNG\r\n\x1a\n')
+            self._chunk(b'IHDR', chunks[0][1])
+            self._chunk(b'acTL', struct.pack('>II', self.frame_count, self.loop))
+        # dispose_op none, blend_op source: the rectangle replaces what was there
+        self._chunk(b'fcTL', struct.pack('>IIIIIHHBB', self._sequence, region.width, region.height, offset[0], offset[1], self.duration, 1000, 0, 0))
+        self._sequence += 1
+        for kind, payload in chunks:
+            if kind == b'IDAT':
+                if self.frames == 0:
+                    self._chunk(b'IDAT', payload)
+                else:
+                    self._chunk(b'fdAT', struct.pack('>I', self._sequence) + payload)
+                    self._sequence += 1
+
+    def close(self):
+        self._chunk(b'IEND', b'')
+        super().close()
+
+class WebpWriter(FrameWriter):
+    """Animated WebP; every frame is a lossless WebP encode wrapped in an ANMF chunk."""
+    def __init__(self, path, size, duration, loop=0, quality=80, lossless=True):
+        super().__init__(path, size, duration, loop)
+        self.quality = quality
+        self.lossless = lossless
+        width, height = size
+        self.fp.write(b'RIFF\0\0\0\0WEBP')
+        self._chunk(b'VP8X', struct.pack('<I', 0x02) + (width - 1).to_bytes(3, 'little') + (height - 1).to_bytes(3, 'little'))
+        self._chunk(b'ANIM', struct.pack('<IH', 0xFFFFFFFF, loop))
+
+    def _chunk(self, kind, payload):
+        self.fp.write(kind + struct.pack('<I', len(payload)) + payload + (b'\0' if len(payload) % 2 else b''))
+
+    def _align(self, box):
+        # ANMF offsets are stored halved, so they must be even
+        return (box[0] & ~1, box[1] & ~1, box[2], box[3])
+
+    def _write(self, region, offset):
+        buffer = io.BytesIO()
+        region.save(buffer, 'WEBP', lossless=self.lossless, quality=self.quality)
+        data = buffer.getvalue()
+        payload = []
+        pos = 12
+        while pos < len(data):
+            kind, length = data[pos:pos + 4], struct.unpack('<I', data[pos + 4:pos + 8])[0]
+            if kind in (b'ALPH', b'VP8 ', b'VP8L'):
+                payload.append(data[pos:pos + 8 + length + (length & 1)])
+            pos += 8 + length + (length & 1)
+        header = b''.join(value.to_bytes(3, 'little') for value in (offset[0] // 2, offset[1] // 2, region.width - 1, region.height - 1, self.duration))
+        # Flags 0b10: do not blend, do not dispose
+        self._chunk(b'ANMF', header + b'\x02' + b''.join(payload))
+
+    def close(self):
+        end = self.fp.tell()
+        self.fp.seek(4)
+        self.fp.write(struct.pack('<I', end - 8))
+        super().close()
+
+WRITERS = {'.gif': GifWriter, '.png': ApngWriter, '.apng': ApngWriter, '.webp': WebpWriter}
+
+def export_timelapse(actions, size, path, fps=10, actions_per_frame=1, background='white', scale=1.0, loop=0):
+    """
+    Stream a replay of actions to an animated GIF, APNG or WebP chosen by the file extension.
+    actions is a sized sequence of snapshotted item lists, as produced by history_actions().
+    Returns the number of frames written.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in WRITERS:
+        raise ValueError(f"Unsupported timelapse format: {ext}")
+    width, height = max(1, round(size[0] * scale)), max(1, round(size[1] * scale))
+    duration = max(1, round(1000 / fps))
+    options = {}
+    if WRITERS[ext] is ApngWriter:
+        # acTL needs the frame count before the first frame is written
+        options['frame_count'] = 1 + -(-len(actions) // actions_per_frame)
+    with WRITERS[ext](path, (width, height), duration, loop, **options) as writer:
+        for frame in iter_frames(actions, size, actions_per_frame, background, scale):
+            writer.add(frame)
+    return writer.frames
+
+def export_canvas_timelapse(canvas, path, fps=10, actions_per_frame=1):
+    """Replay the canvas undo history into an animation file."""
+    size = (max(1, canvas.winfo_width()), max(1, canvas.winfo_height()))
+    actions = _SizedActions(canvas)
+    return export_timelapse(actions, size, path, fps, actions_per_frame, background=canvas.bg_color)
+
+class _SizedActions:
+    """history_actions() with a length, so APNG can announce its frame count up front."""
+    def __init__(self, canvas):
+        self.canvas = canvas
+
+    def __len__(self):
+        return len(self.canvas.baked_history) + len(self.canvas.undo_stack)
+
+    def __iter__(self):
+        return history_actions(self.canvas)
@@ -2,13 +2,30 @@
 tools.py - Tool management for the Paint App
 """
 
-from shapes import Rectangle, Oval
+from shapes import Rectangle, Oval, Line
+from layers import REGION_TAG, CHROME_TAG
+from brush_engine import StrokeResampler, coverage_to_rgba, dynamics, paper_texture, render_dabs
+from masks import Mask, magic_wand, planar_pixels
+from gradients import GradientCache, normalize_stops
+from PIL import ImageChops
+import numpy as np
+import math
 import random
+import time
+
+SHIFT_MASK = 0x0001
+CONTROL_MASK = 0x0004
 
 class Tool:
     """
     Base class for drawing tools (brush, eraser, etc.).
+    Freehand tools leave a trail of points while dragging. Streamed tools draw
+    nothing but a plain line along the pointer, so a collaborative session can
+    send their raw points instead of the finished items.
     """
+    freehand = False
+    streamed = False
+
     def __init__(self, name):
         self.name = name
 
@@ -25,6 +42,9 @@ class BrushTool(Tool):
     """
     Brush tool for freehand drawing.
     """
+    freehand = True
+    streamed = True
+
     def __init__(self, color='black', size=3):
         super().__init__('Brush')
         self.color = color
@@ -46,10 +66,95 @@ class BrushTool(Tool):
         self.last_x, self.last_y = None, None
         return None
 
+    def draw_stroke(self, canvas, points, times=None):
+        """Draw a whole stroke as one smoothed line item."""
+        coords = np.asarray(points, dtype=float).ravel().tolist()
+        if len(coords) == 2:
+            coords *= 2
+        return canvas.create_line(*coords, fill=self.color, width=self.size, capstyle='round', joinstyle='round', smooth=True)
+
+def _event_time(event):
+    """Return the event timestamp in milliseconds, falling back to the wall clock."""
+    t = getattr(event, 'time', None)
+    return t if isinstance(t, int) and t > 0 else time.monotonic() * 1000
+
+class DabBrushTool(Tool):
+    """
+    Raster brush that stamps soft, textured dabs along the stroke.
+    Dab width and opacity follow pointer speed. A thin line previews the stroke
+    while dragging; on release the dabs are rendered once and placed as a single
+    image item.
+    """
+    freehand = True
+    preview_tag = 'dab_preview'
+
+    def __init__(self, color='black', size=12, flow=0.35, hardness=0.4, spacing=0.15):
+        super().__init__('Soft Brush')
+        self.color = color
+        self.size = size
+        self.flow = flow
+        self.hardness = hardness
+        self.spacing = spacing
+        self.texture = paper_texture()
+        self._resampler = None
+        self._dabs = []
+        self._speeds = []
+        self._last = None
+
+    def on_press(self, event, canvas):
+        self._resampler = StrokeResampler(max(0.5, self.spacing * self.size))
+        dabs, speeds = self._resampler.start(event.x, event.y, _event_time(event))
+        self._dabs, self._speeds = [dabs], [speeds]
+        self._last = (event.x, event.y)
+        return None
+
+    def on_drag(self, event, canvas):
+        if self._resampler is None:
+            return None
+        dabs, speeds = self._resampler.add([(event.x, event.y)], [_event_time(event)])
+        self._dabs.append(dabs)
+        self._speeds.append(speeds)
+        canvas.create_line(self._last[0], self._last[1], event.x, event.y, fill=self.color, width=max(1, self.size // 3), capstyle='round', tags=(self.preview_tag, CHROME_TAG))
+        self._last = (event.x, event.y)
+        return None
+
+    def on_release(self, event, canvas):
+        if self._resampler is None:
+            return None
+        canvas.delete(self.preview_tag)
+        item_id = self.render(canvas)
+        self._resampler = None
+        self._dabs, self._speeds = [], []
+        return item_id
+
+    def render(self, canvas):
+        """Rasterize the collected dabs and place them on the canvas as one image."""
+        from PIL import Image
+        radii, alphas = dynamics(np.concatenate(self._speeds), self.size, self.flow)
+        coverage, (x0, y0) = render_dabs(np.vstack(self._dabs), radii, alphas, self.hardness, self.texture)
+        return canvas.place_image(x0, y0, Image.fromarray(coverage_to_rgba(coverage, self.color)))
+
+    def draw_stroke(self, canvas, points, times):
+        """Resample a whole recorded stroke into dabs and place it as one image."""
+        resampler = StrokeResampler(max(0.5, self.spacing * self.size))
+        (x, y), t = points[0], times[0]
+        dabs, speeds = resampler.start(x, y, t)
+        self._dabs, self._speeds = [dabs], [speeds]
+        if len(points) > 1:
+            dabs, speeds = resampler.add([tuple(p) for p in points[1:]], list(times[1:]))
+            self._dabs.append(dabs)
+            self._speeds.append(speeds)
+        item_id = self.render(canvas)
+        self._dabs, self._speeds = [], []
+        return item_id
+
 class EraserTool(Tool):
     """
     Eraser tool for erasing drawings.
     """
+    freehand = True
+    streamed = True
+
     def __init__(self, size=10):
         super().__init__('Eraser')
         self.size = size
@@ -70,105 +175,81 @@ class EraserTool(Tool):
         self.last_x, self.last_y = None, None
         return None
 
-class RectangleTool(Tool):
+    def draw_stroke(self, canvas, points, times=None):
+        """Erase along a whole stroke with one line item."""
+        coords = np.asarray(points, dtype=float).ravel().tolist()
+        if len(coords) == 2:
+            coords *= 2
+        return canvas.create_line(*coords, fill='white', width=self.size, capstyle='round', joinstyle='round', smooth=True)
+
+class ShapeTool(Tool):
     """
-    Tool for drawing rectangles.
+    Base class for rubber-band shape tools. One shape and one canvas item are
+    created per gesture; dragging updates that item in place and only the final
+    item is returned to the canvas for the undo history.
     """
-    def __init__(self, color='black', size=3):
-        super().__init__('Rectangle')
+    shape_class = None
+
+    def __init__(self, name, color='black', size=3):
+        super().__init__(name)
         self.color = color
         self.size = size
         self.start = None
-        self.temp_shape_id = None
+        self.shape = None
 
     def on_press(self, event, canvas):
         self.start = (event.x, event.y)
-        self.temp_shape_id = None
+        self.shape = None
+        return None
 
     def on_drag(self, event, canvas):
         if self.start:
-            if self.temp_shape_id:
-                canvas.delete(self.temp_shape_id)
-            rect = Rectangle(self.start, (event.x, event.y))
-            self.temp_shape_id = rect.draw(canvas, outline=self.color, width=self.size, temp=True)
-        return self.temp_shape_id
+            if self.shape is None:
+                self.shape = self.shape_class(self.start, (event.x, event.y))
+            self.shape.end = (event.x, event.y)
+            self.shape.draw(canvas, outline=self.color, width=self.size, temp=True)
+        return None
 
     def on_release(self, event, canvas):
         if self.start:
-            if self.temp_shape_id:
-                canvas.delete(self.temp_shape_id)
-            rect = Rectangle(self.start, (event.x, event.y))
-            item_id = rect.draw(canvas, outline=self.color, width=self.size)
+            shape = self.shape or self.shape_class(self.start, (event.x, event.y))
+            shape.end = (event.x, event.y)
+            shape.outline, shape.width = self.color, self.size
+            item_id = shape.draw(canvas)
+            shapes = getattr(canvas, 'shapes', None)
+            if shapes is not None:
+                shapes.append(shape)
             self.start = None
-            self.temp_shape_id = None
+            self.shape = None
             return item_id
         return None
 
-class OvalTool(Tool):
+class RectangleTool(ShapeTool):
     """
-    Tool for drawing ovals.
+    Tool for drawing rectangles.
     """
-    def __init__(self, color='black', size=3):
-        super().__init__('Oval')
-        self.color = color
-        self.size = size
-        self.start = None
-        self.temp_shape_id = None
+    shape_class = Rectangle
 
-    def on_press(self, event, canvas):
-        self.start = (event.x, event.y)
-        self.temp_shape_id = None
+    def __init__(self, color='black', size=3):
+        super().__init__('Rectangle', color, size)
 
-    def on_drag(self, event, canvas):
-        if self.start:
-            if self.temp_shape_id:
-                canvas.delete(self.temp_shape_id)
-            oval = Oval(self.start, (event.x, event.y))
-            self.temp_shape_id = oval.draw(canvas, outline=self.color, width=self.size, temp=True)
-        return self.temp_shape_id
+class OvalTool(ShapeTool):
+    """
+    Tool for drawing ovals.
+    """
+    shape_class = Oval
 
-    def on_release(self, event, canvas):
-        if self.start:
-            if self.temp_shape_id:
-                canvas.delete(self.temp_shape_id)
-            oval = Oval(self.start, (event.x, event.y))
-            item_id = oval.draw(canvas, outline=self.color, width=self.size)
-            self.start = None
-            self.temp_shape_id = None
-            return item_id
-        return None
+    def __init__(self, color='black', size=3):
+        super().__init__('Oval', color, size)
 
-class LineTool(Tool):
+class LineTool(ShapeTool):
     """
     Tool for drawing straight lines.
     """
-    def __init__(self, color='black', size=3):
-        super().__init__('Line')
-        self.color = color
-        self.size = size
-        self.start = None
-        self.temp_line_id = None
+    shape_class = Line
 
-    def on_press(self, event, canvas):
-        self.start = (event.x, event.y)
-        self.temp_line_id = None
-
-    def on_drag(self, event, canvas):
-        if self.start:
-            if self.temp_line_id:
-                canvas.delete(self.temp_line_id)
-            self.temp_line_id = canvas.create_line(self.start[0], self.start[1], event.x, event.y, fill=self.color, width=self.size)
-        return self.temp_line_id
-
-    def on_release(self, event, canvas):
-        if self.start:
-            if self.temp_line_id:
-                canvas.delete(self.temp_line_id)
-            item_id = canvas.create_line(self.start[0], self.start[1], event.x, event.y, fill=self.color, width=self.size)
-            self.start = None
-            self.temp_line_id = None
-            return item_id
-        return None
+    def __init__(self, color='black', size=3):
+        super().__init__('Line', color, size)
 
 class TextTool(Tool):
     """
@@ -183,8 +264,7 @@ class TextTool(Tool):
         from tkinter.simpledialog import askstring
         text = askstring("Text Tool", "Enter text:")
         if text:
-            item_id = canvas.create_text(event.x, event.y, text=text, fill=self.color, font=("Comic Sans MS", self.size, "bold"))
-            return item_id
+            return canvas.place_sprite(event.x, event.y, text, self.size, self.color)
         return None
 
     def on_drag(self, event, canvas):
@@ -199,19 +279,210 @@ class StampTool(Tool):
     """
     def __init__(self):
         super().__init__('Stamp')
+        self.size = 32
         self.emojis = ['🌟', '⭐', '✨', '🎈', '🎉', '💖', '🐱', '🐶', '🦄', '🍕', '🍦', '🚗', '🌈', '👑', '🦋']
 
     def on_press(self, event, canvas):
         emoji = random.choice(self.emojis)
-        item_id = canvas.create_text(event.x, event.y, text=emoji, font=("Comic Sans MS", 32))
-        return item_id
+        return canvas.place_sprite(event.x, event.y, emoji, self.size)
+
+    def on_drag(self, event, canvas):
+        return None
+
+    def on_release(self, event, canvas):
+        return None
+
+def combine_masks(current, mask, state):
+    """Add mask to the current selection with Shift held, subtract it with Ctrl, otherwise replace it."""
+    if current and state & SHIFT_MASK:
+        return current | mask
+    if current and state & CONTROL_MASK:
+        return current - mask
+    return mask
+
+class RegionTool(Tool):
+    """
+    Tool for marking a region to copy or cut: a dragged rectangle or ellipse, or
+    a freehand lasso when freeform is set. The region is stored on canvas.region
+    as polygon points and outlined with a dashed marquee, and the pixels it
+    covers become canvas.mask. Holding Shift adds to the existing mask and Ctrl
+    subtracts from it; a combined selection has no single outline, so it leaves
+    canvas.region empty. Neither is part of the undo history.
+    """
+    def __init__(self, name='Select Region', freeform=False, oval=False):
+        super().__init__(name)
+        self.freeform = freeform
+        self.oval = oval
+        self.color = 'black'
+        self.size = 1
+        self.points = []
+        self.state = 0
+
+    def polygon(self):
+        if self.freeform:
+            return list(self.points)
+        (x0, y0), (x1, y1) = self.points[0], self.points[-1]
+        if self.oval:
+            angles = np.linspace(0, 2 * math.pi, 64, endpoint=False)
+            cx, cy, rx, ry = (x0 + x1) / 2, (y0 + y1) / 2, abs(x1 - x0) / 2, abs(y1 - y0) / 2
+            return list(zip((cx + rx * np.cos(angles)).tolist(), (cy + ry * np.sin(angles)).tolist()))
+        return [(x0, y0), (x1, y0), (x1, y1), (x0, y1)]
+
+    def mask(self):
+        if self.freeform:
+            return Mask.polygon(self.points)
+        (x0, y0), (x1, y1) = self.points[0], self.points[-1]
+        return (Mask.ellipse if self.oval else Mask.rectangle)(x0, y0, x1, y1)
+
+    def on_press(self, event, canvas):
+        self.state = event.state & (SHIFT_MASK | CONTROL_MASK)
+        if not (self.state and canvas.mask):
+            canvas.clear_region()
+        self.points = [(event.x, event.y)]
+        return None
 
     def on_drag(self, event, canvas):
+        if not self.points:
+            return None
+        if self.freeform:
+            self.points.append((event.x, event.y))
+        else:
+            self.points[1:] = [(event.x, event.y)]
+        coords = [c for point in self.polygon() for c in point]
+        if canvas.find_withtag(REGION_TAG):
+            canvas.coords(REGION_TAG, *coords)
+        else:
+            canvas.create_polygon(*coords, fill='', outline='black', dash=(4, 4), tags=(REGION_TAG, CHROME_TAG))
         return None
 
     def on_release(self, event, canvas):
+        polygon = self.polygon() if len(self.points) > 1 else []
+        xs, ys = [x for x, _ in polygon], [y for _, y in polygon]
+        if len(polygon) >= 3 and max(xs) > min(xs) and max(ys) > min(ys):
+            if self.state and canvas.mask:
+                canvas.delete(REGION_TAG)
+                canvas.region = None
+            else:
+                canvas.region = polygon
+            canvas.set_mask(combine_masks(canvas.mask, self.mask(), self.state))
+        else:
+            canvas.delete(REGION_TAG)
+        self.points = []
         return None
 
+class MagicWandTool(Tool):
+    """
+    Tool that selects the pixels of the current layer close in colour to the
+    clicked one. The layer's visible area is rendered once per layer version and
+    kept as a pixel array, so further clicks only run the wand itself. Shift and
+    Ctrl combine with the existing selection as for RegionTool.
+    """
+    def __init__(self, tolerance=32, contiguous=True):
+        super().__init__('Magic Wand')
+        self.tolerance = tolerance
+        self.contiguous = contiguous
+        self.color = 'black'
+        self.size = 1
+        self._key = None
+        self._pixels = None
+
+    def pixels(self, canvas):
+        """The current layer's visible area as planar RGBA pixels, rendered again only when the layer changes."""
+        from renderer import iter_snapshot, render
+        layer = canvas.layers[canvas.current_layer]
+        size = (max(1, canvas.winfo_width()), max(1, canvas.winfo_height()))
+        key = (layer.tag, layer.version, size)
+        if key != self._key:
+            self._pixels = planar_pixels(render(list(iter_snapshot(canvas, layer.content_tag)), size))
+            self._key = key
+        return self._pixels
+
+    def on_press(self, event, canvas):
+        mask = magic_wand(self.pixels(canvas), event.x, event.y, self.tolerance, self.contiguous)
+        state = event.state & (SHIFT_MASK | CONTROL_MASK)
+        combined = combine_masks(canvas.mask, mask, state)
+        canvas.delete(REGION_TAG)
+        canvas.region = None
+        canvas.set_mask(combined)
+        return None
+
+class GradientTool(Tool):
+    """
+    Tool for filling with a linear, radial or conic gradient. The press sets the
+    start handle and the pointer drags the end handle while a preview follows;
+    the release paints the gradient onto the layer. It fills the pixel selection
+    if there is one, otherwise the selected rectangles and ovals, otherwise the
+    whole canvas beneath the current layer's content. Gradients are rendered at
+    canvas size through a GradientCache, so the cached fields fit every frame.
+    """
+    preview_tag = 'gradient_preview'
+
+    def __init__(self, kind='linear', stops=None):
+        super().__init__('Gradient')
+        self.kind = kind
+        # Normalized stops, or None to fade from the tool colour to white
+        self.stops = stops
+        self.color = 'black'
+        self.size = 1
+        self.cache = GradientCache()
+        self.start = None
+        self._mask = None
+        self._photo = None
+
+    def gradient_stops(self):
+        return self.stops or normalize_stops([(0, self.color), (1, 'white')])
+
+    def target(self, canvas):
+        """The Mask to fill, or None for the whole canvas."""
+        if getattr(canvas, 'mask', None):
+            return canvas.mask
+        mask = Mask.empty()
+        for shape in canvas.selection:
+            if isinstance(shape, (Rectangle, Oval)):
+                mask = mask | (Mask.ellipse if isinstance(shape, Oval) else Mask.rectangle)(*shape.coords())
+        return mask or None
+
+    def image(self, canvas, end):
+        """The gradient for handles start to end, clipped to the target. Returns (image, (x, y))."""
+        size = (max(1, canvas.winfo_width()), max(1, canvas.winfo_height()))
+        image = self.cache.render(self.kind, self.gradient_stops(), size, self.start, end)
+        if self._mask is None:
+            return image, (0, 0)
+        image = image.crop(self._mask.bbox)
+        image.putalpha(ImageChops.multiply(image.getchannel('A'), self._mask.to_image()))
+        return image, self._mask.offset
+
+    def on_press(self, event, canvas):
+        self.start = (event.x, event.y)
+        self._mask = self.target(canvas)
+        return None
+
+    def on_drag(self, event, canvas):
+        from PIL import ImageTk
+        if self.start is None:
+            return None
+        image, (x, y) = self.image(canvas, (event.x, event.y))
+        if self._photo is None or (self._photo.width(), self._photo.height()) != image.size:
+            canvas.delete(self.preview_tag)
+            self._photo = ImageTk.PhotoImage(image)
+            canvas.create_image(x, y, anchor='nw', image=self._photo, tags=(self.preview_tag, CHROME_TAG))
+        else:
+            self._photo.paste(image)
+        return None
+
+    def on_release(self, event, canvas):
+        if self.start is None:
+            return None
+        canvas.delete(self.preview_tag)
+        self._photo = None
+        item_id = None
+        if self.start != (event.x, event.y):
+            image, (x, y) = self.image(canvas, (event.x, event.y))
+            # A background fill goes under everything already on the layer
+            item_id = canvas.paint_image(x, y, image, below=self._mask is None)
+        self.start = self._mask = None
+        return item_id
+
 class ToolManager:
     """
     Manages available tools and current tool selection.
@@ -219,17 +490,35 @@ class ToolManager:
     def __init__(self):
         self.tools = {}
         self.current_tool = None
+        # (ways, mirror) while symmetry drawing is on
+        self.symmetry = None
         self.add_tool(BrushTool())
+        self.add_tool(DabBrushTool())
         self.add_tool(EraserTool())
         self.add_tool(RectangleTool())
         self.add_tool(OvalTool())
         self.add_tool(LineTool())
         self.add_tool(TextTool())
         self.add_tool(StampTool())
+        self.add_tool(RegionTool())
+        self.add_tool(RegionTool('Ellipse Select', oval=True))
+        self.add_tool(RegionTool('Lasso', freeform=True))
+        self.add_tool(MagicWandTool())
+        self.add_tool(GradientTool())
         self.select_tool('Brush')
 
     def add_tool(self, tool):
         self.tools[tool.name] = tool
 
     def select_tool(self, name):
-        self.current_tool = self.tools.get(name) 
\ No newline at end of file
+        tool = self.tools.get(name)
+        if self.symmetry and hasattr(tool, 'draw_stroke'):
+            from symmetry import SymmetryTool
+            tool = SymmetryTool(tool, *self.symmetry)
+        self.current_tool = tool
+
+    def set_symmetry(self, ways, mirror=False):
+        """Turn symmetry drawing on for stroke tools, or off when ways is below 2."""
+        self.symmetry = (ways, mirror) if ways and (ways > 1 or mirror) else None
+        if self.current_tool is not None:
+            self.select_tool(self.current_tool.name) 
\ No newline at end of file
@@ -5,6 +5,11 @@ ui.py - UI layout and controls for the Paint App
 import tkinter as tk
 from tkinter import ttk
 from canvas import PaintCanvas
+from layer_panel import LayerPanel
+from encoding import encode
+from clipboard import Clipboard
+from gradients import GRADIENT_TYPES, normalize_stops
+from thumbnails import IMAGE_EXTENSIONS, ThumbnailCache
 from tools import ToolManager
 import tkinter.filedialog
 import tkinter.messagebox
@@ -20,6 +25,12 @@ class PaintAppUI:
     def __init__(self, root):
         self.root = root
         self.root.title("Tkinter Paint App")
+        self.session = None
+        self.clipboard = Clipboard()
+        self.svg_import = None
+        self.poster_export = None
+        self.thumbnails = None
+        self.browse_dir = None
         self.root.geometry("1000x700")
         self._setup_menu()
         self._setup_toolbar()
@@ -29,6 +40,10 @@ class PaintAppUI:
         self.root.bind('<Control-z>', lambda e: self._undo())
         self.root.bind('<Control-y>', lambda e: self._redo())
         self.root.bind('<Control-s>', lambda e: self._save())
+        self.root.bind('<Control-c>', lambda e: self._copy())
+        self.root.bind('<Control-x>', lambda e: self._cut())
+        self.root.bind('<Control-v>', lambda e: self._paste())
+        self.root.bind('<Escape>', lambda e: self._cancel_poster())
 
     def _setup_menu(self):
         menubar = tk.Menu(self.root)
@@ -38,10 +53,28 @@ class PaintAppUI:
         file_menu.add_command(label="Open", command=self._open_file)
         file_menu.add_command(label="Save", command=self._save)
         file_menu.add_command(label="Save As", command=self._save_as)
+        file_menu.add_command(label="Export All Sizes...", command=self._export_all_sizes)
+        file_menu.add_command(label="Export Poster...", command=self._export_poster)
+        file_menu.add_command(label="Export Timelapse...", command=self._export_timelapse)
         file_menu.add_command(label="Delete", command=self._delete_file)
         file_menu.add_separator()
         file_menu.add_command(label="Exit", command=self.root.quit)
         menubar.add_cascade(label="File", menu=file_menu)
+        # Edit menu
+        edit_menu = tk.Menu(menubar, tearoff=0)
+        edit_menu.add_command(label="Select Region", command=self._select_region)
+        edit_menu.add_command(label="Ellipse Select", command=self._select_ellipse)
+        edit_menu.add_command(label="Lasso", command=self._select_lasso)
+        edit_menu.add_command(label="Magic Wand", command=self._select_magic_wand)
+        edit_menu.add_command(label="Deselect", command=self._deselect)
+        edit_menu.add_separator()
+        edit_menu.add_command(label="Fill Selection", command=self._fill_selection)
+        edit_menu.add_command(label="Feather Selection...", command=self._feather_selection)
+        edit_menu.add_separator()
+        edit_menu.add_command(label="Cut", command=self._cut, accelerator="Ctrl+X")
+        edit_menu.add_command(label="Copy", command=self._copy, accelerator="Ctrl+C")
+        edit_menu.add_command(label="Paste", command=self._paste, accelerator="Ctrl+V")
+        menubar.add_cascade(label="Edit", menu=edit_menu)
         # Insert menu
         insert_menu = tk.Menu(menubar, tearoff=0)
         insert_menu.add_command(label="Image...", command=self._insert_image)
@@ -56,13 +89,34 @@ class PaintAppUI:
         design_menu.add_command(label="Change Background", command=self._set_background)
         design_menu.add_command(label="Random Color Theme", command=self._random_color)
         design_menu.add_command(label="Canvas Size...", command=self._set_canvas_size)
+        design_menu.add_command(label="Symmetry...", command=self._set_symmetry)
+        gradient_menu = tk.Menu(design_menu, tearoff=0)
+        for kind in GRADIENT_TYPES:
+            gradient_menu.add_command(label=kind.capitalize(), command=lambda kind=kind: self._select_gradient(kind))
+        gradient_menu.add_separator()
+        gradient_menu.add_command(label="Colour Stops...", command=self._set_gradient_stops)
+        design_menu.add_cascade(label="Gradient", menu=gradient_menu)
+        design_menu.add_command(label="Filters...", command=self._open_filters)
         menubar.add_cascade(label="Design", menu=design_menu)
         # Layout menu
         layout_menu = tk.Menu(menubar, tearoff=0)
         layout_menu.add_command(label="Bring Forward", command=self._bring_forward)
         layout_menu.add_command(label="Send Backward", command=self._send_backward)
+        layout_menu.add_command(label="Bring to Front", command=self._bring_to_front)
+        layout_menu.add_command(label="Send to Back", command=self._send_to_back)
         layout_menu.add_command(label="Center on Canvas", command=self._center_on_canvas)
+        layout_menu.add_separator()
+        self.select_mode_var = tk.BooleanVar(value=False)
+        layout_menu.add_checkbutton(label="Select Objects", variable=self.select_mode_var, command=self._toggle_select_mode)
+        self.transform_mode_var = tk.StringVar(value='move')
+        for label, mode in (("Move Selection", 'move'), ("Scale Selection", 'scale'), ("Rotate Selection", 'rotate')):
+            layout_menu.add_radiobutton(label=label, variable=self.transform_mode_var, value=mode, command=self._set_transform_mode)
         menubar.add_cascade(label="Layout", menu=layout_menu)
+        # Session menu
+        session_menu = tk.Menu(menubar, tearoff=0)
+        session_menu.add_command(label="Join Session...", command=self._join_session)
+        session_menu.add_command(label="Leave Session", command=self._leave_session)
+        menubar.add_cascade(label="Session", menu=session_menu)
         # Help menu
         help_menu = tk.Menu(menubar, tearoff=0)
         help_menu.add_command(label="About", command=self._show_about)
@@ -76,6 +130,8 @@ class PaintAppUI:
         # Tool buttons with emoji icons
         brush_btn = tk.Button(toolbar, text="🖌️ Brush", font=playful_font, bg="#ffb347", command=self._select_brush, width=10, height=2)
         brush_btn.pack(side=tk.LEFT, padx=4, pady=4)
+        soft_brush_btn = tk.Button(toolbar, text="🪶 Soft Brush", font=playful_font, bg="#ffd1a9", command=self._select_soft_brush, width=12, height=2)
+        soft_brush_btn.pack(side=tk.LEFT, padx=4, pady=4)
         eraser_btn = tk.Button(toolbar, text="🧽 Eraser", font=playful_font, bg="#b0e0e6", command=self._select_eraser, width=10, height=2)
         eraser_btn.pack(side=tk.LEFT, padx=4, pady=4)
         rectangle_btn = tk.Button(toolbar, text="🔲 Rectangle", font=playful_font, bg="#c3f584", command=self._select_rectangle, width=12, height=2)
@@ -126,6 +182,7 @@ class PaintAppUI:
         add_layer_btn = tk.Button(toolbar, text="➕ Add Layer", font=playful_font, bg="#f7cac9", command=self._add_layer, width=12, height=2)
         add_layer_btn.pack(side=tk.LEFT, padx=4, pady=4)
         self._add_hover_effect(brush_btn)
+        self._add_hover_effect(soft_brush_btn)
         self._add_hover_effect(eraser_btn)
         self._add_hover_effect(rectangle_btn)
         self._add_hover_effect(oval_btn)
@@ -146,6 +203,11 @@ class PaintAppUI:
         self.canvas.config(cursor='pencil')
         self._update_statusbar()
 
+    def _select_soft_brush(self):
+        self.canvas.tool_manager.select_tool('Soft Brush')
+        self.canvas.config(cursor='pencil')
+        self._update_statusbar()
+
     def _select_eraser(self):
         self.canvas.tool_manager.select_tool('Eraser')
         self.canvas.config(cursor='dotbox')
@@ -163,19 +225,18 @@ class PaintAppUI:
 
     def _set_color(self):
         color = self.color_var.get()
-        brush = self.canvas.tool_manager.tools.get('Brush')
-        if brush:
-            brush.color = color
+        for name in ('Brush', 'Soft Brush', 'Gradient'):
+            brush = self.canvas.tool_manager.tools.get(name)
+            if brush:
+                brush.color = color
         self._update_statusbar()
 
     def _set_size(self):
         size = self.size_var.get()
-        brush = self.canvas.tool_manager.tools.get('Brush')
-        eraser = self.canvas.tool_manager.tools.get('Eraser')
-        if brush:
-            brush.size = size
-        if eraser:
-            eraser.size = size
+        for name in ('Brush', 'Soft Brush', 'Eraser'):
+            tool = self.canvas.tool_manager.tools.get(name)
+            if tool:
+                tool.size = size
         self._update_statusbar()
 
     def _undo(self):
@@ -191,7 +252,7 @@ class PaintAppUI:
             from tkinter import filedialog, simpledialog
             from PIL import ImageGrab
             import os
-            filetypes = [('PNG files', '*.png'), ('JPEG files', '*.jpg'), ('SVG files', '*.svg'), ('All files', '*.*')]
+            filetypes = [('PNG files', '*.png'), ('JPEG files', '*.jpg'), ('WebP files', '*.webp'), ('SVG files', '*.svg'), ('All files', '*.*')]
             file_path = filedialog.asksaveasfilename(defaultextension='.png', filetypes=filetypes)
             if not file_path:
                 return
@@ -201,18 +262,18 @@ class PaintAppUI:
             y = self.canvas.winfo_rooty()
             x1 = x + self.canvas.winfo_width()
             y1 = y + self.canvas.winfo_height()
-            if ext == '.png' or ext == '.jpg':
+            if ext in ('.png', '.jpg', '.webp'):
                 img = ImageGrab.grab().crop((x, y, x1, y1))
                 if ext == '.jpg':
                     img = img.convert('RGB')
                 if export_bg and export_bg.lower().startswith('n'):
                     # Remove background (set to transparent for PNG)
-                    if ext == '.png':
+                    if ext in ('.png', '.webp'):
                         img = img.convert('RGBA')
                         datas = img.getdata()
                         newData = [(r, g, b, 0) if (r, g, b) == (255, 255, 255) else (r, g, b, a) for (r, g, b, *a) in datas]
                         img.putdata(newData)
-                img.save(file_path)
+                self.statusbar.config(text=str(encode(img, file_path)))
             elif ext == '.svg':
                 try:
                     import svgwrite
@@ -247,9 +308,9 @@ class PaintAppUI:
         sidebar = tk.Frame(self.root, bd=2, relief=tk.GROOVE)
         sidebar.pack(side=tk.LEFT, fill=tk.Y)
         tk.Label(sidebar, text="Layers").pack()
-        self.layer_listbox = tk.Listbox(sidebar)
-        self.layer_listbox.pack(fill=tk.BOTH, expand=True)
-        self._refresh_layer_list()
+        self.layer_panel = LayerPanel(sidebar, self.canvas, on_select=self._on_layer_select)
+        self.layer_panel.pack(fill=tk.BOTH, expand=True)
+        self.layer_panel.select_index(self.canvas.current_layer)
         btn_frame = tk.Frame(sidebar)
         btn_frame.pack(fill=tk.X)
         tk.Button(btn_frame, text="Add", command=self._add_layer).pack(side=tk.LEFT)
@@ -258,14 +319,9 @@ class PaintAppUI:
         tk.Button(btn_frame, text="Down", command=self._move_layer_down).pack(side=tk.LEFT)
         tk.Button(btn_frame, text="Hide/Show", command=self._toggle_layer_visibility).pack(side=tk.LEFT)
         tk.Button(btn_frame, text="Rename", command=self._rename_layer).pack(side=tk.LEFT)
-        self.layer_listbox.bind('<<ListboxSelect>>', self._on_layer_select)
 
     def _refresh_layer_list(self):
-        self.layer_listbox.delete(0, tk.END)
-        for i, layer in enumerate(self.canvas.layers):
-            name = getattr(layer, 'name', f"Layer {i+1}")
-            visible = getattr(layer, 'visible', True)
-            self.layer_listbox.insert(tk.END, f"{name}{' (hidden)' if not visible else ''}")
+        self.layer_panel.refresh()
 
     def _add_layer(self):
         """Add a new layer to the canvas and refresh the layer list."""
@@ -276,7 +332,7 @@ class PaintAppUI:
 
     def _delete_layer(self):
         """Delete the selected layer using the canvas method and refresh the list."""
-        idx = self.layer_listbox.curselection()
+        idx = self.layer_panel.curselection()
         if idx and len(self.canvas.layers) > 1:
             idx = idx[0]
             self.canvas.delete_layer(idx)
@@ -284,7 +340,7 @@ class PaintAppUI:
 
     def _move_layer_up(self):
         """Move the selected layer up using the canvas method and refresh the list."""
-        idx = self.layer_listbox.curselection()
+        idx = self.layer_panel.curselection()
         if idx and idx[0] > 0:
             i = idx[0]
             self.canvas.move_layer_up(i)
@@ -292,7 +348,7 @@ class PaintAppUI:
 
     def _move_layer_down(self):
         """Move the selected layer down using the canvas method and refresh the list."""
-        idx = self.layer_listbox.curselection()
+        idx = self.layer_panel.curselection()
         if idx and idx[0] < len(self.canvas.layers)-1:
             i = idx[0]
             self.canvas.move_layer_down(i)
@@ -300,7 +356,7 @@ class PaintAppUI:
 
     def _toggle_layer_visibility(self):
         """Toggle visibility of the selected layer using the canvas method and refresh the list."""
-        idx = self.layer_listbox.curselection()
+        idx = self.layer_panel.curselection()
         if idx:
             i = idx[0]
             self.canvas.toggle_layer_visibility(i)
@@ -308,7 +364,7 @@ class PaintAppUI:
 
     def _rename_layer(self):
         """Rename the selected layer using the canvas method and refresh the list."""
-        idx = self.layer_listbox.curselection()
+        idx = self.layer_panel.curselection()
         if idx:
             i = idx[0]
             name = tk.simpledialog.askstring("Rename Layer", "New name:")
@@ -316,10 +372,8 @@ class PaintAppUI:
                 self.canvas.rename_layer(i, name)
                 self._refresh_layer_list()
 
-    def _on_layer_select(self, event):
-        idx = self.layer_listbox.curselection()
-        if idx:
-            self.canvas.switch_layer(idx[0]) 
+    def _on_layer_select(self, index):
+        self.canvas.switch_layer(index)
 
     def _add_hover_effect(self, btn):
         def on_enter(e):
@@ -373,39 +427,163 @@ class PaintAppUI:
     # --- File operations ---
     def _new_file(self):
         if tkinter.messagebox.askyesno("New File", "Start a new drawing? Unsaved work will be lost."):
-            self.canvas.delete("all")
+            self._leave_session()
+            if self.svg_import is not None:
+                self.svg_import.cancel()
+            self.clipboard.clip = None
+            self.canvas.new_document()
+            self._refresh_layer_list()
+    def shutdown(self):
+        """Release background workers; call once the main loop has ended."""
+        if self.thumbnails is not None:
+            self.thumbnails.shutdown()
+            self.thumbnails = None
+    def _browse_images(self, on_choose, title, action, extensions=IMAGE_EXTENSIONS):
+        from image_browser import ImageBrowser
+        if self.thumbnails is None:
+            self.thumbnails = ThumbnailCache()
+        def choose(path):
+            self.browse_dir = os.path.dirname(path)
+            on_choose(path)
+        ImageBrowser(self.root, self.thumbnails, choose, directory=self.browse_dir, title=title, action=action, extensions=extensions)
     def _open_file(self):
-        file_path = tkinter.filedialog.askopenfilename(filetypes=[('Image Files', '*.png;*.jpg;*.jpeg;*.bmp')])
-        if file_path:
-            img = Image.open(file_path)
-            img = img.resize((self.canvas.winfo_width(), self.canvas.winfo_height()))
-            self._opened_img = ImageTk.PhotoImage(img)
-            self.canvas.create_image(0, 0, anchor=tk.NW, image=self._opened_img)
+        self._browse_images(self._open_path, "Open", "Open", IMAGE_EXTENSIONS + ('.svg',))
+    def _open_path(self, file_path):
+        if file_path.lower().endswith('.svg'):
+            self._import_svg(file_path)
+        else:
+            key = self.canvas.assets.add_file(file_path)
+            self.canvas.place_asset(0, 0, key, size=(self.canvas.winfo_width(), self.canvas.winfo_height()), anchor=tk.NW)
+    def _import_svg(self, file_path):
+        from svg_import import SvgImport
+        if self.svg_import is not None:
+            self.svg_import.cancel()
+        name = os.path.basename(file_path)
+        def progress(job):
+            self._refresh_layer_list()
+            self.statusbar.config(text=f"Importing {name}... {job.progress:.0%}")
+        def done(job):
+            self.svg_import = None
+            self._refresh_layer_list()
+            error = f" (stopped early: {job.error})" if job.error else ""
+            self.statusbar.config(text=f"Imported {len(job.item_ids)} items from {name}{error}")
+        self.svg_import = SvgImport(self.canvas, file_path, on_progress=progress, on_done=done).start()
     def _save_as(self):
-        file_path = tkinter.filedialog.asksaveasfilename(defaultextension='.png', filetypes=[('PNG files', '*.png'), ('JPEG files', '*.jpg'), ('All files', '*.*')])
+        file_path = tkinter.filedialog.asksaveasfilename(defaultextension='.png', filetypes=[('PNG files', '*.png'), ('JPEG files', '*.jpg'), ('WebP files', '*.webp'), ('All files', '*.*')])
         if file_path:
             x = self.canvas.winfo_rootx()
             y = self.canvas.winfo_rooty()
             x1 = x + self.canvas.winfo_width()
             y1 = y + self.canvas.winfo_height()
             img = ImageGrab.grab().crop((x, y, x1, y1))
-            img.save(file_path)
+            self.statusbar.config(text=str(encode(img, file_path)))
+    def _export_all_sizes(self):
+        from export import export_canvas
+        file_path = tkinter.filedialog.asksaveasfilename(defaultextension='.png', filetypes=[('PNG files', '*.png'), ('All files', '*.*')])
+        if file_path:
+            paths = export_canvas(self.canvas, file_path)
+            self.statusbar.config(text=f"Exported {len(paths)} files: " + ", ".join(os.path.basename(p) for p in paths))
+    def _export_poster(self):
+        from poster import PosterJob
+        from tkinter.simpledialog import askfloat
+        if self.poster_export is not None:
+            self.statusbar.config(text="A poster export is already running (Esc to cancel)")
+            return
+        scale = askfloat("Export Poster", "Scale (print size relative to the canvas):", minvalue=0.1, maxvalue=100, initialvalue=10)
+        if not scale:
+            return
+        file_path = tkinter.filedialog.asksaveasfilename(defaultextension='.png', filetypes=[('PNG files', '*.png')])
+        if file_path:
+            def progress(job):
+                self.statusbar.config(text=f"Exporting poster: {job.progress:.0%} (Esc to cancel)")
+            def done(job):
+                self.poster_export = None
+                if job.error:
+                    self.statusbar.config(text=f"Poster export failed: {job.error}")
+                elif job.size is None:
+                    self.statusbar.config(text="Poster export cancelled")
+                else:
+                    self.statusbar.config(text=f"Poster saved: {job.size[0]}x{job.size[1]} to {os.path.basename(file_path)}")
+            self.poster_export = PosterJob(self.canvas, file_path, scale, on_progress=progress, on_done=done).start()
+    def _cancel_poster(self):
+        if self.poster_export is not None:
+            self.poster_export.cancel()
+    def _export_timelapse(self):
+        from timelapse import export_canvas_timelapse
+        file_path = tkinter.filedialog.asksaveasfilename(defaultextension='.gif', filetypes=[('GIF files', '*.gif'), ('Animated PNG', '*.png'), ('WebP files', '*.webp')])
+        if file_path:
+            frames = export_canvas_timelapse(self.canvas, file_path)
+            self.statusbar.config(text=f"Timelapse saved: {frames} frames to {os.path.basename(file_path)}")
     def _delete_file(self):
-        file_path = tkinter.filedialog.askopenfilename(filetypes=[('Image Files', '*.png;*.jpg;*.jpeg;*.bmp')])
-        if file_path and tkinter.messagebox.askyesno("Delete File", f"Delete {os.path.basename(file_path)}?"):
+        self._browse_images(self._delete_path, "Delete File", "Delete")
+    def _delete_path(self, file_path):
+        if tkinter.messagebox.askyesno("Delete File", f"Delete {os.path.basename(file_path)}?"):
             os.remove(file_path)
             tkinter.messagebox.showinfo("Deleted", "File deleted.") 
 
+    # --- Edit menu actions ---
+    def _select_region(self):
+        self.canvas.tool_manager.select_tool('Select Region')
+        self.canvas.config(cursor='crosshair')
+        self._update_statusbar()
+
+    def _select_ellipse(self):
+        self.canvas.tool_manager.select_tool('Ellipse Select')
+        self.canvas.config(cursor='crosshair')
+        self._update_statusbar()
+
+    def _select_lasso(self):
+        self.canvas.tool_manager.select_tool('Lasso')
+        self.canvas.config(cursor='crosshair')
+        self._update_statusbar()
+
+    def _select_magic_wand(self):
+        self.canvas.tool_manager.select_tool('Magic Wand')
+        self.canvas.config(cursor='crosshair')
+        self._update_statusbar()
+
+    def _deselect(self):
+        self.canvas.clear_region()
+
+    def _fill_selection(self):
+        if self.canvas.fill_mask(self.color_var.get()):
+            self._refresh_layer_list()
+
+    def _feather_selection(self):
+        from tkinter.simpledialog import askfloat
+        if not self.canvas.mask:
+            return
+        radius = askfloat("Feather Selection", "Radius in pixels:", minvalue=0, initialvalue=4)
+        if radius:
+            # A feathered mask has no sharp outline, so only the mask path can copy it
+            mask = self.canvas.mask.feather(radius)
+            self.canvas.clear_region()
+            self.canvas.set_mask(mask)
+
+    def _copy(self):
+        if self.canvas.region:
+            self.clipboard.copy(self.canvas, self.canvas.region)
+        elif self.canvas.mask:
+            self.clipboard.copy_mask(self.canvas, self.canvas.mask)
+
+    def _cut(self):
+        if self.canvas.region:
+            cut = self.clipboard.cut(self.canvas, self.canvas.region)
+        else:
+            cut = self.canvas.mask and self.clipboard.cut_mask(self.canvas, self.canvas.mask)
+        if cut:
+            self._refresh_layer_list()
+
+    def _paste(self):
+        if self.clipboard.paste(self.canvas):
+            self._refresh_layer_list()
+
     # --- Insert menu actions ---
     def _insert_image(self):
-        from tkinter import filedialog
-        from PIL import Image, ImageTk
-        file_path = filedialog.askopenfilename(filetypes=[('Image Files', '*.png;*.jpg;*.jpeg;*.bmp')])
-        if file_path:
-            img = Image.open(file_path)
-            img = img.resize((100, 100))
-            self._inserted_img = ImageTk.PhotoImage(img)
-            self.canvas.create_image(50, 50, anchor=tk.NW, image=self._inserted_img)
+        self._browse_images(self._insert_path, "Insert Image", "Insert")
+    def _insert_path(self, file_path):
+        key = self.canvas.assets.add_file(file_path)
+        self.canvas.place_asset(50, 50, key, size=(100, 100), anchor=tk.NW)
 
     # --- Design menu actions ---
     def _set_canvas_size(self):
@@ -415,13 +593,80 @@ class PaintAppUI:
         if width and height:
             self.canvas.config(width=width, height=height)
 
-    # --- Layout menu actions (placeholders) ---
+    def _set_symmetry(self):
+        from tkinter.simpledialog import askinteger
+        ways = askinteger("Symmetry", "Number of rotational copies (1 for off):", initialvalue=6, minvalue=1, maxvalue=64)
+        if ways is None:
+            return
+        mirror = ways > 1 and tk.messagebox.askyesno("Symmetry", "Mirror each copy too?")
+        self.canvas.tool_manager.set_symmetry(ways, mirror)
+        self._update_statusbar()
+
+    def _select_gradient(self, kind):
+        self.canvas.select_gradient(kind)
+        self.select_mode_var.set(False)
+        self.canvas.config(cursor='crosshair')
+        self._update_statusbar()
+
+    def _set_gradient_stops(self):
+        from tkinter.simpledialog import askstring
+        tool = self.canvas.tool_manager.tools['Gradient']
+        current = ', '.join(f"{position:g}:#{r:02x}{g:02x}{b:02x}{a:02x}" for position, (r, g, b, a) in tool.gradient_stops())
+        text = askstring("Gradient", "Colour stops as position:colour, separated by commas:", initialvalue=current)
+        if text is None:
+            return
+        try:
+            tool.stops = normalize_stops(text) if text.strip() else None
+        except ValueError as e:
+            tkinter.messagebox.showerror("Gradient", f"Invalid colour stops: {e}")
+
+    def _open_filters(self):
+        from filter_dialog import FilterDialog
+        FilterDialog(self.root, self.canvas, on_done=self._refresh_layer_list)
+
+    # --- Layout menu actions ---
     def _bring_forward(self):
-        pass  # Placeholder for future layer/object ordering
+        self.canvas.bring_forward()
     def _send_backward(self):
-        pass  # Placeholder for future layer/object ordering
+        self.canvas.send_backward()
+    def _bring_to_front(self):
+        self.canvas.bring_to_front()
+    def _send_to_back(self):
+        self.canvas.send_to_back()
     def _center_on_canvas(self):
-        pass  # Placeholder for future centering logic
+        self.canvas.center_selection()
+
+    def _toggle_select_mode(self):
+        self.canvas.selection_mode = self.select_mode_var.get()
+        if not self.canvas.selection_mode:
+            self.canvas.selection.clear()
+        self.canvas.config(cursor='fleur' if self.canvas.selection_mode else '')
+
+    def _set_transform_mode(self):
+        self.canvas.selection.mode = self.transform_mode_var.get()
+
+    # --- Session menu actions ---
+    def _join_session(self):
+        from tkinter.simpledialog import askstring
+        from collab import CollabClient, CanvasSession
+        address = askstring("Join Session", "Server address (host:port):", initialvalue="127.0.0.1:8765")
+        if not address:
+            return
+        host, _, port = address.rpartition(':')
+        try:
+            client = CollabClient(host or '127.0.0.1', int(port)).start()
+        except (ValueError, ConnectionError) as e:
+            tk.messagebox.showerror("Join Session", str(e))
+            return
+        self._leave_session()
+        self.session = CanvasSession(self.canvas, client, on_layers_changed=self._refresh_layer_list)
+        self.root.title(f"Tkinter Paint App - {host}:{port}")
+
+    def _leave_session(self):
+        if self.session:
+            self.session.close()
+            self.session = None
+            self.root.title("Tkinter Paint App")
 
     # --- Help menu actions ---
     def _show_about(self):
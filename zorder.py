@@ -0,0 +1,158 @@
+"""
+zorder.py - Ordered shape store for the Paint App
+"""
+
+class ShapeOrder:
+    """
+    Shapes in stacking order, bottom to top, with lookup by canvas item id.
+    A doubly linked list indexed by a dict: removing a shape, moving it to the
+    front or back, or moving it next to another shape are all O(1), and the
+    order is never rebuilt. It supports the list operations the rest of the app
+    uses on canvas.shapes (append, remove, in, len, iteration and reversed).
+    Each shape is also linked into the list of its group, given by group_of(shape)
+    when it is added, so the neighbour within a group (a layer, on the canvas)
+    is O(1) as well, however the groups interleave.
+    """
+    def __init__(self, shapes=(), group_of=None):
+        # Nodes are [prev, next, shape, item_id, group prev, group next, group];
+        # the root nodes of the whole order and of each group are sentinels
+        self._root = root = [None, None, None, None, None, None, None]
+        root[0] = root[1] = root
+        self._group_of = group_of
+        self._groups = {}
+        self._nodes = {}
+        self._by_item = {}
+        for shape in shapes:
+            self.append(shape)
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def __bool__(self):
+        return bool(self._nodes)
+
+    def __contains__(self, shape):
+        return shape in self._nodes
+
+    def __iter__(self):
+        root = self._root
+        node = root[1]
+        while node is not root:
+            next_node = node[1]
+            yield node[2]
+            node = next_node
+
+    def __reversed__(self):
+        root = self._root
+        node = root[0]
+        while node is not root:
+            prev_node = node[0]
+            yield node[2]
+            node = prev_node
+
+    def _link(self, node, after):
+        node[0], node[1] = after, after[1]
+        after[1][0] = node
+        after[1] = node
+
+    def _unlink(self, node):
+        node[0][1], node[1][0] = node[1], node[0]
+
+    def _group_link(self, node, after):
+        node[4], node[5] = after, after[5]
+        after[5][4] = node
+        after[5] = node
+
+    def _group_unlink(self, node):
+        node[4][5], node[5][4] = node[5], node[4]
+
+    def _group_root(self, node):
+        root = self._groups.get(node[6])
+        if root is None:
+            root = self._groups[node[6]] = [None, None, None, None, None, None, node[6]]
+            root[4] = root[5] = root
+        return root
+
+    def append(self, shape):
+        """Add a shape on top."""
+        if shape in self._nodes:
+            return
+        group = self._group_of(shape) if self._group_of else None
+        node = self._nodes[shape] = [None, None, shape, None, None, None, group]
+        self._link(node, self._root[0])
+        self._group_link(node, self._group_root(node)[4])
+        self.index_item(shape)
+
+    def index_item(self, shape):
+        """Record the shape's current canvas item id for find()."""
+        node = self._nodes[shape]
+        if self._by_item.get(node[3]) is shape:
+            del self._by_item[node[3]]
+        node[3] = shape.canvas_id
+        if shape.canvas_id:
+            self._by_item[shape.canvas_id] = shape
+
+    def remove(self, shape):
+        """Remove a shape; raises ValueError if it is not stored, like list.remove."""
+        node = self._nodes.pop(shape, None)
+        if node is None:
+            raise ValueError("shape not in order")
+        self._unlink(node)
+        self._group_unlink(node)
+        if self._groups[node[6]][5] is self._groups[node[6]]:
+            del self._groups[node[6]]
+        if self._by_item.get(node[3]) is shape:
+            del self._by_item[node[3]]
+
+    def discard(self, shape):
+        """Remove a shape if it is stored."""
+        if shape in self._nodes:
+            self.remove(shape)
+
+    def find(self, item_id):
+        """Return the shape drawn as the given canvas item, or None."""
+        return self._by_item.get(item_id)
+
+    def above(self, shape, same_group=False):
+        """Return the shape directly above, or None at the top, counting only its group if same_group is set."""
+        return self._nodes[shape][5 if same_group else 1][2]
+
+    def below(self, shape, same_group=False):
+        """Return the shape directly below, or None at the bottom, counting only its group if same_group is set."""
+        return self._nodes[shape][4 if same_group else 0][2]
+
+    def to_front(self, shape):
+        node = self._nodes[shape]
+        self._unlink(node)
+        self._link(node, self._root[0])
+        root = self._groups[node[6]]
+        self._group_unlink(node)
+        self._group_link(node, root[4])
+
+    def to_back(self, shape):
+        node = self._nodes[shape]
+        self._unlink(node)
+        self._link(node, self._root)
+        root = self._groups[node[6]]
+        self._group_unlink(node)
+        self._group_link(node, root)
+
+    def place_above(self, shape, other):
+        """Move shape to directly above other. Within its group it only moves if other shares the group."""
+        if shape is not other:
+            node, other_node = self._nodes[shape], self._nodes[other]
+            self._unlink(node)
+            self._link(node, other_node)
+            if node[6] == other_node[6]:
+                self._group_unlink(node)
+                self._group_link(node, other_node)
+
+    def place_below(self, shape, other):
+        """Move shape to directly below other. Within its group it only moves if other shares the group."""
+        if shape is not other:
+            node, other_node = self._nodes[shape], self._nodes[other]
+            self._unlink(node)
+            self._link(node, other_node[0])
+            if node[6] == other_node[6]:
+                self._group_unlink(node)
+                self._group_link(node, other_node[4])